@@ -1,47 +1,208 @@
-from flask import Flask, request, jsonify, render_template
+from flask import Blueprint, Flask, Response, current_app, request, jsonify, render_template, stream_with_context
 import os
+import json
+from pathlib import Path
 from flask_cors import CORS, cross_origin
-from cnnClassifier.utils.common import decodeImage
-from cnnClassifier.pipeline.predict import PredictionPipeline
+from cnnClassifier import logger
+from cnnClassifier.utils.common import decodeImageBytes
+from cnnClassifier.pipeline.predict import RESPONSE_VERSIONS, PredictionPipeline, iter_directory_sources
+from cnnClassifier.pipeline.batching import MicroBatcher
+from cnnClassifier.utils.model_registry import model_registry
 
 
 os.putenv("LANG", "en_US.UTF-8")
 os.putenv("LC_ALL", "en_US.UTF-8")
 
-app = Flask(__name__)
-CORS(app)
+bp = Blueprint("classifier", __name__)
+
+
+def configure_tf_threads() -> None:
+    """
+    Applies TF_NUM_INTRAOP_THREADS and TF_NUM_INTEROP_THREADS, when set, before
+    TensorFlow runs its first op. gunicorn.conf.py sets them per worker, and
+    ClientApp.load applies them after fork, never in the gunicorn master.
+    """
+    intra = os.environ.get("TF_NUM_INTRAOP_THREADS")
+    inter = os.environ.get("TF_NUM_INTEROP_THREADS")
+    if not intra and not inter:
+        return
+    import tensorflow as tf
+    try:
+        if intra:
+            tf.config.threading.set_intra_op_parallelism_threads(int(intra))
+        if inter:
+            tf.config.threading.set_inter_op_parallelism_threads(int(inter))
+    except RuntimeError:
+        logger.warning("TensorFlow is already initialized, thread settings not applied")
 
 
 class ClientApp:
-    def __init__(self):
-        self.filename = "inputImage.jpg"
-        self.classifier = PredictionPipeline(self.filename)
+    def __init__(self, load_model: bool = True):
+        self.classifier = PredictionPipeline()
+        if load_model:
+            self.load()  # load and warm up once at startup
+        config = self.classifier.config
+        self.batcher = None
+        if config.batching:
+            self.batcher = MicroBatcher(
+                predict_fn=self.classifier.predict_proba,
+                max_batch_size=config.max_batch_size,
+                max_wait_ms=config.max_wait_ms,
+            )
+
+    def predict(self, data, version=None):
+        if self.batcher is None:
+            return self.classifier.predict_bytes(data, version)
+        probabilities = self.batcher.predict(self.classifier.decode(data))
+        return self.classifier.to_response(probabilities, version)
+
+    def load(self):
+        configure_tf_threads()
+        self.classifier.load_model()
+
+    def preload(self):
+        # before fork only the bytes of a TFLite model are read; see gunicorn.conf.py
+        model_registry.preload_bytes(self.classifier.config.model_path)
+
 
+def client() -> ClientApp:
+    return current_app.extensions["classifier"]
 
-@app.route("/", methods=["GET"])
+
+def response_version():
+    """
+    Reads the requested response version from the "version" query parameter
+    or JSON field. None selects the configured default.
+    """
+    version = request.args.get("version")
+    if version is None and request.is_json:
+        body = request.get_json(silent=True)
+        version = body.get("version") if isinstance(body, dict) else None
+    if version is None:
+        return None
+    try:
+        version = int(version)
+    except (TypeError, ValueError):
+        version = None
+    if version not in RESPONSE_VERSIONS:
+        raise ValueError(f"version must be one of {list(RESPONSE_VERSIONS)}")
+    return version
+
+
+@bp.route("/", methods=["GET"])
 @cross_origin()
 def home():
     return render_template("index.html")
 
 
-@app.route("/train", methods=["GET", "POST"])
+@bp.route("/train", methods=["GET", "POST"])
 @cross_origin()
 def trainRoute():
     os.system("dvc repro")
     return "Training done successfully!"
 
 
-@app.route("/predict", methods=["POST"])
+@bp.route("/predict", methods=["POST"])
 @cross_origin()
 def predictRoute():
     image = request.json["image"]  # base 64 data
-    decodeImage(image, clApp.filename)
-    result = clApp.classifier.predict()
+    try:
+        version = response_version()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    result = client().predict(decodeImageBytes(image), version)
     return jsonify(result)
 
 
+@bp.route("/predict_batch", methods=["POST"])
+@cross_origin()
+def predictBatchRoute():
+    """
+    Accepts multipart files, {"images": [base64, ...]} or {"directory": path}
+    (relative to prediction.batch_input_root) and streams one JSON line per image.
+    An optional "version" selects the response version of every line.
+    """
+    config = client().classifier.config
+    try:
+        version = response_version()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    body = request.get_json(silent=True)
+    if request.files:
+        files = request.files.getlist("files") or list(request.files.values())
+        sources = [(f.filename, f.read) for f in files]
+    elif not isinstance(body, dict) or ("images" not in body and "directory" not in body):
+        return jsonify({"error": 'expected multipart files or a JSON body with "images" or "directory"'}), 400
+    elif "images" in body:
+        if not isinstance(body["images"], list):
+            return jsonify({"error": '"images" must be a list'}), 400
+        sources = []
+        for index, item in enumerate(body["images"]):
+            if isinstance(item, str):
+                name, data = str(index), item
+            elif isinstance(item, dict) and isinstance(item.get("image"), str):
+                name, data = str(item.get("name", index)), item["image"]
+            else:
+                return jsonify({
+                    "error": f'images[{index}] must be a base64 string or an object with an "image" string',
+                }), 400
+            sources.append((name, lambda data=data: decodeImageBytes(data)))
+    elif not isinstance(body["directory"], str):
+        return jsonify({"error": '"directory" must be a string'}), 400
+    else:
+        root = Path(config.batch_input_root).resolve()
+        directory = (root / body["directory"]).resolve()
+        if root not in directory.parents and directory != root:
+            return jsonify({"error": "directory must be inside the batch input root"}), 400
+        sources = iter_directory_sources(directory)
+
+    records = client().classifier.predict_stream(
+        sources,
+        batch_size=config.max_batch_size,
+        workers=config.decode_workers,
+        version=version,
+    )
+    lines = (json.dumps(record) + "\n" for record in records)
+    return Response(stream_with_context(lines), mimetype="application/x-ndjson")
+
+
+@bp.route("/model/stats", methods=["GET"])
+@cross_origin()
+def modelStatsRoute():
+    return jsonify(model_registry.stats())
+
+
+@bp.route("/metrics", methods=["GET"])
+@cross_origin()
+def metricsRoute():
+    metrics = {"model": model_registry.stats()}
+    if client().batcher is not None:
+        metrics["batching"] = client().batcher.stats()
+    return jsonify(metrics)
+
+
+def create_app(load_model: bool = True) -> Flask:
+    """
+    Creates the Flask application.
+
+    Args:
+        load_model (bool, optional): Load and warm up the model now. Defaults to True;
+            wsgi.py passes False because TensorFlow must not run before gunicorn
+            forks, and every worker loads the model in post_fork instead.
+
+    Returns:
+        Flask: The application.
+    """
+    app = Flask(__name__)
+    CORS(app)
+    app.extensions["classifier"] = ClientApp(load_model=load_model)
+    app.register_blueprint(bp)
+    return app
+
+
 if __name__ == "__main__":
-    clApp = ClientApp()
-    app.run(host="0.0.0.0", port=8080, debug=1)  # local host
+    # development server; serve production traffic with: gunicorn -c gunicorn.conf.py wsgi:app
+    app = create_app()
+    app.run(host="0.0.0.0", port=8080, debug=os.environ.get("FLASK_DEBUG") == "1")  # local host
     # app.run(host='0.0.0.0', port=8080) #for AWS
     # app.run(host='0.0.0.0', port=80) #for AZURE
@@ -0,0 +1,65 @@
+"""
+gunicorn -c gunicorn.conf.py wsgi:app
+
+The CPU cores are split between the workers: each worker gets
+cores // workers TensorFlow intra-op threads and a single inter-op thread,
+so the workers together never run more inference threads than there are
+cores. HTTP threads mostly wait on the micro-batcher and are cheap.
+
+Under gunicorn the model is served from its TFLite export by default
+(PREDICTION_BACKEND, "dynamic" unless set), with preload_app on: the
+master reads the .tflite bytes without importing TensorFlow, and every
+worker's interpreter runs from that buffer, so the weights are in memory
+once and shared copy-on-write. The master never imports TensorFlow; the
+workers start it after fork.
+
+PREDICTION_BACKEND=keras serves the Keras model instead, with one copy of
+the model per worker: TensorFlow does not support fork once its runtime
+has started and loading a Keras model starts it, so the model cannot be
+loaded in the master. preload_app is therefore off for Keras, and
+PRELOAD_APP=1 is rejected.
+
+Environment overrides: WEB_CONCURRENCY (workers), GUNICORN_THREADS
+(HTTP threads per worker), TF_NUM_INTRAOP_THREADS, TF_NUM_INTEROP_THREADS,
+PORT, PREDICTION_BACKEND and PRELOAD_APP.
+"""
+import os
+
+# read by ConfigurationManager.get_prediction_config when wsgi.py builds the app
+backend = os.environ.setdefault("PREDICTION_BACKEND", "dynamic")
+
+cores = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+
+workers = int(os.environ.get("WEB_CONCURRENCY", max(1, cores // 4)))
+threads = int(os.environ.get("GUNICORN_THREADS", 8))
+worker_class = "gthread"
+
+# read by TensorFlow when it initializes, which happens after this file is loaded
+os.environ.setdefault("TF_NUM_INTRAOP_THREADS", str(max(1, cores // workers)))
+os.environ.setdefault("TF_NUM_INTEROP_THREADS", "1")
+os.environ.setdefault("OMP_NUM_THREADS", os.environ["TF_NUM_INTRAOP_THREADS"])
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8080')}"
+preload_app = os.environ.get("PRELOAD_APP", "0" if backend == "keras" else "1") == "1"
+if preload_app and backend == "keras":
+    raise RuntimeError("PRELOAD_APP=1 needs a TFLite prediction backend; Keras models cannot be loaded before fork")
+timeout = 120
+graceful_timeout = 30
+keepalive = 5
+
+
+def when_ready(server):
+    # runs in the master after the app is imported and before any worker is forked
+    if preload_app:
+        import wsgi
+        wsgi.app.extensions["classifier"].preload()
+
+
+def post_fork(server, worker):
+    # every worker starts its own TensorFlow runtime and loads (and warms up) the model
+    import wsgi
+    wsgi.app.extensions["classifier"].load()
+    server.log.info(
+        f"worker {worker.pid}: {threads} HTTP threads, "
+        f"{os.environ['TF_NUM_INTRAOP_THREADS']} intra-op / {os.environ['TF_NUM_INTEROP_THREADS']} inter-op threads"
+    )
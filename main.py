@@ -1,8 +1,11 @@
+import argparse
 from cnnClassifier import logger
 from cnnClassifier.pipeline.stage_01_data_ingestion import DataIngestionTrainingPipeline
 from cnnClassifier.pipeline.stage_02_prepare_base_model import PrepareBaseModelTrainingPipeline
 from cnnClassifier.pipeline.stage_03_training import ModelTrainingPipeline
 from cnnClassifier.pipeline.stage_04_evaluation import EvaluationPipeline
+from cnnClassifier.pipeline.stage_05_model_export import ModelExportPipeline
+from cnnClassifier.pipeline.in_memory import InMemoryPipeline
 
 def run_pipeline(stage_name, pipeline_instance):
     """
@@ -27,7 +30,17 @@ def run_pipeline(stage_name, pipeline_instance):
 
 
 if __name__ == "__main__":
-    run_pipeline("Data Ingestion", DataIngestionTrainingPipeline())
-    run_pipeline("Prepare base model", PrepareBaseModelTrainingPipeline())
-    run_pipeline("Training model", ModelTrainingPipeline())
-    run_pipeline("Evaluating model", EvaluationPipeline())
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Run the training pipeline.")
+    parser.add_argument(
+        "--in-memory", action="store_true",
+        help="run all stages in one process, passing models between them in memory",
+    )
+    args = parser.parse_args()
+    if args.in_memory:
+        run_pipeline("In-memory pipeline", InMemoryPipeline())
+    else:
+        run_pipeline("Data Ingestion", DataIngestionTrainingPipeline())
+        run_pipeline("Prepare base model", PrepareBaseModelTrainingPipeline())
+        run_pipeline("Training model", ModelTrainingPipeline())
+        run_pipeline("Evaluating model", EvaluationPipeline())
+        run_pipeline("Exporting model", ModelExportPipeline())
\ No newline at end of file
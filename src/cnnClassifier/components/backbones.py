@@ -0,0 +1,110 @@
+import re
+import tensorflow as tf
+from typing import Callable, List, Tuple
+
+applications = tf.keras.applications
+
+# name -> (constructor, preprocess_input). MobileNetV3 and EfficientNet
+# normalise inside the model, so their preprocess_input passes [0, 255]
+# pixels through unchanged.
+BACKBONES = {
+    "VGG16": (applications.vgg16.VGG16, applications.vgg16.preprocess_input),
+    "ResNet50": (applications.resnet50.ResNet50, applications.resnet50.preprocess_input),
+    "MobileNetV2": (applications.mobilenet_v2.MobileNetV2, applications.mobilenet_v2.preprocess_input),
+    "MobileNetV3Small": (applications.MobileNetV3Small, applications.mobilenet_v3.preprocess_input),
+    "MobileNetV3Large": (applications.MobileNetV3Large, applications.mobilenet_v3.preprocess_input),
+    "EfficientNetB0": (applications.efficientnet.EfficientNetB0, applications.efficientnet.preprocess_input),
+}
+
+# Layer-name prefixes that identify a conv block in keras.applications
+# models: VGG16 "block5_conv1", ResNet50 "conv5_block3_1_conv", MobileNetV2
+# "block_16_expand", EfficientNet "block7a_expand_conv", MobileNetV3
+# "expanded_conv_10_expand".
+BLOCK_PATTERN = re.compile(r"^(conv\d+_block\d+|block_\d+|block\d+[a-z]?|expanded_conv(?:_\d+)?)[_/]")
+
+HEADS = {
+    "flatten": tf.keras.layers.Flatten,
+    "gap": tf.keras.layers.GlobalAveragePooling2D,
+}
+
+
+def get_backbone(name: str) -> Tuple[Callable, Callable]:
+    """
+    Returns the constructor and preprocess_input of a backbone.
+
+    Args:
+        name (str): One of BACKBONES.
+
+    Returns:
+        tuple: (keras.applications constructor, preprocess_input function).
+    """
+    if name not in BACKBONES:
+        raise ValueError(f"unknown BACKBONE {name!r}, expected one of {sorted(BACKBONES)}")
+    return BACKBONES[name]
+
+
+def get_preprocess_input(name: str) -> Callable:
+    """
+    Returns the preprocess_input of a backbone, mapping [0, 255] RGB pixels
+    to what the backbone was trained on.
+
+    Args:
+        name (str): One of BACKBONES.
+
+    Returns:
+        Callable: Works on numpy arrays and tensors alike.
+    """
+    return get_backbone(name)[1]
+
+
+def conv_blocks(model: tf.keras.Model) -> List[str]:
+    """
+    Returns the conv block names of a model, in layer order.
+    """
+    blocks = []
+    for layer in model.layers:
+        match = BLOCK_PATTERN.match(layer.name)
+        if match and match.group(1) not in blocks:
+            blocks.append(match.group(1))
+    return blocks
+
+
+def freeze_layers(model: tf.keras.Model, trainable_from: int) -> None:
+    """
+    Freezes every layer before index `trainable_from` and unfreezes the rest,
+    except BatchNormalization layers, which stay frozen so their statistics
+    are not re-estimated from small fine-tuning batches.
+
+    Args:
+        model (tf.keras.Model): Model whose layers are (un)frozen in place.
+        trainable_from (int): Index of the first trainable layer.
+    """
+    model.trainable = True
+    for index, layer in enumerate(model.layers):
+        layer.trainable = index >= trainable_from and not isinstance(
+            layer, tf.keras.layers.BatchNormalization
+        )
+
+
+def unfreeze_top_blocks(model: tf.keras.Model, num_blocks: int) -> List[str]:
+    """
+    Makes the last `num_blocks` conv blocks and every layer after them
+    trainable, and freezes everything before.
+
+    Args:
+        model (tf.keras.Model): Full model built on a keras.applications backbone.
+        num_blocks (int): Conv blocks to unfreeze, counted from the top.
+
+    Returns:
+        list: Names of the unfrozen blocks.
+    """
+    blocks = conv_blocks(model)
+    if not blocks:
+        raise ValueError(f"no conv blocks found in model {model.name!r}")
+    unfrozen = blocks[-num_blocks:]
+    for index, layer in enumerate(model.layers):
+        match = BLOCK_PATTERN.match(layer.name)
+        if match and match.group(1) == unfrozen[0]:
+            freeze_layers(model, trainable_from=index)
+            break
+    return unfrozen
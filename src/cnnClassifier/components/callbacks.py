@@ -0,0 +1,122 @@
+import math
+import time
+import tensorflow as tf
+from pathlib import Path
+from typing import List
+
+from cnnClassifier import logger
+from cnnClassifier.utils.common import save_json
+
+
+def _learning_rate(model: tf.keras.Model) -> float:
+    return float(tf.keras.backend.get_value(model.optimizer.learning_rate))
+
+
+class CosineAnnealing(tf.keras.callbacks.Callback):
+    """
+    Cosine learning-rate decay over the epochs of each `fit` call, from the
+    optimizer's learning rate at the start of the call down to `min_lr`.
+    A second `fit` call, such as the fine-tuning phase, starts a new cycle
+    from its own learning rate.
+    """
+    def __init__(self, min_lr: float = 0.0) -> None:
+        super().__init__()
+        self.min_lr = min_lr
+
+    def on_train_begin(self, logs=None):
+        self.base_lr = _learning_rate(self.model)
+        self.first_epoch = None
+
+    def on_epoch_begin(self, epoch, logs=None):
+        if self.first_epoch is None:
+            self.first_epoch = epoch
+        total = max(self.params["epochs"] - self.first_epoch, 1)
+        progress = (epoch - self.first_epoch) / total
+        lr = self.min_lr + 0.5 * (self.base_lr - self.min_lr) * (1 + math.cos(math.pi * progress))
+        tf.keras.backend.set_value(self.model.optimizer.learning_rate, lr)
+
+    def on_epoch_end(self, epoch, logs=None):
+        if logs is not None:
+            logs["lr"] = _learning_rate(self.model)
+
+
+class TimeBudget(tf.keras.callbacks.Callback):
+    """
+    Stops training once a wall-clock budget is spent.
+
+    The clock starts with the first `fit` call and keeps running across
+    later ones. Training stops at the end of an epoch when the next epoch
+    would not fit in the remaining budget, or after the current batch once
+    the deadline has passed, so the model is always saved before the deadline
+    is overrun by more than one step.
+    """
+    def __init__(self, budget_minutes: float) -> None:
+        super().__init__()
+        self.budget = 60 * budget_minutes
+        self.start = None
+        self.exhausted = False
+
+    def _remaining(self) -> float:
+        return self.budget - (time.monotonic() - self.start)
+
+    def on_train_begin(self, logs=None):
+        if self.start is None:
+            self.start = time.monotonic()
+        self.epoch_start = None
+        self.epoch_durations = []
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self.epoch_start = time.monotonic()
+
+    def _stop(self, reason: str) -> None:
+        self.exhausted = True
+        self.model.stop_training = True
+        logger.info(f"time budget of {self.budget / 60:.1f} min: {reason}, stopping training")
+
+    def on_train_batch_end(self, batch, logs=None):
+        if self._remaining() <= 0 and not self.model.stop_training:
+            self._stop("deadline reached mid-epoch")
+
+    def on_epoch_end(self, epoch, logs=None):
+        self.epoch_durations.append(time.monotonic() - self.epoch_start)
+        mean_epoch = sum(self.epoch_durations) / len(self.epoch_durations)
+        if not self.model.stop_training and self._remaining() < mean_epoch:
+            self._stop(f"{self._remaining():.0f}s left, epochs take {mean_epoch:.0f}s")
+
+
+class RunMetadata(tf.keras.callbacks.Callback):
+    """
+    Records the callback settings and, per `fit` call, how the run went
+    (epochs run, learning rates, early stop, time budget), and writes them
+    to a JSON file at the end of every call.
+    """
+    def __init__(self, path: Path, settings: dict, callbacks: List[tf.keras.callbacks.Callback]) -> None:
+        super().__init__()
+        self.path = Path(path)
+        self.callbacks = callbacks
+        self.metadata = {"callbacks": settings, "phases": []}
+
+    def on_train_begin(self, logs=None):
+        self.phase = {
+            "started_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "initial_lr": _learning_rate(self.model),
+            "epochs": [],
+        }
+        self._start = time.monotonic()
+
+    def on_epoch_end(self, epoch, logs=None):
+        self.phase["epochs"].append({
+            "epoch": epoch + 1,
+            "lr": _learning_rate(self.model),
+            **{key: float(value) for key, value in (logs or {}).items()},
+        })
+
+    def on_train_end(self, logs=None):
+        self.phase["duration_s"] = round(time.monotonic() - self._start, 1)
+        for callback in self.callbacks:
+            if isinstance(callback, tf.keras.callbacks.EarlyStopping):
+                self.phase["early_stopped_epoch"] = callback.stopped_epoch or None
+            elif isinstance(callback, TimeBudget):
+                self.phase["time_budget_exhausted"] = callback.exhausted
+        self.metadata["phases"].append(self.phase)
+        save_json(path=self.path, data=self.metadata)
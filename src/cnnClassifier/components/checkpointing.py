@@ -0,0 +1,126 @@
+import json
+import random
+import shutil
+import tempfile
+import numpy as np
+import tensorflow as tf
+from pathlib import Path
+
+from cnnClassifier import logger
+from cnnClassifier.components.distribution import is_chief
+
+
+class TrainingCheckpoint(tf.keras.callbacks.Callback):
+    """
+    Periodic full-state training checkpoints with tf.train.CheckpointManager.
+
+    A checkpoint holds the model weights, the optimizer state (slots and
+    iteration count), the number of completed epochs and TensorFlow's global
+    random generator. The NumPy and Python random states, which drive the
+    `flow_from_directory` shuffle, go to a JSON sidecar next to it.
+    Checkpoints are taken at epoch boundaries, so the data iterator position
+    is always the start of the next epoch. Only the newest `max_to_keep`
+    checkpoints are kept.
+
+    Methods:
+        __init__: Initializes the TrainingCheckpoint object.
+        attach: Tracks a (re)built or recompiled model and its optimizer.
+        latest_epoch: Returns the epoch of the newest checkpoint without restoring it.
+        restore_latest: Restores the newest checkpoint that loads cleanly.
+        remove: Deletes the checkpoints written by this process.
+    """
+    def __init__(self, directory: Path, every_epochs: int = 1, max_to_keep: int = 3) -> None:
+        """
+        Initializes the TrainingCheckpoint object.
+
+        Args:
+            directory (Path): Directory of this run's checkpoints.
+            every_epochs (int, optional): Epochs between checkpoints. Defaults to 1.
+            max_to_keep (int, optional): Checkpoints kept on disk. Defaults to 3.
+        """
+        super().__init__()
+        self.directory = Path(directory)
+        # in multi-worker training every worker saves, but only the chief to
+        # `directory`; all workers restore from it
+        self.save_directory = self.directory if is_chief() else Path(tempfile.mkdtemp(prefix="worker_ckpt_"))
+        self.every_epochs = every_epochs
+        self.max_to_keep = max_to_keep
+        self.epoch = tf.Variable(0, dtype=tf.int64, trainable=False)
+        self.manager = None
+
+    def attach(self, model: tf.keras.Model) -> None:
+        """
+        Tracks a (re)built or recompiled model and its optimizer. Call again
+        whenever either object is replaced.
+
+        Args:
+            model (tf.keras.Model): Compiled model being trained.
+        """
+        self.checkpoint = tf.train.Checkpoint(
+            model=model,
+            optimizer=model.optimizer,
+            epoch=self.epoch,
+            rng=tf.random.get_global_generator(),
+        )
+        self.manager = tf.train.CheckpointManager(
+            self.checkpoint, directory=str(self.save_directory), max_to_keep=self.max_to_keep
+        )
+
+    @staticmethod
+    def _sidecar(path: str) -> Path:
+        return Path(f"{path}.rng.json")
+
+    def latest_epoch(self) -> int:
+        """
+        Returns the epoch of the newest checkpoint without restoring it, 0 when there is none.
+        """
+        latest = tf.train.latest_checkpoint(str(self.directory))
+        return int(latest.rsplit("-", 1)[1]) if latest else 0
+
+    def restore_latest(self) -> int:
+        """
+        Restores the newest checkpoint that loads cleanly, falling back to
+        older ones when a checkpoint is incomplete or corrupt.
+
+        Returns:
+            int: Completed epochs of the restored checkpoint, 0 when none was restored.
+        """
+        state = tf.train.get_checkpoint_state(str(self.directory))
+        paths = list(state.all_model_checkpoint_paths) if state else []
+        for path in reversed(paths):
+            try:
+                self.checkpoint.restore(path).assert_existing_objects_matched()
+                with open(self._sidecar(path)) as f:
+                    rng_state = json.load(f)
+            except (tf.errors.OpError, AssertionError, ValueError, OSError) as e:
+                logger.warning(f"skipping unusable checkpoint {path}: {e}")
+                continue
+            kind, keys, pos, has_gauss, cached_gaussian = rng_state["numpy"]
+            np.random.set_state((kind, np.array(keys, dtype=np.uint32), pos, has_gauss, cached_gaussian))
+            version, internal, gauss = rng_state["python"]
+            random.setstate((version, tuple(internal), gauss))
+            logger.info(f"resumed from checkpoint {path} after epoch {int(self.epoch.numpy())}")
+            return int(self.epoch.numpy())
+        return 0
+
+    def on_epoch_end(self, epoch, logs=None):
+        if (epoch + 1) % self.every_epochs:
+            return
+        self.epoch.assign(epoch + 1)
+        path = self.manager.save(checkpoint_number=epoch + 1)
+        kind, keys, pos, has_gauss, cached_gaussian = np.random.get_state()
+        version, internal, gauss = random.getstate()
+        with open(self._sidecar(path), "w") as f:
+            json.dump({
+                "numpy": [kind, keys.tolist(), int(pos), int(has_gauss), float(cached_gaussian)],
+                "python": [version, list(internal), gauss],
+            }, f)
+        for stale in self.save_directory.glob("*.rng.json"):
+            if str(stale)[:-len(".rng.json")] not in self.manager.checkpoints:
+                stale.unlink()
+
+    def remove(self) -> None:
+        """
+        Deletes the checkpoints written by this process, once training has finished.
+        """
+        shutil.rmtree(self.save_directory, ignore_errors=True)
@@ -1,9 +1,20 @@
 import os
+import time
+import shutil
+import zlib
+import threading
 import urllib.request as request
 import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from http.client import IncompleteRead
+from urllib.error import HTTPError, URLError
+from tqdm import tqdm
 from cnnClassifier import logger
-from cnnClassifier.utils.common import get_size
+from cnnClassifier.utils.common import get_size, file_sha256
 from cnnClassifier.entity.config_entity import DataIngestionConfig
+from cnnClassifier.components.image_store import PreprocessedImageStore
+from cnnClassifier.components.manifest import DatasetManifest, IMAGE_EXTENSIONS
+from cnnClassifier.components.split_index import SplitIndex
 from pathlib import Path
 
 
@@ -14,6 +25,10 @@ class DataIngestion:
     Attributes:
         config (DataIngestionConfig): Configuration object containing data ingestion settings.
     """
+    CHUNK_SIZE = 1 << 20
+    MAX_RETRIES = 5
+    # source_sha256 value that explicitly turns off download verification
+    UNPINNED = "unpinned"
 
     def __init__(self, config: DataIngestionConfig):
         """
@@ -23,33 +38,244 @@ class DataIngestion:
             config (DataIngestionConfig): Configuration object containing data ingestion settings.
         """
         self.config = config
-    
+        if not config.source_sha256:
+            raise ValueError(
+                f"data_ingestion.source_sha256 is not set; pin the archive's sha256 "
+                f"or set it to {self.UNPINNED!r} to download without verification"
+            )
+        self.expected_sha256 = None if config.source_sha256 == self.UNPINNED else config.source_sha256.lower()
+
+    def _is_complete(self, path: Path) -> bool:
+        """
+        Checks a downloaded archive against the configured sha256, or, when
+        unpinned, that it at least has a readable zip directory.
+        """
+        if not os.path.exists(path):
+            return False
+        if self.expected_sha256:
+            return file_sha256(path) == self.expected_sha256
+        return zipfile.is_zipfile(path)
+
+    @staticmethod
+    def _is_transient(error: Exception) -> bool:
+        """
+        Tells dropped connections, timeouts and server errors, which are worth
+        retrying, from client errors such as 403 or 404, which are not.
+        """
+        if isinstance(error, HTTPError):
+            return error.code >= 500
+        return isinstance(error, (URLError, IncompleteRead, ConnectionError, TimeoutError))
+
+    def _stream_to(self, url: str, part_path: Path) -> None:
+        """
+        Streams `url` into `part_path`, continuing from the bytes already there
+        with an HTTP Range request.
+        """
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+        try:
+            response = request.urlopen(request.Request(url, headers=headers), timeout=60)
+        except HTTPError as e:
+            if e.code == 416 and offset:  # nothing left to fetch
+                return
+            raise
+
+        with response:
+            if offset and response.status != 206:
+                logger.info("server ignored the range request, downloading from the start")
+                offset = 0
+            length = response.headers.get("Content-Length")
+            total = int(length) + offset if length is not None else None
+            with open(part_path, "ab" if offset else "wb") as f, tqdm(
+                total=total, initial=offset, unit="B", unit_scale=True, desc=os.path.basename(url)
+            ) as progress:
+                for chunk in iter(lambda: response.read(self.CHUNK_SIZE), b""):
+                    f.write(chunk)
+                    progress.update(len(chunk))
+            if total is not None and os.path.getsize(part_path) < total:
+                raise IncompleteRead(b"", total - os.path.getsize(part_path))
+
     def download_file(self) -> None:
         """
         Downloads the data file from the specified source URL.
 
+        The file is streamed in chunks to `<local_data_file>.part` and resumed
+        with HTTP Range requests after a dropped connection or an interrupted
+        run. It is only moved into place once it matches `source_sha256`
+        (unless that is "unpinned"), so a truncated file is never mistaken
+        for a finished download.
+
         Returns:
             None
         """
-        if not os.path.exists(self.config.local_data_file):
-            filename, headers = request.urlretrieve(
-                url = self.config.source_URL,
-                filename = self.config.local_data_file
-            )
-            logger.info(f"{filename} download! with following info: \n{headers}")
+        local_data_file = Path(self.config.local_data_file)
+        if self._is_complete(local_data_file):
+            logger.info(f"File already exists of size: {get_size(local_data_file)}")
+            return
+
+        part_path = Path(f"{local_data_file}.part")
+        for attempt in range(1, self.MAX_RETRIES + 1):
+            try:
+                self._stream_to(self.config.source_URL, part_path)
+                break
+            except (URLError, IncompleteRead, ConnectionError, TimeoutError) as e:
+                if attempt == self.MAX_RETRIES or not self._is_transient(e):
+                    raise
+                logger.info(f"download interrupted ({e}), resuming, attempt {attempt + 1}")
+                time.sleep(min(2 ** attempt, 30))
+
+        if self.expected_sha256:
+            digest = file_sha256(part_path)
+            if digest != self.expected_sha256:
+                os.remove(part_path)
+                raise ValueError(
+                    f"sha256 mismatch for {self.config.source_URL}: "
+                    f"expected {self.expected_sha256}, got {digest}"
+                )
         else:
-            logger.info(f"File already exists of size: {get_size(Path(self.config.local_data_file))}")  
+            logger.warning(
+                f"data_ingestion.source_sha256 is {self.UNPINNED!r}, downloaded {self.config.source_URL} unverified "
+                f"(sha256 {file_sha256(part_path)})"
+            )
+        os.replace(part_path, local_data_file)
+        logger.info(f"{local_data_file} downloaded, size: {get_size(local_data_file)}")
+
+    @staticmethod
+    def _member_path(unzip_path: str, member: zipfile.ZipInfo) -> str:
+        # Same sanitising ZipFile.extract applies: no drive, no absolute path, no "..".
+        arcname = member.filename.replace("/", os.path.sep)
+        arcname = os.path.splitdrive(arcname)[1]
+        parts = (x for x in arcname.split(os.path.sep) if x not in ("", os.path.curdir, os.path.pardir))
+        return os.path.join(unzip_path, *parts)
+
+    @staticmethod
+    def _is_up_to_date(path: str, member: zipfile.ZipInfo) -> bool:
+        if not os.path.isfile(path) or os.path.getsize(path) != member.file_size:
+            return False
+        crc = 0
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                crc = zlib.crc32(chunk, crc)
+        return crc == member.CRC
 
-    
     def extract_zip_file(self) -> None:
         """
         Extracts the contents of the downloaded zip file.
 
+        Members are extracted in parallel, each thread reading through its own
+        handle on the archive. Their directories are created up front, so the
+        threads only write files. Files that already exist with the member's
+        size and CRC-32 are left untouched.
+
         Returns:
             None
         """
         unzip_path = self.config.unzip_dir
         os.makedirs(unzip_path, exist_ok=True)
         with zipfile.ZipFile(self.config.local_data_file, 'r') as zip_ref:
-            zip_ref.extractall(unzip_path)
-            
\ No newline at end of file
+            members = [
+                member for member in zip_ref.infolist()
+                if not member.is_dir()
+                and not self._is_up_to_date(self._member_path(unzip_path, member), member)
+            ]
+            total = len(zip_ref.infolist())
+
+        if not members:
+            logger.info(f"all {total} archive members already extracted to {unzip_path}")
+            return
+
+        # ZipFile.extract creates parent directories without exist_ok and races
+        # between threads, so the directories are made here and members are
+        # written through files opened by hand
+        for directory in {os.path.dirname(self._member_path(unzip_path, member)) for member in members}:
+            os.makedirs(directory, exist_ok=True)
+
+        handles, opened = threading.local(), []
+
+        def _extract(member: zipfile.ZipInfo) -> None:
+            if not hasattr(handles, "zip_ref"):
+                handles.zip_ref = zipfile.ZipFile(self.config.local_data_file, 'r')
+                opened.append(handles.zip_ref)
+            with handles.zip_ref.open(member) as source, \
+                    open(self._member_path(unzip_path, member), "wb") as target:
+                shutil.copyfileobj(source, target, self.CHUNK_SIZE)
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.config.extract_workers) as executor:
+                list(executor.map(_extract, members))
+        finally:
+            for zip_ref in opened:
+                zip_ref.close()
+        logger.info(f"extracted {len(members)} of {total} archive members to {unzip_path}")
+
+    def ingest_extra_folders(self) -> None:
+        """
+        Copies images from the configured extra folders (laid out as
+        <folder>/<label>/<image>) into the dataset directory. Files already
+        present with the same size and content are skipped.
+
+        Returns:
+            None
+        """
+        copied = 0
+        for extra_dir in self.config.extra_data_dirs:
+            extra_dir = Path(extra_dir)
+            if not extra_dir.is_dir():
+                logger.info(f"extra data folder not found, skipping: {extra_dir}")
+                continue
+            for source in sorted(extra_dir.rglob("*")):
+                if not source.is_file() or source.suffix.lower() not in IMAGE_EXTENSIONS:
+                    continue
+                relative = source.relative_to(extra_dir)
+                if len(relative.parts) < 2:
+                    continue
+                target = Path(self.config.data_dir) / relative
+                if (
+                    target.exists()
+                    and target.stat().st_size == source.stat().st_size
+                    and file_sha256(target) == file_sha256(source)
+                ):
+                    continue
+                os.makedirs(target.parent, exist_ok=True)
+                shutil.copy2(source, target)
+                copied += 1
+        if self.config.extra_data_dirs:
+            logger.info(f"copied {copied} new or changed images from extra data folders")
+
+    def update_manifest(self) -> DatasetManifest:
+        """
+        Refreshes the dataset manifest, hashing only new or changed files, and
+        writes the stratified train/validation split index derived from it.
+
+        Returns:
+            DatasetManifest: The updated manifest.
+        """
+        manifest = DatasetManifest(
+            manifest_file=self.config.manifest_file,
+            data_dir=self.config.data_dir,
+        )
+        manifest.update(
+            validation_split=self.config.params_validation_split,
+            seed=self.config.params_split_seed,
+        )
+        SplitIndex.from_manifest(manifest).save(self.config.split_index_file)
+        return manifest
+
+    def build_image_store(self) -> None:
+        """
+        Decodes and resizes the images listed in the manifest once into the
+        shared preprocessed image store. Only new or changed files are decoded.
+
+        Returns:
+            None
+        """
+        manifest = DatasetManifest(
+            manifest_file=self.config.manifest_file,
+            data_dir=self.config.data_dir,
+        )
+        image_paths = [path for path, _ in manifest.files()]
+        store = PreprocessedImageStore(
+            root_dir=self.config.image_store_dir,
+            image_size=self.config.params_image_size,
+        )
+        store.build(image_paths)
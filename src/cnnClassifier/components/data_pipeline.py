@@ -0,0 +1,285 @@
+import os
+import math
+import hashlib
+import numpy as np
+import tensorflow as tf
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+from cnnClassifier.components.image_store import PreprocessedImageStore
+from cnnClassifier.components.split_index import SplitIndex
+
+AUTOTUNE = tf.data.AUTOTUNE
+
+
+def rescale(images):
+    """
+    The original `rescale=1./255` preprocessing, used when no backbone
+    preprocess_input is given.
+    """
+    return images / 255.0
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+class RandomShear(tf.keras.layers.Layer):
+    """
+    Shears every image of a batch by its own random angle, the way
+    `ImageDataGenerator(shear_range=...)` does: the angle is drawn uniformly
+    from [-shear_range, shear_range] degrees, the shear is about the image
+    centre and the border is filled with the nearest pixel.
+    """
+    def __init__(self, shear_range: float, **kwargs) -> None:
+        """
+        Initializes the RandomShear layer.
+
+        Args:
+            shear_range (float): Largest shear angle in degrees.
+        """
+        super().__init__(**kwargs)
+        self.shear_range = shear_range
+
+    def call(self, images, training=True):
+        if not training or not self.shear_range:
+            return images
+        batch = tf.shape(images)[0]
+        width = tf.cast(tf.shape(images)[2], tf.float32)
+        angle = tf.random.uniform([batch], -self.shear_range, self.shear_range) * (math.pi / 180)
+        cos, sin = tf.cos(angle), tf.sin(angle)
+        # ImageDataGenerator's output-to-input shear matrix [[1, -sin], [0, cos]]
+        # in (column, row) coordinates, about the centre it uses for the row (w / 2 - 0.5)
+        center = width / 2 - 0.5
+        zeros, ones = tf.zeros_like(angle), tf.ones_like(angle)
+        transforms = tf.stack([ones, -sin, sin * center, zeros, cos, center * (1 - cos), zeros, zeros], axis=1)
+        return tf.raw_ops.ImageProjectiveTransformV3(
+            images=images,
+            transforms=transforms,
+            output_shape=tf.shape(images)[1:3],
+            fill_value=0.0,
+            interpolation="BILINEAR",
+            fill_mode="NEAREST",
+        )
+
+    def get_config(self) -> dict:
+        return {**super().get_config(), "shear_range": self.shear_range}
+
+
+class ImageDatasetLoader:
+    """
+    A tf.data replacement for `ImageDataGenerator.flow_from_directory`.
+
+    Files and their split come from the `SplitIndex` written at ingestion.
+    Without one, files are listed once and split per class exactly like
+    `flow_from_directory(validation_split=...)` does. Images are decoded and resized in
+    parallel, cached as uint8 (in memory or in a cache file), and augmentation
+    runs afterwards as batched ops so it is not repeated per image in Python.
+    When a built `PreprocessedImageStore` is given, batches are gathered
+    straight from its memory map and nothing is decoded.
+
+    Methods:
+        __init__: Initializes the ImageDatasetLoader object.
+        list_files: Lists the files and labels of a subset.
+        decode_file: Reads, decodes and resizes one image file to a uint8 tensor.
+        augmentation: Returns the batched augmentation model.
+        build: Returns a batched, prefetched dataset for a subset.
+    """
+    def __init__(
+        self,
+        data_dir: Path,
+        image_size: list,
+        batch_size: int,
+        validation_split: float,
+        cache: str = "memory",
+        cache_dir: Optional[Path] = None,
+        store: Optional[PreprocessedImageStore] = None,
+        split_index: Optional[SplitIndex] = None,
+        preprocess_input: Callable = rescale,
+    ) -> None:
+        """
+        Initializes the ImageDatasetLoader object.
+
+        Args:
+            data_dir (Path): Directory with one sub-directory per class.
+            image_size (list): [height, width, channels] of the model input.
+            batch_size (int): Batch size.
+            validation_split (float): Fraction of every class used for validation
+                when no split index is given.
+            cache (str, optional): "memory", "file" or "none". Defaults to "memory".
+            cache_dir (Path, optional): Directory for cache files when cache is "file".
+            store (PreprocessedImageStore, optional): Built image store to read from.
+            split_index (SplitIndex, optional): Precomputed split to list files from.
+            preprocess_input (Callable, optional): Maps float [0, 255] pixels to model inputs,
+                normally the backbone's preprocess_input. Defaults to dividing by 255.
+        """
+        self.data_dir = Path(data_dir)
+        self.image_size = list(image_size)
+        self.batch_size = batch_size
+        self.validation_split = validation_split
+        self.cache = cache
+        self.cache_dir = cache_dir
+        self.store = store if store is not None and store.exists else None
+        self.split_index = split_index
+        self.preprocess_input = preprocess_input
+        if self.split_index is not None:
+            self.class_names = self.split_index.class_names
+        else:
+            self.class_names = sorted(
+                entry.name for entry in os.scandir(self.data_dir) if entry.is_dir()
+            )
+
+    def _class_files(self, class_name: str) -> List[str]:
+        class_files = []
+        for root, _, files in sorted(os.walk(self.data_dir / class_name), key=lambda x: x[0]):
+            class_files.extend(
+                os.path.join(root, name) for name in sorted(files)
+                if name.lower().endswith(IMAGE_EXTENSIONS)
+            )
+        return class_files
+
+    def list_files(self, subset: str) -> Tuple[List[str], List[int]]:
+        """
+        Lists the files and labels of a subset.
+
+        Args:
+            subset (str): "training" or "validation".
+
+        Returns:
+            tuple: (file paths, class indices).
+        """
+        if self.split_index is not None:
+            return self.split_index.files(subset)
+
+        paths, labels = [], []
+        for label, class_name in enumerate(self.class_names):
+            class_files = self._class_files(class_name)
+            split_at = int(self.validation_split * len(class_files))
+            selected = class_files[:split_at] if subset == "validation" else class_files[split_at:]
+            paths.extend(selected)
+            labels.extend([label] * len(selected))
+        return paths, labels
+
+    def _cache_path(self, subset: str, paths: List[str]) -> str:
+        # The file list, sizes and mtimes are part of the name so a changed
+        # dataset never reads a stale cache.
+        digest = hashlib.sha1()
+        for path in paths:
+            stat = os.stat(path)
+            digest.update(f"{path}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+        height, width = self.image_size[:2]
+        os.makedirs(self.cache_dir, exist_ok=True)
+        return os.path.join(self.cache_dir, f"{subset}_{height}x{width}_{digest.hexdigest()[:12]}")
+
+    def decode_file(self, path) -> tf.Tensor:
+        """
+        Reads, decodes and resizes one image file to a uint8 tensor.
+
+        Args:
+            path: Scalar string tensor or str.
+
+        Returns:
+            tf.Tensor: uint8 tensor of shape (height, width, 3).
+        """
+        if self.store is None:
+            return self._decode_path(path)
+
+        def _lookup(p):
+            image = self.store.get(p.decode())
+            if image is None:
+                return np.zeros((0, 0, 3), dtype=np.uint8), False
+            return np.asarray(image), True
+
+        # files added since the store was built are decoded instead
+        image, found = tf.numpy_function(_lookup, [path], [tf.uint8, tf.bool])
+        image = tf.cond(
+            found,
+            lambda: tf.ensure_shape(image, (*self.image_size[:2], 3)),
+            lambda: self._decode_path(path),
+        )
+        return tf.ensure_shape(image, (*self.image_size[:2], 3))
+
+    def _decode_path(self, path) -> tf.Tensor:
+        image = tf.io.decode_image(tf.io.read_file(path), channels=3, expand_animations=False)
+        image = tf.image.resize(image, self.image_size[:2], method="bilinear")
+        return tf.saturate_cast(tf.round(image), tf.uint8)
+
+    def _decode(self, path, label):
+        return self.decode_file(path), tf.one_hot(label, len(self.class_names))
+
+    @staticmethod
+    def augmentation() -> tf.keras.Sequential:
+        """
+        Returns the batched augmentation model.
+
+        Mirrors the ImageDataGenerator settings in Training.train_valid_generator.
+        The layers apply the transforms one after another, where the
+        generator composes them into a single resampling.
+        """
+        return tf.keras.Sequential([
+            tf.keras.layers.RandomRotation(40 / 360, fill_mode="nearest"),
+            RandomShear(0.2),
+            tf.keras.layers.RandomFlip("horizontal"),
+            tf.keras.layers.RandomTranslation(0.2, 0.2, fill_mode="nearest"),
+            tf.keras.layers.RandomZoom(0.2, fill_mode="nearest"),
+        ])
+
+    def build(self, subset: str, shuffle: bool = False, augment: bool = False) -> Tuple[tf.data.Dataset, int]:
+        """
+        Returns a batched, prefetched dataset for a subset.
+
+        Args:
+            subset (str): "training" or "validation".
+            shuffle (bool, optional): Reshuffle every epoch. Defaults to False.
+            augment (bool, optional): Apply random augmentation. Defaults to False.
+
+        Returns:
+            tuple: (dataset of (images, one-hot labels) batches, number of samples).
+        """
+        paths, labels = self.list_files(subset)
+        one_hot = tf.one_hot(labels, len(self.class_names))
+
+        if self.store is not None:
+            # rows first: files missing from the store are appended to it
+            rows = self.store.rows(paths)
+            images = self.store.array()
+            dataset = tf.data.Dataset.from_tensor_slices((rows, one_hot))
+            if shuffle:
+                dataset = dataset.shuffle(len(paths), reshuffle_each_iteration=True)
+            dataset = dataset.batch(self.batch_size)
+            dataset = dataset.map(
+                lambda rows, labels: (
+                    tf.ensure_shape(
+                        tf.numpy_function(lambda r: images[r], [rows], tf.uint8),
+                        (None, *self.image_size[:2], 3),
+                    ),
+                    labels,
+                ),
+                num_parallel_calls=AUTOTUNE,
+            )
+        else:
+            dataset = tf.data.Dataset.from_tensor_slices((paths, labels))
+            dataset = dataset.map(self._decode, num_parallel_calls=AUTOTUNE)
+
+            if self.cache == "memory":
+                dataset = dataset.cache()
+            elif self.cache == "file":
+                dataset = dataset.cache(self._cache_path(subset, paths))
+
+            if shuffle:
+                dataset = dataset.shuffle(len(paths), reshuffle_each_iteration=True)
+            dataset = dataset.batch(self.batch_size)
+
+        dataset = dataset.map(
+            lambda images, labels: (tf.cast(images, tf.float32), labels),
+            num_parallel_calls=AUTOTUNE,
+        )
+        if augment:
+            augmentation = self.augmentation()
+            dataset = dataset.map(
+                lambda images, labels: (augmentation(images, training=True), labels),
+                num_parallel_calls=AUTOTUNE,
+            )
+        dataset = dataset.map(
+            lambda images, labels: (self.preprocess_input(images), labels),
+            num_parallel_calls=AUTOTUNE,
+        )
+        return dataset.prefetch(AUTOTUNE), len(paths)
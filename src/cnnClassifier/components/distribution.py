@@ -0,0 +1,93 @@
+import os
+import json
+import shutil
+import tempfile
+import tensorflow as tf
+from pathlib import Path
+
+from cnnClassifier import logger
+
+DISTRIBUTIONS = ("none", "mirrored", "multi_worker")
+
+
+def _tf_config() -> dict:
+    return json.loads(os.environ.get("TF_CONFIG", "{}"))
+
+
+def is_chief() -> bool:
+    """
+    True for the process that writes artifacts: the "chief" task, worker 0
+    when the cluster has no chief, or any process without TF_CONFIG.
+    """
+    config = _tf_config()
+    task = config.get("task", {})
+    if not task:
+        return True
+    if task.get("type") == "chief":
+        return True
+    return task.get("type") == "worker" and task.get("index", 0) == 0 and "chief" not in config.get("cluster", {})
+
+
+def get_strategy(distribution: str, num_local_replicas: int = 2) -> tf.distribute.Strategy:
+    """
+    Builds the tf.distribute strategy for the DISTRIBUTION param. Must run
+    before any other TensorFlow op, since both strategies configure the
+    runtime.
+
+    Args:
+        distribution (str): "none", "mirrored" (replicas on local CPU devices)
+            or "multi_worker" (one replica per process listed in TF_CONFIG).
+        num_local_replicas (int, optional): Logical CPU devices for "mirrored". Defaults to 2.
+
+    Returns:
+        tf.distribute.Strategy: The strategy; the default one for "none".
+    """
+    if distribution not in DISTRIBUTIONS:
+        raise ValueError(f"unknown DISTRIBUTION {distribution!r}, expected one of {list(DISTRIBUTIONS)}")
+    if distribution == "none":
+        return tf.distribute.get_strategy()
+    if distribution == "multi_worker":
+        if not _tf_config():
+            logger.warning("DISTRIBUTION is multi_worker but TF_CONFIG is not set, running a single worker")
+        return tf.distribute.MultiWorkerMirroredStrategy()
+
+    cpus = tf.config.list_physical_devices("CPU")
+    try:
+        tf.config.set_logical_device_configuration(
+            cpus[0], [tf.config.LogicalDeviceConfiguration()] * num_local_replicas
+        )
+    except RuntimeError:
+        logger.warning("TensorFlow is already initialized, mirroring over the existing CPU devices")
+    devices = [device.name for device in tf.config.list_logical_devices("CPU")]
+    return tf.distribute.MirroredStrategy(devices=devices)
+
+
+def distribute_dataset(dataset: tf.data.Dataset) -> tf.data.Dataset:
+    """
+    Shards a dataset by element across workers. The loaders build datasets
+    from in-memory path lists, which the default file-based sharding cannot
+    split.
+    """
+    options = tf.data.Options()
+    options.experimental_distribute.auto_shard_policy = tf.data.experimental.AutoShardPolicy.DATA
+    return dataset.with_options(options)
+
+
+def save_on_chief(model: tf.keras.Model, path: Path) -> None:
+    """
+    Saves a model from every worker, as multi-worker saving requires, but
+    only the chief writes to `path`; the other workers write to a temporary
+    directory that is removed again.
+
+    Args:
+        model (tf.keras.Model): Model to save.
+        path (Path): Destination of the chief's copy.
+    """
+    if is_chief():
+        model.save(path)
+        return
+    tmp_dir = tempfile.mkdtemp(prefix="worker_model_")
+    try:
+        model.save(os.path.join(tmp_dir, Path(path).name))
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
@@ -1,7 +1,22 @@
+import time
+import numpy as np
+import pandas as pd
 import tensorflow as tf
 from pathlib import Path
+from typing import List
+from cnnClassifier import logger
 from cnnClassifier.entity.config_entity import EvaluationConfig
-from cnnClassifier.utils.common import save_json
+from cnnClassifier.components.data_pipeline import ImageDatasetLoader
+from cnnClassifier.components.image_store import PreprocessedImageStore
+from cnnClassifier.components.split_index import SplitIndex
+from cnnClassifier.components.backbones import get_preprocess_input
+from cnnClassifier.components.tta import TestTimeAugmentation
+from cnnClassifier.utils.common import create_directories, save_json
+from cnnClassifier.utils.metrics import (
+    classification_metrics,
+    fit_temperature,
+    held_out_calibration_error,
+)
 
 
 # component
@@ -13,13 +28,17 @@ class Evaluation:
         __init__: Initializes the Evaluation object.
         _valid_generator: Generates data for validation and stores it in the valid generator.
         load_model: Loads a saved Keras model.
-        evaluation: Evaluates the loaded model on the validation data and saves the scores.
-        save_score: Saves the evaluation scores as a JSON file.
+        predict: Collects the predicted probabilities of the whole validation set in one pass.
+        evaluation: Evaluates the loaded model on the validation data and computes every metric.
+        save_score: Saves the evaluation scores as a JSON file, with CSVs for DVC plots.
 
     Attributes:
         config (EvaluationConfig): Object containing the configuration for model evaluation.
         valid_generator: Data generator for validation data.
         model (tf.keras.Model): Loaded Keras model.
+        probabilities (np.ndarray): Predicted probabilities, one row per validation image.
+        labels (np.ndarray): Integer class of every validation image.
+        metrics (dict): Scores, confusion matrix, ROC/PR curves and calibration table.
         score (list): Evaluation scores for loss and accuracy.
 
     """
@@ -36,11 +55,41 @@ class Evaluation:
     def _valid_generator(self):
         """
         Generate data for validation and store it to valid generator
+
+        The validation files come from the split index written at ingestion,
+        the same one training uses, so no training image is scored. Reads from
+        the preprocessed image store when it has been built, which yields the
+        same pixels as the generator below.
         """
+        split_index = None
+        if self.config.split_index_file.exists():
+            split_index = SplitIndex.load(self.config.split_index_file)
+            self.class_names = list(split_index.class_names)
+        preprocess_input = get_preprocess_input(self.config.params_backbone)
+
+        store = PreprocessedImageStore(
+            root_dir=self.config.image_store_dir,
+            image_size=self.config.params_image_size,
+        )
+        if store.exists:
+            loader = ImageDatasetLoader(
+                data_dir=self.config.training_data,
+                image_size=self.config.params_image_size,
+                batch_size=self.config.params_batch_size,
+                validation_split=0.20,
+                store=store,
+                split_index=split_index,
+                preprocess_input=preprocess_input,
+            )
+            self.valid_generator, self.valid_samples = loader.build("validation")
+            self.class_names = list(loader.class_names)
+            return
+
         datagenerator_kwargs = dict(
-            rescale = 1./255,
-            validation_split=0.30
+            preprocessing_function = preprocess_input,
         )
+        if split_index is None:
+            datagenerator_kwargs["validation_split"] = 0.20
 
         dataflow_kwargs = dict(
             target_size=self.config.params_image_size[:-1],
@@ -52,6 +101,15 @@ class Evaluation:
             **datagenerator_kwargs
         )
 
+        if split_index is not None:
+            self.valid_generator = valid_datagenerator.flow_from_dataframe(
+                split_index.dataframe("validation"),
+                classes=split_index.class_names,
+                shuffle=False,
+                **dataflow_kwargs
+            )
+            return
+
         self.valid_generator = valid_datagenerator.flow_from_directory(
             directory=self.config.training_data,
             subset="validation",
@@ -74,18 +132,175 @@ class Evaluation:
         return tf.keras.models.load_model(path)
     
 
-    def evaluation(self):
+    def predict(self):
+        """
+        Runs the model over the validation data once, batch by batch, writing
+        the predicted probabilities and the labels into arrays preallocated
+        for the whole split.
+
+        With TTA enabled every batch is also scored under the augmented views,
+        in one model call per batch, and both passes are timed, so the scores
+        come from the TTA probabilities and `tta_report` holds its cost.
+        """
+        data = self.valid_generator
+        if isinstance(data, tf.data.Dataset):
+            samples = self.valid_samples
+            batches = ((images, labels.numpy()) for images, labels in data)
+        else:
+            samples = data.samples
+            batches = (data[index] for index in range(len(data)))
+
+        tta = TestTimeAugmentation(self.config.params_tta) if self.config.params_tta.enabled else None
+        self.probabilities = np.empty((samples, self.model.output_shape[-1]), dtype=np.float32)
+        self.labels = np.empty(samples, dtype=np.int64)
+        if tta is not None:
+            self.tta_probabilities = np.empty_like(self.probabilities)
+        seconds = tta_seconds = 0.0
+        filled = 0
+        for images, labels in batches:
+            end = filled + len(labels)
+            start = time.perf_counter()
+            self.probabilities[filled:end] = self.model.predict_on_batch(images)
+            seconds += time.perf_counter() - start
+            if tta is not None:
+                start = time.perf_counter()
+                self.tta_probabilities[filled:end] = tta.predict(self.model, images)
+                tta_seconds += time.perf_counter() - start
+            self.labels[filled:end] = np.argmax(labels, axis=1)
+            filled = end
+        if filled != samples:
+            raise ValueError(f"validation data yielded {filled} images, expected {samples}")
+
+        self.images_per_sec = samples / max(seconds, 1e-9)
+        self.tta_report = None
+        if tta is not None:
+            tta_images_per_sec = samples / max(tta_seconds, 1e-9)
+            self.tta_report = {
+                "views": self.config.params_tta.views,
+                "num_views": tta.num_views,
+                "aggregation": self.config.params_tta.aggregation,
+                "images_per_sec": round(tta_images_per_sec, 2),
+                "images_per_sec_without_tta": round(self.images_per_sec, 2),
+                "slowdown": round(self.images_per_sec / tta_images_per_sec, 2),
+            }
+
+    def evaluation(
+        self,
+        model: tf.keras.Model = None,
+        valid_data=None,
+        valid_samples: int = None,
+        class_names: List[str] = None,
+    ):
         """ 
         Evaluating the model and save it to score
+
+        All metrics are computed from the probabilities of a single inference
+        pass over the validation set.
+
+        Args:
+            model (tf.keras.Model, optional): In-memory model to evaluate instead of loading path_of_model.
+            valid_data (optional): Validation data to use instead of building it, e.g. from training.
+            valid_samples (int, optional): Images in `valid_data` when it is a tf.data.Dataset.
+            class_names (list, optional): Class of every label index of `valid_data`. Defaults to
+                the split index, or to the generator's class_indices.
         """ 
-        self.model = self.load_model(self.config.path_of_model)
-        self._valid_generator()
-        self.score = self.model.evaluate(self.valid_generator)
+        self.model = model if model is not None else self.load_model(self.config.path_of_model)
+        if valid_data is not None:
+            self.valid_generator = valid_data
+            self.valid_samples = valid_samples
+            self.class_names = list(class_names) if class_names is not None else None
+            if self.class_names is None and self.config.split_index_file.exists():
+                self.class_names = list(SplitIndex.load(self.config.split_index_file).class_names)
+        else:
+            self._valid_generator()
+        if getattr(self, "class_names", None) is None:
+            if not hasattr(self.valid_generator, "class_indices"):
+                raise ValueError(
+                    "class names of the validation dataset are unknown: pass class_names "
+                    f"or write the split index {self.config.split_index_file}"
+                )
+            # flow_from_directory without a split index
+            indices = self.valid_generator.class_indices
+            self.class_names = sorted(indices, key=indices.get)
+
+        self.predict()
+        if self.tta_report is not None:
+            plain = classification_metrics(self.probabilities, self.labels, self.class_names)["scores"]
+            self.tta_report.update(
+                accuracy_without_tta=plain["accuracy"],
+                macro_f1_without_tta=plain["macro_f1"],
+            )
+            self.probabilities = self.tta_probabilities
+        self.metrics = classification_metrics(
+            self.probabilities,
+            self.labels,
+            self.class_names,
+            bins=self.config.params_calibration_bins,
+        )
+        scores = self.metrics["scores"]
+        scores["images_per_sec"] = round(self.images_per_sec, 2)
+        # the temperature the prediction pipeline scales its confidence with
+        self.temperature = fit_temperature(self.probabilities, self.labels)
+        scores["temperature"] = round(self.temperature, 4)
+        # scored on halves the temperature was not fitted on, not in-sample
+        scores["ece_calibrated"] = held_out_calibration_error(
+            self.probabilities,
+            self.labels,
+            bins=self.config.params_calibration_bins,
+        )
+        if self.tta_report is not None:
+            scores["tta"] = self.tta_report
+            logger.info(f"evaluation: test-time augmentation {self.tta_report}")
+        self.score = [scores["loss"], scores["accuracy"]]
+        logger.info(
+            f"evaluation: loss {scores['loss']:.4f}, accuracy {scores['accuracy']:.4f}, "
+            f"macro F1 {scores['macro_f1']:.4f}, ECE {scores['ece']:.4f}"
+        )
 
     
     def save_score(self):
         """ 
         Saving score as a json file
+
+        Besides scores.json, writes to the evaluation root_dir the per-image
+        predictions (for DVC's confusion plot), the confusion matrix, the
+        per-class scores, one ROC and one PR curve CSV per class, the
+        calibration table and the raw probabilities, and the fitted
+        temperature to calibration_file.
         """
-        scores = {"loss": self.score[0], "accuracy": self.score[1]}
-        save_json(path=Path("scores.json"), data=scores)
\ No newline at end of file
+        save_json(path=Path(self.config.scores_file), data=self.metrics["scores"])
+        save_json(
+            path=Path(self.config.calibration_file),
+            data={
+                "temperature": self.temperature,
+                "samples": int(len(self.labels)),
+                "tta": self.config.params_tta.enabled,
+            },
+        )
+
+        root_dir = Path(self.config.root_dir)
+        create_directories([root_dir / "roc", root_dir / "pr"], verbose=False)
+        names = np.array(self.class_names)
+        pd.DataFrame({
+            "actual": names[self.labels],
+            "predicted": names[self.probabilities.argmax(axis=1)],
+            "confidence": self.probabilities.max(axis=1),
+        }).to_csv(root_dir / "predictions.csv", index=False)
+        pd.DataFrame(
+            self.metrics["confusion_matrix"], index=names, columns=names
+        ).rename_axis("actual").to_csv(root_dir / "confusion_matrix.csv")
+        pd.DataFrame.from_dict(
+            self.metrics["scores"]["per_class"], orient="index"
+        ).rename_axis("class").to_csv(root_dir / "per_class.csv")
+        for name in self.class_names:
+            fpr, tpr, thresholds = self.metrics["roc"][name]
+            pd.DataFrame({"fpr": fpr, "tpr": tpr, "threshold": thresholds}).to_csv(
+                root_dir / "roc" / f"{name}.csv", index=False
+            )
+            precision, recall, thresholds = self.metrics["pr"][name]
+            pd.DataFrame({"recall": recall, "precision": precision, "threshold": thresholds}).to_csv(
+                root_dir / "pr" / f"{name}.csv", index=False
+            )
+        pd.DataFrame(self.metrics["calibration"]).to_csv(root_dir / "calibration.csv", index_label="bin")
+        np.savez(root_dir / "predictions.npz", probabilities=self.probabilities, labels=self.labels)
+        logger.info(f"evaluation plots and tables saved at: {root_dir}")
\ No newline at end of file
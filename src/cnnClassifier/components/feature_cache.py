@@ -0,0 +1,191 @@
+import hashlib
+import numpy as np
+import tensorflow as tf
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+from cnnClassifier import logger
+from cnnClassifier.components.image_store import ContentAddressedStore
+
+HEAD_LAYER_TYPES = (
+    tf.keras.layers.Flatten,
+    tf.keras.layers.GlobalAveragePooling2D,
+    tf.keras.layers.GlobalMaxPooling2D,
+)
+
+
+def split_backbone_head(model: tf.keras.Model) -> Tuple[tf.keras.Model, List[tf.keras.layers.Layer]]:
+    """
+    Splits a full model into its convolutional backbone and its head layers.
+
+    The head starts at the first Flatten/global pooling layer, which is where
+    `PrepareBaseModel._prepare_full_model` attaches the classifier.
+
+    Args:
+        model (tf.keras.Model): Full model.
+
+    Returns:
+        tuple: (backbone model, list of head layers in order).
+    """
+    for index, layer in enumerate(model.layers):
+        if isinstance(layer, HEAD_LAYER_TYPES):
+            backbone = tf.keras.Model(inputs=model.input, outputs=layer.input)
+            return backbone, model.layers[index:]
+    raise ValueError("model has no Flatten or global pooling layer to split the head at")
+
+
+def build_head_model(model: tf.keras.Model) -> tf.keras.Model:
+    """
+    Builds a model that runs only the head on precomputed backbone features.
+
+    The head layers are shared with `model`, so training the head model
+    updates the weights of the full model in place.
+
+    Args:
+        model (tf.keras.Model): Full model.
+
+    Returns:
+        tf.keras.Model: Model mapping backbone features to predictions.
+    """
+    backbone, head_layers = split_backbone_head(model)
+    features = tf.keras.Input(shape=backbone.output_shape[1:])
+    x = features
+    for layer in head_layers:
+        x = layer(x)
+    return tf.keras.Model(inputs=features, outputs=x)
+
+
+class BottleneckFeatureCache(ContentAddressedStore):
+    """
+    A memory-mapped store of frozen-backbone features.
+
+    Rows of `features.npy` hold the backbone output for one image (or one
+    augmented copy of it), keyed by "<sha256>:<height>x<width>:<copy>". The
+    store lives in a directory named after the preprocessing and a digest of
+    the backbone weights, so a different or fine-tuned backbone never reuses
+    stale features. Only missing keys are computed on `build`.
+
+    Methods:
+        __init__: Initializes the BottleneckFeatureCache object.
+        build: Computes the features that are not cached yet.
+        features: Returns a read-only memory map of all cached features.
+        rows: Returns the rows of the given images and copies.
+    """
+    data_name = "features.npy"
+
+    def __init__(
+        self,
+        root_dir: Path,
+        backbone: tf.keras.Model,
+        image_size: list,
+        preprocess_input: Callable,
+        preprocess_name: str,
+    ) -> None:
+        """
+        Initializes the BottleneckFeatureCache object.
+
+        Args:
+            root_dir (Path): Directory holding one sub-directory per backbone.
+            backbone (tf.keras.Model): Frozen backbone producing the features.
+            image_size (list): [height, width, channels] the images are resized to.
+            preprocess_input (Callable): Maps float [0, 255] pixels to backbone inputs.
+            preprocess_name (str): Name of the preprocessing, part of the directory name.
+        """
+        self.backbone = backbone
+        self.image_size = list(image_size)
+        self.preprocess_input = preprocess_input
+        self.feature_shape = tuple(backbone.output_shape[1:])
+        super().__init__(
+            Path(root_dir) / f"{preprocess_name}-{self._backbone_digest(backbone)}",
+            row_shape=self.feature_shape,
+            dtype=np.float32,
+        )
+
+    @staticmethod
+    def _backbone_digest(backbone: tf.keras.Model) -> str:
+        digest = hashlib.sha1()
+        for weight in backbone.weights:
+            digest.update(weight.name.encode())
+            digest.update(np.ascontiguousarray(weight.numpy()).tobytes())
+        return digest.hexdigest()[:16]
+
+    def key(self, path: str, copy: int = 0) -> str:
+        """
+        Returns the cache key of an image file and augmentation copy.
+        """
+        height, width = self.image_size[:2]
+        return f"{self.file_hash(path)}:{height}x{width}:{copy}"
+
+    def build(
+        self,
+        paths: List[str],
+        decode_fn: Callable,
+        augmentation: Optional[Callable] = None,
+        copies: int = 0,
+        batch_size: int = 32,
+    ) -> None:
+        """
+        Computes the features that are not cached yet.
+
+        Args:
+            paths (list): Image files.
+            decode_fn (Callable): Maps a path tensor to a uint8 (height, width, 3) tensor.
+            augmentation (Callable, optional): Batched augmentation applied to copies 1..N.
+            copies (int, optional): Number of augmented copies per image. Defaults to 0.
+            batch_size (int, optional): Images per backbone forward pass. Defaults to 32.
+        """
+        copies = copies if augmentation is not None else 0
+        missing = self._missing(
+            (str(path), copy, self.key(path, copy))
+            for path in paths
+            for copy in range(copies + 1)
+        )
+        if not missing:
+            logger.info(f"bottleneck features: all {len(paths)} images cached in {self.cache_dir}")
+            self._save_index()
+            return
+
+        logger.info(f"bottleneck features: computing {len(missing)} rows in {self.cache_dir}")
+
+        def fill(out: np.ndarray, start: int) -> None:
+            dataset = tf.data.Dataset.from_tensor_slices(
+                ([path for path, _, _ in missing], [copy for _, copy, _ in missing])
+            )
+            dataset = dataset.map(
+                lambda path, copy: (decode_fn(path), copy), num_parallel_calls=tf.data.AUTOTUNE
+            ).batch(batch_size).prefetch(tf.data.AUTOTUNE)
+
+            row = start
+            for images, copy in dataset:
+                images = tf.cast(images, tf.float32)
+                if augmentation is not None:
+                    augmented = augmentation(images, training=True)
+                    images = tf.where(tf.reshape(copy > 0, (-1, 1, 1, 1)), augmented, images)
+                images = self.preprocess_input(images)
+                features = self.backbone(images, training=False).numpy()
+                out[row:row + len(features)] = features
+                row += len(features)
+
+        self._append([key for _, _, key in missing], fill)
+
+    def features(self) -> np.ndarray:
+        """
+        Returns a read-only memory map of all cached features.
+        """
+        return self.array()
+
+    def rows(self, paths: List[str], copies: int = 0) -> np.ndarray:
+        """
+        Returns the rows of the given images and copies, copy-major.
+
+        Args:
+            paths (list): Image files, all previously passed to `build`.
+            copies (int, optional): Number of augmented copies to include. Defaults to 0.
+
+        Returns:
+            np.ndarray: Row indices of shape (len(paths) * (copies + 1),).
+        """
+        return np.array(
+            [self.index[self.key(path, copy)] for copy in range(copies + 1) for path in paths],
+            dtype=np.int64,
+        )
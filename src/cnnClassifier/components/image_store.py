@@ -0,0 +1,275 @@
+import os
+import json
+import struct
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+from cnnClassifier import logger
+from cnnClassifier.utils.common import file_sha256
+from cnnClassifier.utils.image_ops import decode_image
+
+
+class ContentAddressedStore:
+    """
+    Base class for a memory-mapped array of rows addressed by content keys.
+
+    `data.npy` holds the rows and `index.json` maps a key to its row. File
+    hashes are cached by (size, mtime) so unchanged files are never re-read
+    just to compute their key. New rows are appended by `_append`, which
+    grows the file in place: existing rows are never recomputed, copied or
+    rewritten.
+
+    Methods:
+        __init__: Initializes the store and loads its index.
+        array: Returns a read-only memory map of all rows.
+        key: Returns the key of a file, to be extended by subclasses.
+    """
+    data_name = "data.npy"
+    # bytes reserved for the .npy header, so a longer shape still fits when the array grows
+    header_size = 256
+
+    def __init__(self, cache_dir: Path, row_shape: tuple, dtype) -> None:
+        """
+        Initializes the store and loads its index.
+
+        Args:
+            cache_dir (Path): Directory holding the array and its index.
+            row_shape (tuple): Shape of one row.
+            dtype: numpy dtype of the rows.
+        """
+        self.cache_dir = Path(cache_dir)
+        self.row_shape = tuple(row_shape)
+        self.dtype = np.dtype(dtype)
+        self.data_path = self.cache_dir / self.data_name
+        self.index_path = self.cache_dir / "index.json"
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._array = None
+        self._load_index()
+
+    def _load_index(self) -> None:
+        if self.index_path.exists() and self.data_path.exists():
+            with open(self.index_path) as f:
+                content = json.load(f)
+            self.index = content["rows"]
+            self.file_hashes = content["files"]
+        else:
+            self.index, self.file_hashes = {}, {}
+
+    def _save_index(self) -> None:
+        tmp_path = self.index_path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({"rows": self.index, "files": self.file_hashes}, f)
+        os.replace(tmp_path, self.index_path)
+
+    def file_hash(self, path: str) -> str:
+        """
+        Returns the sha256 of a file, recomputed only when its size or mtime changed.
+        """
+        path = str(path)
+        stat = os.stat(path)
+        signature = [stat.st_size, stat.st_mtime_ns]
+        cached = self.file_hashes.get(path)
+        if cached is None or cached[:2] != signature:
+            cached = signature + [file_sha256(path)]
+            self.file_hashes[path] = cached
+        return cached[2]
+
+    def key(self, path: str) -> str:
+        """
+        Returns the key of a file.
+        """
+        return self.file_hash(path)
+
+    @property
+    def num_rows(self) -> int:
+        if not self.data_path.exists():
+            return 0
+        return self.array().shape[0]
+
+    def array(self) -> np.ndarray:
+        """
+        Returns a read-only memory map of all rows.
+        """
+        if self._array is None:
+            self._array = np.load(self.data_path, mmap_mode="r")
+        return self._array
+
+    def _header(self, rows: int) -> bytes:
+        # a version 1.0 .npy header padded to header_size bytes
+        header = repr({
+            "descr": np.lib.format.dtype_to_descr(self.dtype),
+            "fortran_order": False,
+            "shape": (rows, *self.row_shape),
+        }).encode("latin1")
+        prefix = np.lib.format.magic(1, 0)
+        length = self.header_size - len(prefix) - 2
+        if len(header) + 1 > length:
+            raise ValueError(f"shape {(rows, *self.row_shape)} does not fit a {self.header_size}-byte .npy header")
+        return prefix + struct.pack("<H", length) + header.ljust(length - 1) + b"\n"
+
+    def _header_offset(self) -> int:
+        with open(self.data_path, "rb") as f:
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                np.lib.format.read_array_header_1_0(f)
+            else:
+                np.lib.format.read_array_header_2_0(f)
+            return f.tell()
+
+    def _append(self, keys: List[str], fill) -> None:
+        """
+        Appends one row per key; `fill(out, start)` writes rows
+        out[start:start + n] for the keys in order.
+
+        The file is extended and only the new rows are written. The header
+        is updated after them and the index last, so an interrupted append
+        leaves the store as it was, and the next one overwrites the partial
+        rows.
+        """
+        old_rows = self.num_rows
+        self._array = None
+        if old_rows and self._header_offset() != self.header_size:
+            # a store written before headers were padded is rewritten once
+            old = np.load(self.data_path)
+            with open(self.data_path, "wb") as f:
+                f.write(self._header(old_rows))
+                f.write(np.ascontiguousarray(old).tobytes())
+            del old
+
+        rows = old_rows + len(keys)
+        row_bytes = self.dtype.itemsize * int(np.prod(self.row_shape))
+        mode = "r+b" if old_rows else "w+b"
+        with open(self.data_path, mode) as f:
+            if not old_rows:
+                f.write(self._header(0))
+            f.truncate(self.header_size + rows * row_bytes)
+        out = np.memmap(
+            self.data_path, dtype=self.dtype, mode="r+", offset=self.header_size, shape=(rows, *self.row_shape)
+        )
+        fill(out, old_rows)
+        out.flush()
+        del out
+        with open(self.data_path, "r+b") as f:
+            f.write(self._header(rows))
+
+        for offset, key in enumerate(keys):
+            self.index[key] = old_rows + offset
+        self._save_index()
+
+    def _missing(self, items: Iterable[Tuple[str, str]]) -> List[Tuple[str, str]]:
+        # drops cached keys and duplicate contents, keeping the first path per key
+        seen, missing = set(self.index), []
+        for item in items:
+            if item[-1] not in seen:
+                seen.add(item[-1])
+                missing.append(item)
+        return missing
+
+
+class PreprocessedImageStore(ContentAddressedStore):
+    """
+    A shared store of decoded, resized uint8 images.
+
+    Rows are keyed by "<sha256>:<height>x<width>:<interpolation>", so
+    identical files share a row and a changed file gets a new one. Every
+    image size and interpolation has its own "<height>x<width>-<interpolation>"
+    sub-directory, so changing IMAGE_SIZE starts a new array instead of
+    appending rows of another shape. The store is built once after data
+    ingestion; training, evaluation and prediction read rows straight from
+    the memory map instead of decoding JPEGs again, and files added since are
+    decoded into it on first use. Decoding uses `decode_image`, which gives
+    the same pixels as `flow_from_directory(interpolation=...)`.
+
+    Methods:
+        build: Decodes and stores the images that are not in the store yet.
+        rows: Returns the rows of the given files.
+        get: Returns the stored image of a file, or None.
+    """
+    data_name = "images.npy"
+
+    def __init__(self, root_dir: Path, image_size: list, interpolation: str = "bilinear") -> None:
+        """
+        Initializes the PreprocessedImageStore object.
+
+        Args:
+            root_dir (Path): Directory holding one sub-directory per image size.
+            image_size (list): [height, width, channels] the images are resized to.
+            interpolation (str, optional): Resize interpolation. Defaults to "bilinear".
+        """
+        self.image_size = list(image_size)
+        self.interpolation = interpolation
+        height, width = self.image_size[:2]
+        super().__init__(
+            Path(root_dir) / f"{height}x{width}-{interpolation}",
+            row_shape=(height, width, 3),
+            dtype=np.uint8,
+        )
+
+    @property
+    def exists(self) -> bool:
+        return self.data_path.exists() and self.index_path.exists()
+
+    def key(self, path: str) -> str:
+        height, width = self.image_size[:2]
+        return f"{self.file_hash(path)}:{height}x{width}:{self.interpolation}"
+
+    def build(self, paths: List[str], workers: int = None) -> None:
+        """
+        Decodes and stores the images that are not in the store yet.
+
+        Args:
+            paths (list): Image files.
+            workers (int, optional): Decoding threads. Defaults to the CPU count.
+        """
+        missing = self._missing((str(path), self.key(path)) for path in paths)
+        if not missing:
+            logger.info(f"image store: all {len(paths)} images up to date in {self.cache_dir}")
+            self._save_index()
+            return
+
+        logger.info(f"image store: decoding {len(missing)} new or changed images into {self.cache_dir}")
+
+        def fill(out: np.ndarray, start: int) -> None:
+            def _decode(offset: int) -> None:
+                with open(missing[offset][0], "rb") as f:
+                    out[start + offset] = decode_image(
+                        f.read(), target_size=self.row_shape[:2], interpolation=self.interpolation
+                    )
+
+            with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+                list(executor.map(_decode, range(len(missing))))
+
+        self._append([key for _, key in missing], fill)
+
+    def rows(self, paths: List[str]) -> np.ndarray:
+        """
+        Returns the rows of the given files, first decoding into the store
+        any file that is not in it yet.
+
+        Args:
+            paths (list): Image files.
+
+        Returns:
+            np.ndarray: Row indices of shape (len(paths),).
+        """
+        keys = [self.key(path) for path in paths]
+        if any(key not in self.index for key in keys):
+            self.build(paths)
+        return np.array([self.index[key] for key in keys], dtype=np.int64)
+
+    def get(self, path: str) -> Optional[np.ndarray]:
+        """
+        Returns the stored image of a file, or None if it is not in the store.
+
+        Args:
+            path (str): Image file.
+
+        Returns:
+            np.ndarray: Read-only (height, width, 3) view into the store, or None.
+        """
+        if not self.exists:
+            return None
+        row = self.index.get(self.key(path))
+        return None if row is None else self.array()[row]
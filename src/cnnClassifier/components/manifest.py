@@ -0,0 +1,169 @@
+import os
+import csv
+import hashlib
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from cnnClassifier import logger
+from cnnClassifier.utils.common import file_sha256
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+class DatasetManifest:
+    """
+    A CSV manifest of the extracted dataset.
+
+    One row per image with its path relative to the dataset directory, size,
+    mtime, sha256, label (the class folder) and split. `update` only hashes
+    files whose size or mtime changed, so refreshing the manifest after a
+    delta costs one `stat` per unchanged file. Consumers enumerate files
+    with `files` instead of walking the dataset directory.
+
+    Methods:
+        __init__: Initializes the DatasetManifest object.
+        load: Reads the manifest rows.
+        save: Writes the manifest rows.
+        update: Brings the manifest in line with the dataset directory.
+        files: Returns (absolute path, label) pairs, optionally for one split.
+        class_names: Returns the sorted labels.
+    """
+    COLUMNS = ["path", "size", "mtime_ns", "sha256", "label", "split"]
+
+    def __init__(self, manifest_file: Path, data_dir: Path) -> None:
+        """
+        Initializes the DatasetManifest object.
+
+        Args:
+            manifest_file (Path): CSV file holding the manifest.
+            data_dir (Path): Dataset directory with one sub-directory per class.
+        """
+        self.manifest_file = Path(manifest_file)
+        self.data_dir = Path(data_dir)
+        self._rows: Optional[List[Dict]] = None
+
+    @property
+    def exists(self) -> bool:
+        return self.manifest_file.exists()
+
+    def load(self) -> List[Dict]:
+        """
+        Reads the manifest rows.
+
+        Returns:
+            list: One dict per image, sorted by path.
+        """
+        if self._rows is None:
+            if not self.exists:
+                self._rows = []
+            else:
+                with open(self.manifest_file, newline="") as f:
+                    self._rows = [
+                        {**row, "size": int(row["size"]), "mtime_ns": int(row["mtime_ns"])}
+                        for row in csv.DictReader(f)
+                    ]
+        return self._rows
+
+    def save(self, rows: List[Dict]) -> None:
+        """
+        Writes the manifest rows.
+
+        Args:
+            rows (list): One dict per image.
+        """
+        rows = sorted(rows, key=lambda row: row["path"])
+        tmp_path = self.manifest_file.with_suffix(".tmp")
+        with open(tmp_path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=self.COLUMNS)
+            writer.writeheader()
+            writer.writerows(rows)
+        os.replace(tmp_path, self.manifest_file)
+        self._rows = rows
+        logger.info(f"manifest with {len(rows)} images saved at: {self.manifest_file}")
+
+    @staticmethod
+    def _assign_splits(rows: List[Dict], validation_split: float, seed: int) -> None:
+        # Stratified and seeded: within every class, images are ranked by a
+        # seeded hash of their content and the lowest `validation_split` go to
+        # validation. The split does not depend on file names or order, and
+        # adding a few images moves at most a few others across.
+        by_label: Dict[str, List[Dict]] = {}
+        for row in rows:
+            by_label.setdefault(row["label"], []).append(row)
+        for label_rows in by_label.values():
+            ranked = sorted(
+                label_rows,
+                key=lambda row: (hashlib.sha256(f"{seed}:{row['sha256']}".encode()).hexdigest(), row["path"]),
+            )
+            split_at = round(validation_split * len(ranked))
+            for index, row in enumerate(ranked):
+                row["split"] = "validation" if index < split_at else "training"
+
+    def update(self, validation_split: float = 0.20, seed: int = 42) -> Tuple[int, int, int]:
+        """
+        Brings the manifest in line with the dataset directory.
+
+        Args:
+            validation_split (float, optional): Fraction of every class marked as validation.
+            seed (int, optional): Seed of the stratified split.
+
+        Returns:
+            tuple: (added, changed, removed) image counts.
+        """
+        previous = {row["path"]: row for row in self.load()}
+        rows, added, changed = [], 0, 0
+        for root, dirs, files in os.walk(self.data_dir):
+            dirs.sort()
+            for name in sorted(files):
+                if not name.lower().endswith(IMAGE_EXTENSIONS):
+                    continue
+                path = Path(root) / name
+                relative = path.relative_to(self.data_dir).as_posix()
+                if "/" not in relative:  # images outside a class folder have no label
+                    continue
+                stat = path.stat()
+                row = previous.get(relative)
+                if row is not None and row["size"] == stat.st_size and row["mtime_ns"] == stat.st_mtime_ns:
+                    rows.append(dict(row))
+                    continue
+                sha256 = file_sha256(path)
+                if row is None:
+                    added += 1
+                elif row["sha256"] != sha256:
+                    changed += 1
+                rows.append({
+                    "path": relative,
+                    "size": stat.st_size,
+                    "mtime_ns": stat.st_mtime_ns,
+                    "sha256": sha256,
+                    "label": relative.split("/", 1)[0],
+                    "split": "",
+                })
+        removed = len(set(previous) - {row["path"] for row in rows})
+
+        self._assign_splits(rows, validation_split, seed)
+        self.save(rows)
+        logger.info(f"manifest updated: {added} added, {changed} changed, {removed} removed")
+        return added, changed, removed
+
+    def class_names(self) -> List[str]:
+        """
+        Returns the sorted labels.
+        """
+        return sorted({row["label"] for row in self.load()})
+
+    def files(self, split: Optional[str] = None) -> List[Tuple[str, str]]:
+        """
+        Returns (absolute path, label) pairs, optionally for one split.
+
+        Args:
+            split (str, optional): "training" or "validation". All images if omitted.
+
+        Returns:
+            list: (path, label) pairs sorted by path.
+        """
+        return [
+            (str(self.data_dir / row["path"]), row["label"])
+            for row in self.load()
+            if split is None or row["split"] == split
+        ]
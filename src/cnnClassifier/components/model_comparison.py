@@ -0,0 +1,282 @@
+import os
+import time
+import multiprocessing
+import numpy as np
+import pandas as pd
+import tensorflow as tf
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import shared_memory
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from cnnClassifier import logger
+from cnnClassifier.entity.config_entity import ModelComparisonConfig
+from cnnClassifier.components.backbones import get_preprocess_input
+from cnnClassifier.components.data_pipeline import ImageDatasetLoader
+from cnnClassifier.components.image_store import PreprocessedImageStore
+from cnnClassifier.components.split_index import SplitIndex
+from cnnClassifier.utils.common import save_json
+from cnnClassifier.utils.image_ops import decode_image_into
+from cnnClassifier.utils.metrics import classification_metrics
+from cnnClassifier.utils.tflite_model import TFLiteModel
+
+# validation set attached by every worker process
+_shared: Dict = {}
+
+
+def _init_worker(threads: int, name: str, shape: tuple, labels: np.ndarray, class_names: List[str]) -> None:
+    # runs in every spawned scoring process, before it loads a model
+    os.environ["TF_NUM_INTRAOP_THREADS"] = str(threads)
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    try:
+        tf.config.threading.set_intra_op_parallelism_threads(threads)
+        tf.config.threading.set_inter_op_parallelism_threads(2)
+    except RuntimeError:
+        pass
+    memory = shared_memory.SharedMemory(name=name)
+    images = np.ndarray(shape, dtype=np.uint8, buffer=memory.buf)
+    images.flags.writeable = False
+    _shared.update(memory=memory, images=images, labels=labels, class_names=class_names, threads=threads)
+
+
+def parse_model_spec(spec: str, default_backbone: str) -> Tuple[str, str]:
+    """
+    Splits a "<path>[@<BACKBONE>]" model spec.
+
+    Args:
+        spec (str): Model artifact, optionally followed by the backbone it was trained on.
+        default_backbone (str): Backbone used when the spec names none.
+
+    Returns:
+        tuple: (path, backbone).
+    """
+    path, _, backbone = spec.partition("@")
+    return path, backbone or default_backbone
+
+
+def _load(path: str):
+    if Path(path).suffix == ".tflite":
+        return TFLiteModel(path, num_threads=_shared["threads"])
+    return tf.keras.models.load_model(path, compile=False)
+
+
+def score_model(path: str, backbone: str, batch_size: int, bins: int) -> dict:
+    """
+    Scores one model artifact on the shared validation set.
+
+    Args:
+        path (str): Keras (.h5) or TFLite (.tflite) model.
+        backbone (str): Backbone whose preprocess_input the model expects.
+        batch_size (int): Images per inference batch.
+        bins (int): Calibration bins of the ECE.
+
+    Returns:
+        dict: Accuracy, loss, macro F1 and ROC-AUC, ECE, throughput, size and load time.
+    """
+    images, labels = _shared["images"], _shared["labels"]
+    start = time.perf_counter()
+    model = _load(path)
+    load_s = time.perf_counter() - start
+    if tuple(model.input_shape[1:3]) != images.shape[1:3]:
+        raise ValueError(f"{path} takes {model.input_shape[1:3]} images, the validation set is {images.shape[1:3]}")
+
+    preprocess_input = get_preprocess_input(backbone)
+    # astype copies, so preprocessing never touches the shared images
+    model.predict(preprocess_input(images[:1].astype(np.float32)), verbose=0)
+    probabilities = None
+    start = time.perf_counter()
+    for first in range(0, len(images), batch_size):
+        batch = model.predict(preprocess_input(images[first:first + batch_size].astype(np.float32)), verbose=0)
+        if probabilities is None:
+            probabilities = np.empty((len(images), batch.shape[-1]), dtype=np.float32)
+        probabilities[first:first + len(batch)] = batch
+    inference_s = time.perf_counter() - start
+
+    scores = classification_metrics(probabilities, labels, _shared["class_names"], bins=bins)["scores"]
+    return {
+        "model": path,
+        "backbone": backbone,
+        "accuracy": scores["accuracy"],
+        "loss": scores["loss"],
+        "macro_f1": scores["macro_f1"],
+        "macro_roc_auc": scores["macro_roc_auc"],
+        "ece": scores["ece"],
+        "images_per_sec": round(len(images) / inference_s, 2),
+        "size_mb": round(os.path.getsize(path) / 2**20, 3),
+        "load_s": round(load_s, 3),
+    }
+
+
+def time_latency(path: str, backbone: str, latency_runs: int) -> dict:
+    """
+    Times single-image inferences of one model artifact.
+
+    Args:
+        path (str): Keras (.h5) or TFLite (.tflite) model.
+        backbone (str): Backbone whose preprocess_input the model expects.
+        latency_runs (int): Timed single-image inferences.
+
+    Returns:
+        dict: Mean and p95 latency in milliseconds.
+    """
+    model = _load(path)
+    sample = get_preprocess_input(backbone)(_shared["images"][:1].astype(np.float32))
+    model.predict(sample, verbose=0)
+    latencies = np.empty(latency_runs)
+    for run in range(latency_runs):
+        run_start = time.perf_counter()
+        model.predict(sample, verbose=0)
+        latencies[run] = time.perf_counter() - run_start
+    return {
+        "latency_ms_mean": round(1000 * latencies.mean(), 3),
+        "latency_ms_p95": round(1000 * np.percentile(latencies, 95), 3),
+    }
+
+
+class ModelComparison:
+    """
+    Scores several model artifacts on the same validation set, in parallel.
+
+    The validation images are decoded and resized once, into a shared
+    memory block that every scoring process maps read-only, so N models cost
+    one decode and one copy of the pixels. Each process applies its model's
+    own preprocess_input, so models on different backbones can be compared.
+    Models are scored in a pool of spawned processes, each limited to its
+    share of the CPU threads. Latency is timed after that pool has drained,
+    one model at a time in a single process with every CPU thread, so no
+    model is timed while others compete for the cores. The results are written as a CSV table
+    and a JSON summary ranked by accuracy.
+
+    Methods:
+        __init__: Initializes the ModelComparison object.
+        load_validation_images: Decodes the validation split into shared memory.
+        run: Scores every model and writes the comparison.
+    """
+    def __init__(self, config: ModelComparisonConfig) -> None:
+        """
+        Initializes the ModelComparison object.
+
+        Args:
+            config (ModelComparisonConfig): Configuration object for model comparison.
+        """
+        self.config = config
+
+    def load_validation_images(self) -> None:
+        """
+        Decodes the validation split into a shared memory block, reading
+        from the preprocessed image store when it has been built.
+        """
+        split_index = None
+        if self.config.split_index_file.exists():
+            split_index = SplitIndex.load(self.config.split_index_file)
+        loader = ImageDatasetLoader(
+            data_dir=self.config.training_data,
+            image_size=self.config.params_image_size,
+            batch_size=self.config.params_batch_size,
+            validation_split=0.20,
+            split_index=split_index,
+        )
+        paths, labels = loader.list_files("validation")
+        self.labels = np.asarray(labels, dtype=np.int64)
+        self.class_names = list(loader.class_names)
+
+        height, width = self.config.params_image_size[:2]
+        self.shape = (len(paths), height, width, 3)
+        self.memory = shared_memory.SharedMemory(create=True, size=max(int(np.prod(self.shape)), 1))
+        images = np.ndarray(self.shape, dtype=np.uint8, buffer=self.memory.buf)
+
+        store = PreprocessedImageStore(root_dir=self.config.image_store_dir, image_size=self.config.params_image_size)
+        if store.exists:
+            rows = store.rows(paths)
+            images[:] = store.array()[rows]
+        else:
+            def _decode(index: int) -> None:
+                with open(paths[index], "rb") as f:
+                    decode_image_into(images[index], f.read(), interpolation="bilinear")
+
+            with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+                list(executor.map(_decode, range(len(paths))))
+        logger.info(f"model comparison: {len(paths)} validation images in {self.memory.size / 2**20:.1f} MiB of shared memory")
+
+    def run(self, models: List[str] = None) -> List[dict]:
+        """
+        Scores every model and writes the comparison table.
+
+        Args:
+            models (list, optional): "<path>[@<BACKBONE>]" specs. Defaults to the
+                configured models; missing files are skipped.
+
+        Returns:
+            list: One record per model, best accuracy first.
+        """
+        specs = [
+            parse_model_spec(spec, self.config.params_backbone)
+            for spec in (models or self.config.models)
+        ]
+        missing = [path for path, _ in specs if not Path(path).exists()]
+        if missing:
+            logger.warning(f"model comparison: skipping missing models {missing}")
+        specs = [(path, backbone) for path, backbone in specs if Path(path).exists()]
+        if not specs:
+            raise FileNotFoundError("no model to compare")
+
+        self.load_validation_images()
+        workers = max(1, min(self.config.params_workers, len(specs)))
+        threads = max(1, (os.cpu_count() or 1) // workers)
+        records = []
+        try:
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(threads, self.memory.name, self.shape, self.labels, self.class_names),
+            ) as pool:
+                futures = {
+                    pool.submit(
+                        score_model,
+                        path,
+                        backbone,
+                        self.config.params_batch_size,
+                        self.config.params_calibration_bins,
+                    ): (path, backbone)
+                    for path, backbone in specs
+                }
+                for future, (path, backbone) in futures.items():
+                    try:
+                        record = future.result()
+                    except Exception as e:
+                        logger.exception(e)
+                        record = {"model": path, "backbone": backbone, "error": repr(e)}
+                    records.append(record)
+
+            with ProcessPoolExecutor(
+                max_workers=1,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(os.cpu_count() or 1, self.memory.name, self.shape, self.labels, self.class_names),
+            ) as pool:
+                for record in records:
+                    if "error" not in record:
+                        try:
+                            record.update(pool.submit(
+                                time_latency,
+                                record["model"],
+                                record["backbone"],
+                                self.config.params_latency_runs,
+                            ).result())
+                        except Exception as e:
+                            logger.exception(e)
+                            record["error"] = repr(e)
+                    logger.info(f"model comparison: {record}")
+        finally:
+            self.memory.close()
+            self.memory.unlink()
+
+        records.sort(key=lambda record: record.get("accuracy", -1.0), reverse=True)
+        root_dir = Path(self.config.root_dir)
+        pd.DataFrame(records).to_csv(root_dir / "comparison.csv", index=False)
+        save_json(
+            path=root_dir / "comparison.json",
+            data={"validation_images": self.shape[0], "best": records[0], "models": records},
+        )
+        return records
@@ -0,0 +1,151 @@
+import os
+import time
+import numpy as np
+import tensorflow as tf
+from pathlib import Path
+
+from cnnClassifier import logger
+from cnnClassifier.entity.config_entity import ModelExportConfig
+from cnnClassifier.components.data_pipeline import ImageDatasetLoader
+from cnnClassifier.components.image_store import PreprocessedImageStore
+from cnnClassifier.components.split_index import SplitIndex
+from cnnClassifier.components.backbones import get_preprocess_input
+from cnnClassifier.utils.common import save_json
+from cnnClassifier.utils.tflite_model import TFLiteModel
+
+
+class ModelExport:
+    """
+    A class for exporting the trained model to quantized TFLite variants.
+
+    Variants:
+        dynamic: dynamic-range quantization, int8 weights with float activations.
+        int8: full integer quantization calibrated on validation images, int8 inputs and outputs.
+        float16: float16 weights.
+
+    Methods:
+        __init__: Initializes the ModelExport object.
+        load_validation_data: Loads the validation split as arrays.
+        convert: Converts the Keras model to one TFLite variant.
+        export: Exports every configured variant and reports size, latency and accuracy.
+    """
+    def __init__(self, config: ModelExportConfig) -> None:
+        """
+        Initializes the ModelExport object.
+
+        Args:
+            config (ModelExportConfig): Configuration object for model export.
+        """
+        self.config = config
+
+    def load_validation_data(self) -> None:
+        """
+        Loads the validation split as (images, one-hot labels) arrays.
+        """
+        split_index = None
+        if self.config.split_index_file.exists():
+            split_index = SplitIndex.load(self.config.split_index_file)
+        loader = ImageDatasetLoader(
+            data_dir=self.config.training_data,
+            image_size=self.config.params_image_size,
+            batch_size=self.config.params_batch_size,
+            validation_split=0.20,
+            cache="none",
+            store=PreprocessedImageStore(
+                root_dir=self.config.image_store_dir,
+                image_size=self.config.params_image_size,
+            ),
+            split_index=split_index,
+            preprocess_input=get_preprocess_input(self.config.params_backbone),
+        )
+        dataset, _ = loader.build("validation")
+        images, labels = [], []
+        for batch_images, batch_labels in dataset:
+            images.append(batch_images.numpy())
+            labels.append(batch_labels.numpy())
+        self.valid_images = np.concatenate(images)
+        self.valid_labels = np.concatenate(labels)
+
+    def _representative_dataset(self):
+        count = min(self.config.params_representative_samples, len(self.valid_images))
+        for image in self.valid_images[:count]:
+            yield [image[np.newaxis].astype(np.float32)]
+
+    def convert(self, model: tf.keras.Model, variant: str) -> bytes:
+        """
+        Converts the Keras model to one TFLite variant.
+
+        Args:
+            model (tf.keras.Model): Trained model.
+            variant (str): "dynamic", "int8" or "float16".
+
+        Returns:
+            bytes: The serialized TFLite model.
+        """
+        converter = tf.lite.TFLiteConverter.from_keras_model(model)
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        if variant == "int8":
+            converter.representative_dataset = self._representative_dataset
+            converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+            converter.inference_input_type = tf.int8
+            converter.inference_output_type = tf.int8
+        elif variant == "float16":
+            converter.target_spec.supported_types = [tf.float16]
+        elif variant != "dynamic":
+            raise ValueError(f"unknown export variant: {variant}")
+        return converter.convert()
+
+    def _score(self, model) -> dict:
+        probabilities = np.concatenate([
+            model.predict(self.valid_images[start:start + self.config.params_batch_size], verbose=0)
+            for start in range(0, len(self.valid_images), self.config.params_batch_size)
+        ])
+        accuracy = float(np.mean(
+            np.argmax(probabilities, axis=1) == np.argmax(self.valid_labels, axis=1)
+        ))
+
+        sample = self.valid_images[:1]
+        model.predict(sample, verbose=0)  # warm-up, and fixes the TFLite input shape
+        runs = self.config.params_latency_runs
+        start = time.perf_counter()
+        for _ in range(runs):
+            model.predict(sample, verbose=0)
+        latency_ms = 1000 * (time.perf_counter() - start) / runs
+        return {"accuracy": accuracy, "latency_ms": round(latency_ms, 3)}
+
+    def export(self, model: tf.keras.Model = None) -> None:
+        """
+        Exports every configured variant and reports its size, single-image
+        latency and accuracy delta against the Keras model.
+
+        Args:
+            model (tf.keras.Model, optional): In-memory trained model. Loaded from
+                trained_model_path when omitted; the file must exist either way for its size.
+        """
+        if model is None:
+            model = tf.keras.models.load_model(self.config.trained_model_path)
+        self.load_validation_data()
+
+        baseline = self._score(model)
+        report = {
+            "keras": {
+                "path": str(self.config.trained_model_path),
+                "size_mb": round(os.path.getsize(self.config.trained_model_path) / 2**20, 3),
+                **baseline,
+            }
+        }
+
+        for variant in self.config.params_variants:
+            path = Path(self.config.root_dir) / f"model_{variant}.tflite"
+            with open(path, "wb") as f:
+                f.write(self.convert(model, variant))
+            scores = self._score(TFLiteModel(path))
+            report[variant] = {
+                "path": str(path),
+                "size_mb": round(os.path.getsize(path) / 2**20, 3),
+                **scores,
+                "accuracy_delta": round(scores["accuracy"] - baseline["accuracy"], 6),
+            }
+            logger.info(f"exported {variant} model: {report[variant]}")
+
+        save_json(path=Path(self.config.scores_file), data=report)
@@ -0,0 +1,135 @@
+import tensorflow as tf
+from pathlib import Path
+from typing import Set
+
+from cnnClassifier import logger
+
+PRECISIONS = ("float32", "mixed_float16", "mixed_bfloat16", "auto")
+
+# CPU flags with native half-precision matmuls; without them TF emulates the
+# narrower type and mixed precision is slower than float32.
+CPU_FLAGS = {
+    "mixed_bfloat16": {"avx512_bf16", "amx_bf16"},
+    "mixed_float16": {"avx512_fp16", "amx_fp16"},
+}
+
+
+def cpu_flags(cpuinfo: Path = Path("/proc/cpuinfo")) -> Set[str]:
+    """
+    Returns the feature flags of the first CPU, empty when they cannot be read.
+    """
+    try:
+        with open(cpuinfo) as f:
+            for line in f:
+                if line.startswith("flags"):
+                    return set(line.split(":", 1)[1].split())
+    except OSError:
+        pass
+    return set()
+
+
+def supported_policies() -> Set[str]:
+    """
+    Returns the mixed-precision policies this host runs natively.
+    """
+    if tf.config.list_physical_devices("GPU"):
+        return {"mixed_float16", "mixed_bfloat16"}
+    flags = cpu_flags()
+    return {policy for policy, needed in CPU_FLAGS.items() if flags & needed}
+
+
+def resolve_policy(precision: str) -> str:
+    """
+    Maps the PRECISION param to the dtype policy to train with.
+
+    "auto" picks bfloat16, then float16, then float32. An explicitly requested
+    mixed policy the host has no native support for falls back to float32.
+
+    Args:
+        precision (str): One of PRECISIONS.
+
+    Returns:
+        str: "float32", "mixed_float16" or "mixed_bfloat16".
+    """
+    if precision not in PRECISIONS:
+        raise ValueError(f"unknown PRECISION {precision!r}, expected one of {list(PRECISIONS)}")
+    if precision == "float32":
+        return precision
+    supported = supported_policies()
+    if precision == "auto":
+        for policy in ("mixed_bfloat16", "mixed_float16"):
+            if policy in supported:
+                return policy
+        return "float32"
+    if precision not in supported:
+        logger.warning(f"{precision} is not natively supported on this host, training in float32")
+        return "float32"
+    return precision
+
+
+def with_policy(model: tf.keras.Model, policy: str) -> tf.keras.Model:
+    """
+    Rebuilds a model with every layer under `policy`, except the output
+    layers, which stay float32 so the softmax and the loss are computed in
+    full precision. Weights are copied over; variables stay float32 under
+    the mixed policies.
+
+    Args:
+        model (tf.keras.Model): Functional model.
+        policy (str): Keras dtype policy name.
+
+    Returns:
+        tf.keras.Model: Uncompiled model sharing no state with `model`.
+    """
+    output_layers = set(model.output_names)
+
+    def clone_layer(layer):
+        config = layer.get_config()
+        config["dtype"] = "float32" if layer.name in output_layers else policy
+        return layer.__class__.from_config(config)
+
+    rebuilt = tf.keras.models.clone_model(model, clone_function=clone_layer)
+    rebuilt.set_weights(model.get_weights())
+    for source, target in zip(model.layers, rebuilt.layers):
+        target.trainable = source.trainable
+    return rebuilt
+
+
+def compile_like(
+    model: tf.keras.Model,
+    reference: tf.keras.Model,
+    policy: str = "float32",
+    jit_compile: bool = False,
+    learning_rate: float = None,
+) -> tf.keras.Model:
+    """
+    Compiles `model` with a fresh copy of the optimizer, the loss and the
+    metrics of `reference`. Under mixed_float16 the optimizer is wrapped in
+    a LossScaleOptimizer so small gradients do not underflow.
+
+    Args:
+        model (tf.keras.Model): Model to compile.
+        reference (tf.keras.Model): Compiled model to copy the settings from.
+        policy (str, optional): Dtype policy of `model`. Defaults to "float32".
+        jit_compile (bool, optional): Compile the train step with XLA. Defaults to False.
+        learning_rate (float, optional): Overrides the optimizer's learning rate.
+
+    Returns:
+        tf.keras.Model: `model`, compiled.
+    """
+    optimizer = reference.optimizer
+    if isinstance(optimizer, tf.keras.mixed_precision.LossScaleOptimizer):
+        optimizer = optimizer.inner_optimizer
+    optimizer_config = optimizer.get_config()
+    if learning_rate is not None:
+        optimizer_config["learning_rate"] = learning_rate
+    optimizer = optimizer.__class__.from_config(optimizer_config)
+    if policy == "mixed_float16":
+        optimizer = tf.keras.mixed_precision.LossScaleOptimizer(optimizer)
+    model.compile(
+        optimizer=optimizer,
+        loss=reference.loss,
+        metrics=["accuracy"],
+        jit_compile=jit_compile,
+    )
+    return model
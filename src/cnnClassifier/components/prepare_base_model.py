@@ -5,6 +5,7 @@ import tensorflow as tf
 from pathlib import Path
 
 from cnnClassifier.entity.config_entity import PrepareBaseModelConfig
+from cnnClassifier.components.backbones import HEADS, get_backbone
 
 
 class PrepareBaseModel:
@@ -36,23 +37,28 @@ class PrepareBaseModel:
         """
         self.config = config
         
-    def get_base_model(self):
+    def get_base_model(self, save: bool = True):
         """
-        Builds and saves the base model.
+        Builds and saves the base model selected by the BACKBONE param.
+
+        Args:
+            save (bool, optional): Save the model to base_model_path. Defaults to True.
 
         Returns:
             None
         """
-        self.model = tf.keras.applications.vgg16.VGG16(
+        backbone, _ = get_backbone(self.config.params_backbone)
+        self.model = backbone(
             input_shape = self.config.params_image_size,
             weights = self.config.params_weights,
             include_top = self.config.params_include_top
         )
         
-        self.save_model(path=self.config.base_model_path, model=self.model)
+        if save:
+            self.save_model(path=self.config.base_model_path, model=self.model)
         
     @staticmethod
-    def _prepare_full_model(model, classes, freeze_all, freeze_till, learning_rate):
+    def _prepare_full_model(model, classes, freeze_all, freeze_till, learning_rate, head="flatten"):
         """
         Creates and returns the full model.
 
@@ -60,23 +66,26 @@ class PrepareBaseModel:
             model (tf.keras.Model): Base model.
             classes (int): Number of output classes.
             freeze_all (bool): If True, freeze all layers in the model.
-            freeze_till (int): If specified and greater than 0, freeze layers until this index.
+            freeze_till (int): If specified and greater than 0, freeze all but the last `freeze_till` layers.
             learning_rate (float): Learning rate for model compilation.
+            head (str, optional): "flatten" or "gap" (GlobalAveragePooling2D) before the
+                classifier. Defaults to "flatten".
 
         Returns:
             tf.keras.Model: Full model.
         """
         if freeze_all:
             for layer in model.layers:
-                model.trainable = False
+                layer.trainable = False
         elif (freeze_till is not None) and (freeze_till > 0):
             for layer in model.layers[:-freeze_till]:
-                model.trainable = False
+                layer.trainable = False
         
-        flatten_in = tf.keras.layers.Flatten()(model.output)
+        flatten_in = HEADS[head]()(model.output)
         prediction = tf.keras.layers.Dense(
             units = classes,
             activation='softmax',
+            dtype='float32',  # stays float32 under mixed precision training
         )(flatten_in)
         
         full_model = tf.keras.models.Model(
@@ -93,10 +102,13 @@ class PrepareBaseModel:
         full_model.summary()
         return full_model
         
-    def update_base_model(self):
+    def update_base_model(self, save: bool = True):
         """
         Upgrades from the base model to the full model.
 
+        Args:
+            save (bool, optional): Save the model to updated_base_model_path. Defaults to True.
+
         Returns:
             None
         """
@@ -105,9 +117,11 @@ class PrepareBaseModel:
             classes=self.config.params_classes,
             freeze_all=True,
             freeze_till=None,
-            learning_rate=self.config.params_learning_rate
+            learning_rate=self.config.params_learning_rate,
+            head=self.config.params_head,
         )
-        self.save_model(path=self.config.updated_base_model_path, model=self.full_model)
+        if save:
+            self.save_model(path=self.config.updated_base_model_path, model=self.full_model)
     
     @staticmethod
     def save_model(path:Path, model:tf.keras.Model):
@@ -5,6 +5,8 @@ import tensorflow as tf
 import time
 
 from cnnClassifier.entity.config_entity import PrepareCallbacksConfig
+from cnnClassifier.components.callbacks import CosineAnnealing, RunMetadata, TimeBudget
+from cnnClassifier.components.profiler import ThroughputProfiler
 
 
 
@@ -20,11 +22,12 @@ class PrepareCallback:
         _create_tb_callbacks: Creates and returns TensorBoard callback.
         _create_ckpt_callbacks: Creates and returns ModelCheckpoint callback.
         get_tb_ckpt_callbacks: Retrieves a list of TensorBoard and ModelCheckpoint callbacks.
+        get_callbacks: Retrieves every callback configured in params.yaml.
 
     Usage:
         prepare_callback_config = PrepareCallbacksConfig(...)  # Initialize with appropriate configuration
         prepare_callback = PrepareCallback(config=prepare_callback_config)
-        tb_ckpt_callbacks = prepare_callback.get_tb_ckpt_callbacks()
+        callbacks = prepare_callback.get_callbacks()
     """
     def __init__(self, config: PrepareCallbacksConfig) -> None:
         """
@@ -81,3 +84,62 @@ class PrepareCallback:
             self._create_tb_callbacks,
             self._create_ckpt_callbacks
         ]
+
+
+    def get_callbacks(self):
+        """
+        Retrieves TensorBoard and ModelCheckpoint plus the callbacks enabled
+        in params.yaml: EarlyStopping, a ReduceLROnPlateau or cosine learning
+        rate schedule, a wall-clock time budget and the throughput profiler.
+        A RunMetadata callback last in the list writes their settings and
+        effect to the run metadata.
+
+        Returns:
+            list: List of callbacks for `model.fit`.
+        """
+        callbacks = self.get_tb_ckpt_callbacks()
+
+        if self.config.params_early_stopping_patience > 0:
+            callbacks.append(tf.keras.callbacks.EarlyStopping(
+                monitor="val_loss",
+                patience=self.config.params_early_stopping_patience,
+                restore_best_weights=True,
+                verbose=1,
+            ))
+
+        if self.config.params_lr_schedule == "plateau":
+            callbacks.append(tf.keras.callbacks.ReduceLROnPlateau(
+                monitor="val_loss",
+                factor=self.config.params_lr_plateau_factor,
+                patience=self.config.params_lr_plateau_patience,
+                min_lr=self.config.params_min_learning_rate,
+                verbose=1,
+            ))
+        elif self.config.params_lr_schedule == "cosine":
+            callbacks.append(CosineAnnealing(min_lr=self.config.params_min_learning_rate))
+        elif self.config.params_lr_schedule != "none":
+            raise ValueError(f"unknown LR_SCHEDULE: {self.config.params_lr_schedule}")
+
+        if self.config.params_time_budget_minutes > 0:
+            callbacks.append(TimeBudget(self.config.params_time_budget_minutes))
+
+        if self.config.params_profile:
+            timestamp = time.strftime("%Y-%m-%d-%H-%M-%S")
+            callbacks.append(ThroughputProfiler(
+                summary_file=self.config.profile_dir / f"profile_at_{timestamp}.json",
+                batch_size=self.config.params_batch_size,
+                trace_steps=self.config.params_profile_trace_steps,
+                trace_dir=self.config.tensorboard_root_log_dir / f"trace_at_{timestamp}",
+            ))
+
+        settings = {
+            "early_stopping_patience": self.config.params_early_stopping_patience,
+            "lr_schedule": self.config.params_lr_schedule,
+            "lr_plateau_factor": self.config.params_lr_plateau_factor,
+            "lr_plateau_patience": self.config.params_lr_plateau_patience,
+            "min_learning_rate": self.config.params_min_learning_rate,
+            "time_budget_minutes": self.config.params_time_budget_minutes,
+            "callbacks": [type(callback).__name__ for callback in callbacks],
+        }
+        callbacks.append(RunMetadata(self.config.run_metadata_file, settings, callbacks))
+        return callbacks
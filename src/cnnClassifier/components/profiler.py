@@ -0,0 +1,191 @@
+import os
+import time
+import resource
+import collections
+import numpy as np
+import tensorflow as tf
+from pathlib import Path
+from typing import List, Optional
+
+from cnnClassifier import logger
+from cnnClassifier.utils.common import save_json
+
+
+def rss_mb() -> Optional[float]:
+    """
+    Returns the resident set size of this process in MiB, None off Linux.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        return None
+
+
+def peak_rss_mb() -> float:
+    """
+    Returns the peak resident set size of this process in MiB.
+    """
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class _TimedInput(tf.keras.utils.Sequence):
+    # Hands training batches of a Keras Sequence (such as a DirectoryIterator)
+    # to Keras and records when each one was ready, so the profiler can tell
+    # how long a step waited for its input.
+    def __init__(self, data, ready: collections.deque) -> None:
+        super().__init__()
+        self.data = data
+        self.ready = ready
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __getitem__(self, index):
+        batch = self.data[index]
+        self.ready.append((time.perf_counter(), len(batch[0])))
+        return batch
+
+    def on_epoch_end(self):
+        if hasattr(self.data, "on_epoch_end"):
+            self.data.on_epoch_end()
+
+
+class ThroughputProfiler(tf.keras.callbacks.Callback):
+    """
+    A low-overhead training profiler.
+
+    Every training step is split into the time it waited for its batch and
+    the time spent computing it. The split comes from the moment the batch
+    was ready: a Keras Sequence is wrapped so that it records when it returned
+    each batch, and a tf.data pipeline gets a last map stage that records
+    when the step pulled the batch out of it, so input work and compute are
+    measured separately even when batches are prefetched. The dataset
+    itself, its iterator and its prefetching are left to Keras. Each epoch
+    records images/sec, mean and p95 step times, the data-wait fraction, the
+    process RSS and the CPU utilization from `os.times`. The summary is
+    written to one JSON file per run at the end of every `fit` call.
+    Optionally, a TF profiler trace is captured for a window of training
+    steps.
+
+    Only timestamps are taken per step; RSS and CPU time are read once per epoch.
+    """
+    def __init__(
+        self,
+        summary_file: Path,
+        batch_size: int,
+        trace_steps: Optional[List[int]] = None,
+        trace_dir: Optional[Path] = None,
+    ) -> None:
+        """
+        Initializes the ThroughputProfiler object.
+
+        Args:
+            summary_file (Path): JSON file the run summary is written to.
+            batch_size (int): Images per step, used when the input is not wrapped.
+            trace_steps (list, optional): [first, last] global training step of a TF
+                profiler trace. No trace when omitted or when last is 0.
+            trace_dir (Path, optional): Log directory of the trace, viewable in TensorBoard.
+        """
+        super().__init__()
+        self.summary_file = Path(summary_file)
+        self.batch_size = batch_size
+        self.trace_steps = trace_steps if trace_steps and trace_steps[1] > 0 else None
+        self.trace_dir = trace_dir
+        self.ready = collections.deque()
+        self.global_step = 0
+        self.tracing = False
+        self.summary = {"phases": []}
+
+    def wrap(self, data):
+        """
+        Instruments the training input so data-wait time can be measured.
+
+        Args:
+            data: Keras Sequence or tf.data.Dataset.
+
+        Returns:
+            The wrapped Sequence, or the dataset with a timestamping map appended.
+        """
+        if isinstance(data, tf.data.Dataset):
+            return data.map(self._stamp)
+        return _TimedInput(data, self.ready)
+
+    def _record_ready(self, images) -> np.int32:
+        self.ready.append((time.perf_counter(), int(images)))
+        return np.int32(images)
+
+    def _stamp(self, *batch):
+        # runs when a step takes the batch from the pipeline, after any prefetch buffer
+        recorded = tf.numpy_function(self._record_ready, [tf.shape(batch[0])[0]], tf.int32)
+        with tf.control_dependencies([recorded]):
+            return (tf.identity(batch[0]), *batch[1:])
+
+    def on_train_begin(self, logs=None):
+        self.ready.clear()
+        self.epochs = []
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self.step_times, self.wait_times, self.images = [], [], 0
+        self.epoch_start = time.perf_counter()
+        self.cpu_start = os.times()
+
+    def on_train_batch_begin(self, batch, logs=None):
+        if self.trace_steps and self.global_step == self.trace_steps[0] and not self.tracing:
+            tf.profiler.experimental.start(str(self.trace_dir))
+            self.tracing = True
+        self.batch_start = time.perf_counter()
+
+    def on_train_batch_end(self, batch, logs=None):
+        end = time.perf_counter()
+        step = end - self.batch_start
+        self.step_times.append(step)
+        if self.ready:
+            ready, images = self.ready.popleft()
+            self.wait_times.append(min(max(ready - self.batch_start, 0.0), step))
+            self.images += images
+        else:
+            self.images += self.batch_size
+        self.global_step += 1
+        if self.tracing and self.global_step > self.trace_steps[1]:
+            self._stop_trace()
+
+    def _stop_trace(self) -> None:
+        tf.profiler.experimental.stop()
+        self.tracing = False
+        logger.info(f"profiler trace of steps {self.trace_steps} saved at: {self.trace_dir}")
+
+    def on_epoch_end(self, epoch, logs=None):
+        # batches prefetched past the last step of the epoch are not consumed
+        self.ready.clear()
+        wall = time.perf_counter() - self.epoch_start
+        cpu_end = os.times()
+        cpu = (cpu_end.user - self.cpu_start.user) + (cpu_end.system - self.cpu_start.system)
+        steps = np.array(self.step_times)
+        record = {
+            "epoch": epoch + 1,
+            "steps": len(steps),
+            "wall_s": round(wall, 3),
+            "images_per_sec": round(self.images / steps.sum(), 2) if len(steps) else None,
+            "step_ms_mean": round(1000 * steps.mean(), 2) if len(steps) else None,
+            "step_ms_p95": round(1000 * np.percentile(steps, 95), 2) if len(steps) else None,
+            "cpu_utilization_pct": round(100 * cpu / wall / (os.cpu_count() or 1), 1),
+            "cpu_cores_busy": round(cpu / wall, 2),
+            "rss_mb": round(rss_mb(), 1) if rss_mb() is not None else None,
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+        }
+        if len(self.wait_times) == len(steps) and len(steps):
+            waits = np.array(self.wait_times)
+            record.update({
+                "data_wait_ms_mean": round(1000 * waits.mean(), 2),
+                "compute_ms_mean": round(1000 * (steps - waits).mean(), 2),
+                "data_wait_fraction": round(float(waits.sum() / steps.sum()), 4),
+            })
+        self.epochs.append(record)
+        logger.info(f"profile: {record}")
+
+    def on_train_end(self, logs=None):
+        if self.tracing:
+            self._stop_trace()
+        self.summary["phases"].append({"epochs": self.epochs})
+        save_json(path=self.summary_file, data=self.summary)
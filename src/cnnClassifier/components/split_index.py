@@ -0,0 +1,132 @@
+import os
+import numpy as np
+from pathlib import Path
+from typing import List, Tuple
+
+from cnnClassifier import logger
+from cnnClassifier.components.manifest import DatasetManifest
+
+
+class SplitIndex:
+    """
+    The train/validation split computed once at ingestion time.
+
+    Stored as a small `.npz` with the image paths, class ids and a
+    validation mask, so a stage gets its split with a single `np.load`
+    instead of scanning the dataset directory. Training, evaluation and
+    every loader read the same file, so evaluation never scores on
+    training images.
+
+    Methods:
+        from_manifest: Builds the index from the split column of a manifest.
+        save: Writes the index.
+        load: Reads an index written by `save`.
+        files: Returns the paths and class ids of a subset.
+        dataframe: Returns a subset as a DataFrame for `flow_from_dataframe`.
+    """
+    def __init__(self, paths: np.ndarray, labels: np.ndarray, is_validation: np.ndarray, class_names: List[str]) -> None:
+        """
+        Initializes the SplitIndex object.
+
+        Args:
+            paths (np.ndarray): Image paths.
+            labels (np.ndarray): Class id of every image.
+            is_validation (np.ndarray): True for validation images.
+            class_names (list): Sorted class names, indexed by class id.
+        """
+        self.paths = paths
+        self.labels = labels
+        self.is_validation = is_validation
+        self.class_names = list(class_names)
+
+    @classmethod
+    def from_manifest(cls, manifest: DatasetManifest) -> "SplitIndex":
+        """
+        Builds the index from the split column of a manifest.
+
+        Args:
+            manifest (DatasetManifest): Manifest with assigned splits.
+
+        Returns:
+            SplitIndex: The split index.
+        """
+        rows = manifest.load()
+        class_names = manifest.class_names()
+        class_ids = {name: index for index, name in enumerate(class_names)}
+        return cls(
+            paths=np.array([str(manifest.data_dir / row["path"]) for row in rows]),
+            labels=np.array([class_ids[row["label"]] for row in rows], dtype=np.int32),
+            is_validation=np.array([row["split"] == "validation" for row in rows]),
+            class_names=class_names,
+        )
+
+    def save(self, path: Path) -> None:
+        """
+        Writes the index.
+
+        Args:
+            path (Path): Destination `.npz` file.
+        """
+        tmp_path = Path(f"{path}.tmp.npz")
+        np.savez_compressed(
+            tmp_path,
+            paths=self.paths,
+            labels=self.labels,
+            is_validation=self.is_validation,
+            class_names=np.array(self.class_names),
+        )
+        os.replace(tmp_path, path)
+        logger.info(
+            f"split index saved at: {path} "
+            f"({int((~self.is_validation).sum())} training, {int(self.is_validation.sum())} validation)"
+        )
+
+    @classmethod
+    def load(cls, path: Path) -> "SplitIndex":
+        """
+        Reads an index written by `save`.
+
+        Args:
+            path (Path): `.npz` file.
+
+        Returns:
+            SplitIndex: The split index.
+        """
+        with np.load(path) as content:
+            return cls(
+                paths=content["paths"],
+                labels=content["labels"],
+                is_validation=content["is_validation"],
+                class_names=content["class_names"].tolist(),
+            )
+
+    def files(self, subset: str) -> Tuple[List[str], List[int]]:
+        """
+        Returns the paths and class ids of a subset.
+
+        Args:
+            subset (str): "training" or "validation".
+
+        Returns:
+            tuple: (file paths, class ids).
+        """
+        mask = self.is_validation if subset == "validation" else ~self.is_validation
+        return self.paths[mask].tolist(), self.labels[mask].tolist()
+
+    def dataframe(self, subset: str):
+        """
+        Returns a subset as a DataFrame for `ImageDataGenerator.flow_from_dataframe`.
+
+        Args:
+            subset (str): "training" or "validation".
+
+        Returns:
+            pd.DataFrame: "filename" and "class" columns.
+        """
+        import pandas as pd
+
+        paths, labels = self.files(subset)
+        return pd.DataFrame({
+            "filename": paths,
+            "class": [self.class_names[label] for label in labels],
+        })
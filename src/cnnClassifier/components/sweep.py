@@ -0,0 +1,302 @@
+import os
+import json
+import math
+import time
+import random
+import hashlib
+import itertools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import replace
+from pathlib import Path
+from typing import Dict, List
+
+from cnnClassifier import logger
+from cnnClassifier.config.configuration import ConfigurationManager
+from cnnClassifier.entity.config_entity import SweepConfig
+from cnnClassifier.components.prepare_callbacks import PrepareCallback
+from cnnClassifier.components.training import Training
+from cnnClassifier.utils.common import create_directories, save_json
+
+STRATEGIES = ("grid", "random", "halving")
+
+
+def _init_worker(threads: int) -> None:
+    # runs in every spawned trial process before its first TensorFlow op
+    os.environ["TF_NUM_INTRAOP_THREADS"] = str(threads)
+    os.environ["TF_NUM_INTEROP_THREADS"] = "2"
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    import tensorflow as tf
+    try:
+        tf.config.threading.set_intra_op_parallelism_threads(threads)
+        tf.config.threading.set_inter_op_parallelism_threads(2)
+    except RuntimeError:
+        pass
+
+
+def run_trial(params: dict, trial_dir: str) -> dict:
+    """
+    Trains one sweep trial with `params` overriding params.yaml, writing
+    everything it produces under `trial_dir`.
+
+    Args:
+        params (dict): Params of the trial.
+        trial_dir (str): Output directory of the trial.
+
+    Returns:
+        dict: Best validation accuracy, its loss and epoch, epochs run and duration.
+    """
+    trial_dir = Path(trial_dir)
+    config = ConfigurationManager(params_overrides=params)
+    training_config = replace(
+        config.get_training_config(),
+        root_dir=trial_dir,
+        trained_model_path=trial_dir / "model.h5",
+        checkpoint_dir=trial_dir / "checkpoints",
+    )
+    callbacks_config = replace(
+        config.get_prepare_callback_config(),
+        tensorboard_root_log_dir=trial_dir / "tensorboard",
+        checkpoint_model_filepath=trial_dir / "checkpoint" / "model.h5",
+        run_metadata_file=trial_dir / "run_metadata.json",
+        profile_dir=trial_dir,
+    )
+    create_directories([trial_dir / "tensorboard", trial_dir / "checkpoint"], verbose=False)
+
+    start = time.perf_counter()
+    training = Training(config=training_config)
+    training.get_base_model()
+    training.train_valid_generator()
+    training.train(callback_list=PrepareCallback(config=callbacks_config).get_callbacks())
+
+    with open(callbacks_config.run_metadata_file) as f:
+        epochs = [epoch for phase in json.load(f)["phases"] for epoch in phase["epochs"]]
+    best = max(epochs, key=lambda epoch: (epoch.get("val_accuracy", 0.0), -epoch.get("val_loss", 0.0)))
+    return {
+        "val_accuracy": best.get("val_accuracy"),
+        "val_loss": best.get("val_loss"),
+        "best_epoch": best["epoch"],
+        "epochs_run": len(epochs),
+        "duration_s": round(time.perf_counter() - start, 1),
+    }
+
+
+class HyperparameterSweep:
+    """
+    A grid, random or successive-halving search over params.yaml values.
+
+    Trials run in a pool of spawned processes, each limited to its share of
+    the CPU threads. Every result is memoized under a hash of the trial's
+    effective params and of the base model and split index files, so a
+    repeated sweep only trains configurations it has not seen. With a
+    frozen backbone (FINE_TUNE_BLOCKS: 0) trials train in bottleneck mode,
+    and the shared feature cache is filled once before the trials start,
+    unless the sweep varies AUGMENTATION without cached augmented copies
+    (BOTTLENECK_COPIES: 0), which bottleneck mode would ignore. Bottleneck
+    trials that still differ only in AUGMENTATION share one memo key.
+
+    Methods:
+        __init__: Initializes the HyperparameterSweep object.
+        candidates: Returns the trial params for the configured strategy.
+        trial_key: Returns the memoization key of a trial.
+        warm_feature_cache: Computes the bottleneck features every trial reads.
+        run_trials: Runs or recalls a list of trials.
+        run: Runs the sweep and writes a summary.
+    """
+    def __init__(self, config: SweepConfig) -> None:
+        """
+        Initializes the HyperparameterSweep object.
+
+        Args:
+            config (SweepConfig): Configuration object for the sweep.
+        """
+        if config.params_strategy not in STRATEGIES:
+            raise ValueError(f"unknown sweep STRATEGY {config.params_strategy!r}, expected one of {list(STRATEGIES)}")
+        self.config = config
+        self.base = ConfigurationManager()
+        self.base_params = {
+            key: value for key, value in self.base.params.to_dict().items()
+            if key not in ("SWEEP", "COMPARISON")
+        }
+        unknown = [key for key in config.params_space if key not in self.base_params]
+        if unknown:
+            raise ValueError(f"sweep SPACE has unknown params {unknown}, expected keys of params.yaml")
+        # trials are single-process; a frozen backbone trains on cached features
+        self.fixed = {"DISTRIBUTION": "none"}
+        if self.base_params["FINE_TUNE_BLOCKS"] == 0 and "TRAINING_MODE" not in config.params_space:
+            copies = config.params_space.get("BOTTLENECK_COPIES", [self.base_params["BOTTLENECK_COPIES"]])
+            if max(copies) > 0 or "AUGMENTATION" not in config.params_space:
+                self.fixed["TRAINING_MODE"] = "bottleneck"
+            else:
+                logger.warning(
+                    "sweep: AUGMENTATION is swept with BOTTLENECK_COPIES: 0, so trials train end to end; "
+                    "set BOTTLENECK_COPIES to train them on cached augmented features"
+                )
+        self.rng = random.Random(config.params_seed)
+
+    def candidates(self) -> List[dict]:
+        """
+        Returns the trial params for the configured strategy: every grid
+        point for "grid", TRIALS sampled grid points for "random" and
+        "halving" (which leaves out EPOCHS, its budget dimension).
+
+        Returns:
+            list: One dict of params per trial.
+        """
+        space = dict(self.config.params_space)
+        if self.config.params_strategy == "halving":
+            space.pop("EPOCHS", None)
+        grid = [dict(zip(space, values)) for values in itertools.product(*space.values())]
+        if self.config.params_strategy == "grid":
+            return grid
+        return self.rng.sample(grid, min(self.config.params_trials, len(grid)))
+
+    def trial_key(self, params: dict) -> str:
+        """
+        Returns the memoization key of a trial.
+
+        Args:
+            params (dict): Params of the trial.
+
+        Returns:
+            str: Hex digest of the effective params and the input files.
+        """
+        inputs = [
+            (str(path), path.stat().st_size, path.stat().st_mtime_ns)
+            for path in (
+                Path(self.base.config.prepare_base_model.updated_base_model_path),
+                Path(self.base.config.data_ingestion.split_index_file),
+            )
+            if path.exists()
+        ]
+        effective = {**self.base_params, **self.fixed, **params}
+        if effective["TRAINING_MODE"] == "bottleneck" and effective["BOTTLENECK_COPIES"] == 0:
+            # without cached augmented copies AUGMENTATION changes nothing
+            effective["AUGMENTATION"] = False
+        return hashlib.sha256(json.dumps([effective, inputs], sort_keys=True).encode()).hexdigest()[:16]
+
+    def warm_feature_cache(self, trials: List[dict]) -> None:
+        """
+        Computes the bottleneck features every trial reads, once, so the trial
+        processes only read the shared cache.
+
+        Args:
+            trials (list): Params of the trials about to run.
+        """
+        if self.fixed.get("TRAINING_MODE") != "bottleneck":
+            return
+        augmented = any(
+            {**self.base_params, **trial}["AUGMENTATION"] for trial in trials
+        )
+        training = Training(config=ConfigurationManager(params_overrides=self.fixed).get_training_config())
+        training.get_base_model()
+        training.build_feature_cache(self.base_params["BOTTLENECK_COPIES"] if augmented else 0)
+
+    def run_trials(self, trials: List[dict]) -> List[dict]:
+        """
+        Runs the trials that have no memoized result and recalls the others.
+        Trials with the same key are run and reported once.
+
+        Args:
+            trials (list): Params of the trials.
+
+        Returns:
+            list: One record per trial with its params, key and result (or error).
+        """
+        records, pending, seen = [], {}, set()
+        for params in trials:
+            key = self.trial_key(params)
+            if key in seen:
+                continue
+            seen.add(key)
+            result_file = self.config.results_dir / f"{key}.json"
+            if result_file.exists():
+                with open(result_file) as f:
+                    records.append(json.load(f))
+            else:
+                pending[key] = params
+        logger.info(
+            f"sweep: {len(trials) - len(seen)} duplicate trials, "
+            f"{len(seen) - len(pending)} memoized, {len(pending)} to run"
+        )
+        if not pending:
+            return records
+
+        self.warm_feature_cache(list(pending.values()))
+        workers = min(self.config.params_workers, len(pending))
+        threads = max(1, (os.cpu_count() or 1) // workers)
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(threads,),
+        ) as pool:
+            futures = {
+                pool.submit(
+                    run_trial,
+                    {**self.fixed, **params},
+                    str(self.config.root_dir / "trials" / key),
+                ): key
+                for key, params in pending.items()
+            }
+            for future in as_completed(futures):
+                key = futures[future]
+                record = {"key": key, "params": pending[key]}
+                try:
+                    record.update(future.result())
+                except Exception as e:
+                    logger.exception(e)
+                    record["error"] = repr(e)
+                else:
+                    save_json(path=self.config.results_dir / f"{key}.json", data=record)
+                logger.info(f"sweep trial: {record}")
+                records.append(record)
+        return records
+
+    @staticmethod
+    def _rank(records: List[dict]) -> List[dict]:
+        return sorted(
+            records,
+            key=lambda record: (record.get("val_accuracy") or 0.0, -(record.get("val_loss") or math.inf)),
+            reverse=True,
+        )
+
+    def run(self) -> Dict:
+        """
+        Runs the sweep and writes a summary next to the memoized results.
+
+        Returns:
+            dict: The summary, with every trial ranked by validation accuracy.
+        """
+        trials = self.candidates()
+        if self.config.params_strategy != "halving":
+            ranked = self._rank(self.run_trials(trials))
+            rungs = []
+        else:
+            max_epochs = max(self.config.params_space.get("EPOCHS", [self.base_params["EPOCHS"]]))
+            epochs, rungs = self.config.params_min_epochs, []
+            while True:
+                epochs = min(epochs, max_epochs)
+                ranked = self._rank(self.run_trials([{**trial, "EPOCHS": epochs} for trial in trials]))
+                rungs.append({"epochs": epochs, "trials": ranked})
+                if epochs >= max_epochs or len(trials) == 1:
+                    break
+                keep = max(1, math.ceil(len(ranked) / self.config.params_eta))
+                trials = [
+                    {key: value for key, value in record["params"].items() if key != "EPOCHS"}
+                    for record in ranked[:keep]
+                ]
+                epochs *= self.config.params_eta
+
+        summary = {
+            "strategy": self.config.params_strategy,
+            "space": self.config.params_space,
+            "fixed": self.fixed,
+            "best": ranked[0] if ranked else None,
+            "trials": ranked,
+        }
+        if rungs:
+            summary["rungs"] = rungs
+        timestamp = time.strftime("%Y-%m-%d-%H-%M-%S")
+        save_json(path=self.config.root_dir / f"sweep_at_{timestamp}.json", data=summary)
+        return summary
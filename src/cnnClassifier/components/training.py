@@ -1,4 +1,18 @@
 from cnnClassifier.entity.config_entity import TrainingConfig
+from cnnClassifier.components.data_pipeline import ImageDatasetLoader
+from cnnClassifier.components.image_store import PreprocessedImageStore
+from cnnClassifier.components.split_index import SplitIndex
+from cnnClassifier.components.feature_cache import BottleneckFeatureCache, build_head_model, split_backbone_head
+from cnnClassifier.components.backbones import get_preprocess_input, unfreeze_top_blocks
+from cnnClassifier.components.precision import compile_like, resolve_policy, with_policy
+from cnnClassifier.components.distribution import distribute_dataset, get_strategy, save_on_chief
+from cnnClassifier.components.profiler import ThroughputProfiler
+from cnnClassifier.components.checkpointing import TrainingCheckpoint
+from cnnClassifier import logger
+from dataclasses import asdict
+import json
+import hashlib
+import numpy as np
 import tensorflow as tf
 from pathlib import Path
 
@@ -12,36 +26,85 @@ class Training:
         config (TrainingConfig): Configuration object for training.
 
     Methods:
+        use_model: Train an in-memory model instead of loading the updated base model.
         get_base_model: Load the base model for training.
         train_valid_generator: Set up training and validation data generators.
+        train_valid_dataset: Set up cached tf.data training and validation pipelines.
+        configure_precision: Rebuild the model for the PRECISION, JIT_COMPILE and LEARNING_RATE params.
         save_model: Save the trained model to a specified path.
         train: Perform the training process using the configured parameters and callbacks.
+        build_feature_cache: Compute the frozen-backbone features that are not cached yet.
+        train_bottleneck: Train only the head on cached backbone features.
+        fine_tune: Unfreeze the top conv blocks and keep training at a lower learning rate.
     """
     def __init__(self, config: TrainingConfig):
         """
         Initializes the Training object.
 
+        The tf.distribute strategy for the DISTRIBUTION param is created here,
+        so construct Training before any other TensorFlow work.
+
         Args:
             config (TrainingConfig): Configuration object for training.
         """
         self.config = config
+        self.strategy = get_strategy(
+            config.params_distribution, config.params_num_local_replicas
+        )
+        self.distributed = config.params_distribution != "none"
+        # BATCH_SIZE is per replica; every step consumes one batch per replica.
+        self.global_batch_size = config.params_batch_size * self.strategy.num_replicas_in_sync
+        if self.distributed:
+            logger.info(
+                f"{config.params_distribution} training on {self.strategy.num_replicas_in_sync} replicas, "
+                f"global batch size {self.global_batch_size}"
+            )
     
+    def use_model(self, model: tf.keras.Model):
+        """
+        Train an in-memory model instead of loading the updated base model.
+
+        Args:
+            model (tf.keras.Model): Compiled full model, e.g. PrepareBaseModel.full_model.
+        """
+        if self.distributed:
+            raise ValueError("in-memory models cannot be distributed, load them with get_base_model")
+        self.model = model
+
     def get_base_model(self):
         """
-        Load the base model for training.
+        Load the base model for training, under the strategy scope so its
+        variables are mirrored across replicas.
         """
-        self.model = tf.keras.models.load_model(
-            self.config.updated_base_model_path
-        )
+        with self.strategy.scope():
+            self.model = tf.keras.models.load_model(
+                self.config.updated_base_model_path
+            )
     
+    def _split_index(self):
+        if self.config.split_index_file.exists():
+            return SplitIndex.load(self.config.split_index_file)
+        return None
+
     def train_valid_generator(self):
         """
         Set up training and validation data generators.
+
+        Files and splits come from the split index written at ingestion; without
+        one the directory is scanned with validation_split=0.20. Images go
+        through the BACKBONE's preprocess_input. Uses the tf.data pipeline
+        instead when DATA_LOADER is "tf_data" or training is distributed.
         """
+        if self.config.params_data_loader == "tf_data" or self.distributed:
+            self.train_valid_dataset()
+            return
+
+        split_index = self._split_index()
         datagenerator_kwargs = dict(
-            rescale = 1./255,
-            validation_split=0.20
+            preprocessing_function = get_preprocess_input(self.config.params_backbone),
         )
+        if split_index is None:
+            datagenerator_kwargs["validation_split"] = 0.20
 
         dataflow_kwargs = dict(
             target_size=self.config.params_image_size[:-1],
@@ -49,16 +112,26 @@ class Training:
             interpolation="bilinear"
         )
 
+        def flow(datagenerator, subset, shuffle):
+            if split_index is not None:
+                return datagenerator.flow_from_dataframe(
+                    split_index.dataframe(subset),
+                    classes=split_index.class_names,
+                    shuffle=shuffle,
+                    **dataflow_kwargs
+                )
+            return datagenerator.flow_from_directory(
+                directory=self.config.training_data,
+                subset=subset,
+                shuffle=shuffle,
+                **dataflow_kwargs
+            )
+
         valid_datagenerator = tf.keras.preprocessing.image.ImageDataGenerator(
             **datagenerator_kwargs
         )
 
-        self.valid_generator = valid_datagenerator.flow_from_directory(
-            directory=self.config.training_data,
-            subset="validation",
-            shuffle=False,
-            **dataflow_kwargs
-        )
+        self.valid_generator = flow(valid_datagenerator, "validation", shuffle=False)
 
         if self.config.params_is_augmentation:
             train_datagenerator = tf.keras.preprocessing.image.ImageDataGenerator(
@@ -73,45 +146,334 @@ class Training:
         else:
             train_datagenerator = valid_datagenerator
 
-        self.train_generator = train_datagenerator.flow_from_directory(
-            directory=self.config.training_data,
-            subset="training",
+        self.train_generator = flow(train_datagenerator, "training", shuffle=True)
+        indices = self.train_generator.class_indices
+        self.class_names = sorted(indices, key=indices.get)
+
+    def _dataset_loader(self) -> ImageDatasetLoader:
+        return ImageDatasetLoader(
+            data_dir=self.config.training_data,
+            image_size=self.config.params_image_size,
+            batch_size=self.global_batch_size,
+            validation_split=0.20,
+            cache=self.config.params_data_cache,
+            cache_dir=self.config.data_cache_dir,
+            store=PreprocessedImageStore(
+                root_dir=self.config.image_store_dir,
+                image_size=self.config.params_image_size,
+            ),
+            split_index=self._split_index(),
+            preprocess_input=get_preprocess_input(self.config.params_backbone),
+        )
+
+    def train_valid_dataset(self):
+        """
+        Set up cached tf.data training and validation pipelines.
+        """
+        loader = self._dataset_loader()
+        self.class_names = list(loader.class_names)
+        self.valid_generator, self.valid_samples = loader.build("validation")
+        self.train_generator, self.train_samples = loader.build(
+            "training",
             shuffle=True,
-            **dataflow_kwargs
+            augment=self.config.params_is_augmentation,
         )
+        if self.distributed:
+            self.valid_generator = distribute_dataset(self.valid_generator)
+            self.train_generator = distribute_dataset(self.train_generator)
 
     @staticmethod
     def save_model(path: Path, model: tf.keras.Model):
         """
-        Save the trained model to a specified path.
+        Save the trained model to a specified path. In multi-worker training
+        only the chief writes it.
 
         Args:
             path (Path): The path where the model will be saved.
             model (tf.keras.Model): The trained model to be saved.
         """
-        model.save(path)
+        save_on_chief(model, path)
 
 
-    def train(self, callback_list: list):
+    def configure_precision(self):
         """
-        Perform the training process using the configured parameters and callbacks.
+        Rebuild the model for the PRECISION, JIT_COMPILE and LEARNING_RATE params.
 
-        Args:
-            callback_list (list): List of callbacks to be applied during training.
+        Under a mixed policy every layer computes in float16/bfloat16 while the
+        softmax output layer stays float32; JIT_COMPILE compiles the train step
+        with XLA. The updated base model was compiled at the LEARNING_RATE it
+        was prepared with, so it is recompiled when the training params (e.g.
+        of a sweep trial) ask for another one. Nothing changes for float32
+        without JIT at the same learning rate.
         """
-        self.steps_per_epoch = self.train_generator.samples // self.train_generator.batch_size
-        self.validation_steps = self.valid_generator.samples // self.valid_generator.batch_size
+        self.policy = resolve_policy(self.config.params_precision)
+        logger.info(
+            f"training with dtype policy {self.policy}, jit_compile={self.config.params_jit_compile}, "
+            f"learning rate {self.config.params_learning_rate}"
+        )
+        if (
+            self.policy == "float32"
+            and not self.config.params_jit_compile
+            and self._has_learning_rate(self.model, self.config.params_learning_rate)
+        ):
+            return
+        reference = self.model
+        self.model = compile_like(
+            with_policy(reference, self.policy) if self.policy != "float32" else reference,
+            reference,
+            policy=self.policy,
+            jit_compile=self.config.params_jit_compile,
+            learning_rate=self.config.params_learning_rate,
+        )
+
+    @staticmethod
+    def _has_learning_rate(model: tf.keras.Model, learning_rate: float) -> bool:
+        optimizer = model.optimizer
+        if isinstance(optimizer, tf.keras.mixed_precision.LossScaleOptimizer):
+            optimizer = optimizer.inner_optimizer
+        current = optimizer.get_config().get("learning_rate")
+        # the optimizer keeps a float32 copy; a schedule (a dict) never matches
+        return isinstance(current, float) and bool(np.isclose(current, learning_rate, rtol=1e-6))
+
+    def _fit(self, callback_list: list, epochs: int, initial_epoch: int = 0):
+        if isinstance(self.train_generator, tf.data.Dataset):
+            # finite datasets: every epoch is one full pass
+            self.steps_per_epoch = None
+            self.validation_steps = None
+        else:
+            self.steps_per_epoch = self.train_generator.samples // self.train_generator.batch_size
+            self.validation_steps = self.valid_generator.samples // self.valid_generator.batch_size
+
+        train_data = self.train_generator
+        for callback in callback_list:
+            # distributed datasets are sharded per worker and are not wrapped
+            if isinstance(callback, ThroughputProfiler) and not self.distributed:
+                train_data = callback.wrap(train_data)
 
         self.model.fit(
-            self.train_generator,
-            epochs=self.config.params_epochs,
+            train_data,
+            epochs=epochs,
+            initial_epoch=initial_epoch,
             steps_per_epoch=self.steps_per_epoch,
             validation_steps=self.validation_steps,
             validation_data=self.valid_generator,
             callbacks=callback_list
         )
 
-        self.save_model(
-            path=self.config.trained_model_path,
-            model=self.model
-        )
\ No newline at end of file
+    def checkpoint_dir(self) -> Path:
+        """
+        Directory of this run's checkpoints, named after a digest of the
+        training params and of the base model and split index files, so a
+        run never resumes from a checkpoint of a different configuration.
+        """
+        params = {key: value for key, value in asdict(self.config).items() if key.startswith("params_")}
+        inputs = [
+            (str(path), path.stat().st_size, path.stat().st_mtime_ns)
+            for path in (Path(self.config.updated_base_model_path), Path(self.config.split_index_file))
+            if path.exists()
+        ]
+        digest = hashlib.sha256(json.dumps([params, inputs], sort_keys=True, default=str).encode())
+        return Path(self.config.checkpoint_dir) / digest.hexdigest()[:16]
+
+    def train(self, callback_list: list, save: bool = True):
+        """
+        Perform the training process using the configured parameters and callbacks.
+
+        The first EPOCHS train the head on the frozen backbone, on full images
+        or on cached features in bottleneck mode. With FINE_TUNE_BLOCKS > 0 a
+        second phase then fine-tunes the top conv blocks.
+
+        Full training state is checkpointed every CHECKPOINT_EVERY_EPOCHS, and
+        with RESUME an interrupted run continues after the newest usable
+        checkpoint. Checkpoints are removed once the trained model is saved.
+
+        Args:
+            callback_list (list): List of callbacks to be applied during training.
+            save (bool, optional): Save the trained model and remove the checkpoints.
+                Without saving, the model is left in `trained_model`. Defaults to True.
+        """
+        self.checkpoint = TrainingCheckpoint(
+            self.checkpoint_dir(),
+            every_epochs=self.config.params_checkpoint_every_epochs,
+            max_to_keep=self.config.params_checkpoint_max_to_keep,
+        )
+        resume = self.config.params_resume and self.checkpoint.latest_epoch() > 0
+
+        bottleneck = self.config.params_training_mode == "bottleneck"
+        if bottleneck:
+            if self.distributed:
+                raise ValueError("bottleneck training runs in a single process, set DISTRIBUTION to none")
+            # head-only epochs are cheap and not checkpointed; only fine-tuning resumes
+            if not resume or self.checkpoint.latest_epoch() < self.config.params_epochs:
+                self.train_bottleneck(callback_list)
+
+        with self.strategy.scope():
+            self.configure_precision()
+        self.checkpoint.attach(self.model)
+        initial_epoch = self.checkpoint.restore_latest() if resume else 0
+
+        callback_list = callback_list + [self.checkpoint]
+        if not bottleneck and initial_epoch < self.config.params_epochs:
+            self._fit(callback_list, epochs=self.config.params_epochs, initial_epoch=initial_epoch)
+
+        if self.config.params_fine_tune_blocks > 0:
+            self.fine_tune(callback_list, initial_epoch=max(initial_epoch, self.config.params_epochs))
+
+        model = self.model
+        if self.policy != "float32":
+            # saved in float32 so evaluation, export and serving see the usual model
+            with self.strategy.scope():
+                model = compile_like(with_policy(model, "float32"), model)
+        self.trained_model = model
+        if save:
+            self.save_model(
+                path=self.config.trained_model_path,
+                model=model
+            )
+            self.checkpoint.remove()
+
+    def fine_tune(self, callback_list: list, initial_epoch: int = None):
+        """
+        Unfreeze the top conv blocks and keep training at a lower learning rate.
+
+        The last FINE_TUNE_BLOCKS conv blocks of the backbone and the head are
+        trained for FINE_TUNE_EPOCHS more epochs at FINE_TUNE_LEARNING_RATE;
+        the earlier blocks and every BatchNormalization layer stay frozen, so
+        backprop stops at the first unfrozen block.
+
+        Args:
+            callback_list (list): List of callbacks to be applied during training.
+            initial_epoch (int, optional): Epoch to resume from, past EPOCHS when a
+                fine-tuning checkpoint was restored. Defaults to EPOCHS.
+        """
+        if initial_epoch is None:
+            initial_epoch = self.config.params_epochs
+        with self.strategy.scope():
+            blocks = unfreeze_top_blocks(self.model, self.config.params_fine_tune_blocks)
+            # recompile so the new trainable weights are picked up
+            self.model = compile_like(
+                self.model,
+                self.model,
+                policy=self.policy,
+                jit_compile=self.config.params_jit_compile,
+                learning_rate=self.config.params_fine_tune_learning_rate,
+            )
+        checkpoint = getattr(self, "checkpoint", None)
+        if checkpoint is not None:
+            # the recompiled model has a new optimizer; restore its state when resuming mid-phase
+            checkpoint.attach(self.model)
+            if initial_epoch > self.config.params_epochs:
+                initial_epoch = max(checkpoint.restore_latest(), self.config.params_epochs)
+        logger.info(
+            f"fine-tuning blocks {blocks} for {self.config.params_fine_tune_epochs} epochs "
+            f"at learning rate {self.config.params_fine_tune_learning_rate}"
+        )
+        self._fit(
+            callback_list,
+            epochs=self.config.params_epochs + self.config.params_fine_tune_epochs,
+            initial_epoch=initial_epoch,
+        )
+
+    def _feature_dataset(self, features: np.ndarray, rows: np.ndarray, labels: np.ndarray, shuffle: bool):
+        feature_shape = features.shape[1:]
+        dataset = tf.data.Dataset.from_tensor_slices((rows, labels))
+        if shuffle:
+            dataset = dataset.shuffle(len(rows), reshuffle_each_iteration=True)
+        dataset = dataset.batch(self.config.params_batch_size)
+        dataset = dataset.map(
+            lambda batch_rows, batch_labels: (
+                tf.ensure_shape(
+                    tf.numpy_function(lambda r: features[r], [batch_rows], tf.float32),
+                    (None, *feature_shape),
+                ),
+                batch_labels,
+            ),
+            num_parallel_calls=tf.data.AUTOTUNE,
+        )
+        return dataset.prefetch(tf.data.AUTOTUNE)
+
+    def build_feature_cache(self, copies: int):
+        """
+        Compute the frozen-backbone features of the training and validation
+        images that are not cached yet.
+
+        Args:
+            copies (int): Augmented copies per image on top of the original.
+
+        Returns:
+            tuple: (BottleneckFeatureCache, ImageDatasetLoader).
+        """
+        backbone, _ = split_backbone_head(self.model)
+        if any(layer.trainable_weights for layer in backbone.layers):
+            raise ValueError("bottleneck training needs a fully frozen backbone")
+
+        loader = self._dataset_loader()
+        train_paths, _ = loader.list_files("training")
+        valid_paths, _ = loader.list_files("validation")
+        cache = BottleneckFeatureCache(
+            root_dir=self.config.feature_cache_dir,
+            backbone=backbone,
+            image_size=self.config.params_image_size,
+            preprocess_input=get_preprocess_input(self.config.params_backbone),
+            preprocess_name=self.config.params_backbone,
+        )
+        cache.build(
+            train_paths + valid_paths,
+            decode_fn=loader.decode_file,
+            augmentation=loader.augmentation() if copies else None,
+            copies=copies,
+            batch_size=self.config.params_batch_size,
+        )
+        return cache, loader
+
+    def train_bottleneck(self, callback_list: list):
+        """
+        Train only the head on cached backbone features.
+
+        The frozen backbone runs once per image (plus BOTTLENECK_COPIES augmented
+        copies when augmentation is on) and its output is stored in a
+        memory-mapped cache, so every epoch only runs the Flatten/Dense head.
+        The head layers are shared with the full model.
+
+        Args:
+            callback_list (list): List of callbacks to be applied during training.
+        """
+        copies = self.config.params_bottleneck_copies if self.config.params_is_augmentation else 0
+        cache, loader = self.build_feature_cache(copies)
+        train_paths, train_labels = loader.list_files("training")
+        valid_paths, valid_labels = loader.list_files("validation")
+        features = cache.features()
+
+        num_classes = len(loader.class_names)
+        train_dataset = self._feature_dataset(
+            features,
+            cache.rows(train_paths, copies=copies),
+            np.tile(np.eye(num_classes, dtype=np.float32)[train_labels], (copies + 1, 1)),
+            shuffle=True,
+        )
+        valid_dataset = self._feature_dataset(
+            features,
+            cache.rows(valid_paths),
+            np.eye(num_classes, dtype=np.float32)[valid_labels],
+            shuffle=False,
+        )
+
+        head_model = compile_like(
+            build_head_model(self.model),
+            self.model,
+            jit_compile=self.config.params_jit_compile,
+            learning_rate=self.config.params_learning_rate,
+        )
+
+        # ModelCheckpoint would save the head-only model; `train` saves the full model.
+        callbacks = [
+            callback for callback in callback_list
+            if not isinstance(callback, tf.keras.callbacks.ModelCheckpoint)
+        ]
+        logger.info(f"training head on cached features of {len(train_paths)} images x {copies + 1} copies")
+        head_model.fit(
+            train_dataset,
+            epochs=self.config.params_epochs,
+            validation_data=valid_dataset,
+            callbacks=callbacks,
+        )
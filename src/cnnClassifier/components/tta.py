@@ -0,0 +1,150 @@
+import math
+import numpy as np
+import tensorflow as tf
+from typing import List
+
+from cnnClassifier.entity.config_entity import TTAConfig
+
+# view name -> number of views it expands to
+TTA_VIEWS = {
+    "identity": 1,
+    "hflip": 1,
+    "vflip": 1,
+    "center_crop": 1,
+    "corner_crops": 4,
+    "rotate": 2,
+}
+AGGREGATIONS = ("mean", "geomean", "max")
+
+
+def _rotate(images: tf.Tensor, degrees: float) -> tf.Tensor:
+    # rotation about the image centre, as in tf.keras.layers.RandomRotation
+    height = tf.cast(tf.shape(images)[1], tf.float32)
+    width = tf.cast(tf.shape(images)[2], tf.float32)
+    angle = math.radians(degrees)
+    cos, sin = math.cos(angle), math.sin(angle)
+    x_offset = ((width - 1) - (cos * (width - 1) - sin * (height - 1))) / 2
+    y_offset = ((height - 1) - (sin * (width - 1) + cos * (height - 1))) / 2
+    transform = tf.stack([cos, -sin, x_offset, sin, cos, y_offset, 0.0, 0.0])
+    return tf.raw_ops.ImageProjectiveTransformV3(
+        images=images,
+        transforms=tf.tile(transform[tf.newaxis], [tf.shape(images)[0], 1]),
+        output_shape=tf.shape(images)[1:3],
+        fill_value=0.0,
+        interpolation="BILINEAR",
+        fill_mode="REFLECT",
+    )
+
+
+def _crop(images: tf.Tensor, boxes: List[List[float]]) -> List[tf.Tensor]:
+    # one resized crop of every image per [y1, x1, y2, x2] box, in a single op
+    batch = tf.shape(images)[0]
+    all_boxes = tf.repeat(tf.constant(boxes, dtype=tf.float32), batch, axis=0)
+    box_indices = tf.tile(tf.range(batch), [len(boxes)])
+    crops = tf.image.crop_and_resize(images, all_boxes, box_indices, tf.shape(images)[1:3], method="bilinear")
+    return tf.split(crops, len(boxes))
+
+
+class TestTimeAugmentation:
+    """
+    Test-time augmentation that scores every image under K views in one
+    forward pass.
+
+    The views of a batch of B images are stacked into a single (K * B)
+    tensor, so a batch costs one model call instead of K. The
+    per-view probabilities are then aggregated per image. Flips, crops and
+    rotations commute with the backbones' per-pixel preprocess_input, so the
+    views can be taken of model inputs as well as of raw pixels.
+
+    Methods:
+        __init__: Initializes the TestTimeAugmentation object.
+        views: Stacks the augmented views of a batch.
+        aggregate: Combines the per-view probabilities of every image.
+        predict: Scores a batch under every view in one model call.
+    """
+    def __init__(self, config: TTAConfig) -> None:
+        """
+        Initializes the TestTimeAugmentation object.
+
+        Args:
+            config (TTAConfig): Views, aggregation and augmentation strengths.
+        """
+        unknown = [view for view in config.views if view not in TTA_VIEWS]
+        if unknown:
+            raise ValueError(f"unknown TTA views {unknown}, expected some of {list(TTA_VIEWS)}")
+        if config.aggregation not in AGGREGATIONS:
+            raise ValueError(f"unknown TTA aggregation {config.aggregation!r}, expected one of {list(AGGREGATIONS)}")
+        self.config = config
+        self.num_views = sum(TTA_VIEWS[view] for view in config.views)
+
+    def views(self, images) -> tf.Tensor:
+        """
+        Stacks the augmented views of a batch.
+
+        Args:
+            images: (batch, height, width, channels) float images or model inputs.
+
+        Returns:
+            tf.Tensor: (num_views * batch, height, width, channels), view-major.
+        """
+        images = tf.convert_to_tensor(images, dtype=tf.float32)
+        margin = (1 - self.config.crop_fraction) / 2
+        size = self.config.crop_fraction
+        views = []
+        for view in self.config.views:
+            if view == "identity":
+                views.append(images)
+            elif view == "hflip":
+                views.append(tf.image.flip_left_right(images))
+            elif view == "vflip":
+                views.append(tf.image.flip_up_down(images))
+            elif view == "center_crop":
+                views += _crop(images, [[margin, margin, margin + size, margin + size]])
+            elif view == "corner_crops":
+                views += _crop(images, [
+                    [0.0, 0.0, size, size],
+                    [0.0, 1 - size, size, 1.0],
+                    [1 - size, 0.0, 1.0, size],
+                    [1 - size, 1 - size, 1.0, 1.0],
+                ])
+            elif view == "rotate":
+                views += [
+                    _rotate(images, self.config.rotation_degrees),
+                    _rotate(images, -self.config.rotation_degrees),
+                ]
+        return tf.concat(views, axis=0)
+
+    def aggregate(self, probabilities: np.ndarray) -> np.ndarray:
+        """
+        Combines the per-view probabilities of every image.
+
+        Args:
+            probabilities (np.ndarray): (num_views * batch, classes) output of the stacked views.
+
+        Returns:
+            np.ndarray: (batch, classes) probabilities summing to 1 per image.
+        """
+        probabilities = np.asarray(probabilities, dtype=np.float32)
+        per_view = probabilities.reshape(self.num_views, -1, probabilities.shape[-1])
+        if self.config.aggregation == "mean":
+            return per_view.mean(axis=0)
+        if self.config.aggregation == "geomean":
+            combined = np.exp(np.log(np.clip(per_view, np.finfo(np.float32).tiny, 1.0)).mean(axis=0))
+        else:
+            combined = per_view.max(axis=0)
+        return combined / combined.sum(axis=1, keepdims=True)
+
+    def predict(self, model, inputs) -> np.ndarray:
+        """
+        Scores a batch under every view in one model call.
+
+        Args:
+            model: Keras model or TFLiteModel.
+            inputs: (batch, height, width, channels) model inputs.
+
+        Returns:
+            np.ndarray: (batch, classes) aggregated probabilities.
+        """
+        batch = self.views(inputs).numpy()
+        predict = getattr(model, "predict_on_batch", None) or model.predict
+        return self.aggregate(predict(batch))
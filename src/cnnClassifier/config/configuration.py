@@ -7,6 +7,11 @@ from cnnClassifier.entity.config_entity import (
     PrepareCallbacksConfig,
     TrainingConfig,
     EvaluationConfig,
+    TTAConfig,
+    ModelExportConfig,
+    PredictionConfig,
+    SweepConfig,
+    ModelComparisonConfig,
 )
 
 
@@ -25,9 +30,14 @@ class ConfigurationManager:
         get_prepare_callback_config: Returns a PrepareCallbackConfig data type of the configuration of callbacks.
         get_training_config: Returns the configuration for training the model.
         get_validation_config: Returns an evaluation config data object.
+        get_tta_config: Returns the configuration for test-time augmentation.
+        get_model_export_config: Returns the configuration for exporting quantized models.
+        get_prediction_config: Returns the configuration for serving predictions.
+        get_sweep_config: Returns the configuration for hyperparameter sweeps.
+        get_model_comparison_config: Returns the configuration for comparing model artifacts.
     """
     def __init__(
-        self, config_filepath=CONFIG_FILE_PATH, params_filepath=PARAMS_FILE_PATH
+        self, config_filepath=CONFIG_FILE_PATH, params_filepath=PARAMS_FILE_PATH, params_overrides=None
     ) -> None:
         """
         Initializes the ConfigurationManager object.
@@ -35,9 +45,13 @@ class ConfigurationManager:
         Args:
             config_filepath (str, optional): File path for the main configuration file. Defaults to CONFIG_FILE_PATH.
             params_filepath (str, optional): File path for the parameters file. Defaults to PARAMS_FILE_PATH.
+            params_overrides (dict, optional): Params replacing the ones in the parameters file,
+                e.g. {"LEARNING_RATE": 0.001} for one sweep trial.
         """
         self.config = read_yaml(config_filepath)
         self.params = read_yaml(params_filepath)
+        for key, value in (params_overrides or {}).items():
+            self.params[key] = value
 
         create_directories([self.config.artifacts_root])
 
@@ -55,8 +69,18 @@ class ConfigurationManager:
         data_ingestion_config = DataIngestionConfig(
             root_dir=config.root_dir,
             source_URL=config.source_URL,
+            source_sha256=config.get("source_sha256"),
             local_data_file=config.local_data_file,
             unzip_dir=config.unzip_dir,
+            extract_workers=config.get("extract_workers", 8),
+            data_dir=Path(config.data_dir),
+            manifest_file=Path(config.manifest_file),
+            extra_data_dirs=list(config.get("extra_data_dirs") or []),
+            split_index_file=Path(config.split_index_file),
+            params_validation_split=self.params.VALIDATION_SPLIT,
+            params_split_seed=self.params.SPLIT_SEED,
+            image_store_dir=Path(config.image_store_dir),
+            params_image_size=self.params.IMAGE_SIZE,
         )
 
         return data_ingestion_config
@@ -82,6 +106,8 @@ class ConfigurationManager:
             params_include_top=self.params.INCLUDE_TOP,
             params_weights=self.params.WEIGHTS,
             params_classes=self.params.CLASSES,
+            params_backbone=self.params.BACKBONE,
+            params_head=self.params.HEAD,
         )
 
         return prepare_base_model_config
@@ -96,13 +122,24 @@ class ConfigurationManager:
         config = self.config.prepare_callbacks
         model_ckpt_dir = os.path.dirname(config.checkpoint_model_filepath)
         create_directories(
-            [Path(model_ckpt_dir), Path(config.tensorboard_root_log_dir)]
+            [Path(model_ckpt_dir), Path(config.tensorboard_root_log_dir), Path(config.profile_dir)]
         )
 
         prepare_callback_config = PrepareCallbacksConfig(
             root_dir=Path(config.root_dir),
             tensorboard_root_log_dir=Path(config.tensorboard_root_log_dir),
             checkpoint_model_filepath=Path(config.checkpoint_model_filepath),
+            run_metadata_file=Path(config.run_metadata_file),
+            params_early_stopping_patience=self.params.EARLY_STOPPING_PATIENCE,
+            params_lr_schedule=self.params.LR_SCHEDULE,
+            params_lr_plateau_factor=self.params.LR_PLATEAU_FACTOR,
+            params_lr_plateau_patience=self.params.LR_PLATEAU_PATIENCE,
+            params_min_learning_rate=self.params.MIN_LEARNING_RATE,
+            params_time_budget_minutes=self.params.TIME_BUDGET_MINUTES,
+            profile_dir=Path(config.profile_dir),
+            params_profile=self.params.PROFILE,
+            params_profile_trace_steps=list(self.params.PROFILE_TRACE_STEPS),
+            params_batch_size=self.params.BATCH_SIZE,
         )
 
         return prepare_callback_config
@@ -131,6 +168,27 @@ class ConfigurationManager:
             params_batch_size=params.BATCH_SIZE,
             params_is_augmentation=params.AUGMENTATION,
             params_image_size=params.IMAGE_SIZE,
+            params_learning_rate=params.LEARNING_RATE,
+            data_cache_dir=Path(training.data_cache_dir),
+            params_data_loader=params.DATA_LOADER,
+            params_data_cache=params.DATA_CACHE,
+            feature_cache_dir=Path(training.feature_cache_dir),
+            params_training_mode=params.TRAINING_MODE,
+            params_bottleneck_copies=params.BOTTLENECK_COPIES,
+            image_store_dir=Path(self.config.data_ingestion.image_store_dir),
+            split_index_file=Path(self.config.data_ingestion.split_index_file),
+            params_backbone=params.BACKBONE,
+            params_precision=params.PRECISION,
+            params_jit_compile=params.JIT_COMPILE,
+            params_distribution=params.DISTRIBUTION,
+            params_num_local_replicas=params.NUM_LOCAL_REPLICAS,
+            params_fine_tune_blocks=params.FINE_TUNE_BLOCKS,
+            params_fine_tune_epochs=params.FINE_TUNE_EPOCHS,
+            params_fine_tune_learning_rate=params.FINE_TUNE_LEARNING_RATE,
+            checkpoint_dir=Path(training.checkpoint_dir),
+            params_checkpoint_every_epochs=params.CHECKPOINT_EVERY_EPOCHS,
+            params_checkpoint_max_to_keep=params.CHECKPOINT_MAX_TO_KEEP,
+            params_resume=params.RESUME,
         )
 
         return training_config
@@ -142,11 +200,153 @@ class ConfigurationManager:
         Returns:
             EvaluationConfig: Object containing the configuration for model evaluation.
         """
+        config = self.config.evaluation
+
+        create_directories([config.root_dir])
+
         eval_config = EvaluationConfig(
+            root_dir=Path(config.root_dir),
+            scores_file=Path(config.scores_file),
+            calibration_file=Path(config.calibration_file),
             path_of_model="artifacts/training/model.h5",
             training_data="artifacts/data_ingestion/Chicken-fecal-images",
             all_params=self.params,
             params_image_size=self.params.IMAGE_SIZE,
             params_batch_size=self.params.BATCH_SIZE,
+            image_store_dir=Path(self.config.data_ingestion.image_store_dir),
+            split_index_file=Path(self.config.data_ingestion.split_index_file),
+            params_backbone=self.params.BACKBONE,
+            params_calibration_bins=self.params.CALIBRATION_BINS,
+            params_tta=self.get_tta_config(),
         )
         return eval_config
+
+    def get_tta_config(self) -> TTAConfig:
+        """
+        Returns the test-time augmentation settings shared by evaluation and prediction.
+
+        Returns:
+            TTAConfig: Object containing the test-time augmentation settings.
+        """
+        tta = self.params.TTA
+        return TTAConfig(
+            enabled=tta.ENABLED,
+            views=list(tta.VIEWS),
+            aggregation=tta.AGGREGATION,
+            crop_fraction=tta.CROP_FRACTION,
+            rotation_degrees=tta.ROTATION_DEGREES,
+        )
+
+    def get_model_export_config(self) -> ModelExportConfig:
+        """
+        Retrieves the configuration for exporting quantized models.
+
+        Returns:
+            ModelExportConfig: Object containing the configuration for model export.
+        """
+        config = self.config.model_export
+        data_ingestion = self.config.data_ingestion
+
+        create_directories([config.root_dir])
+
+        model_export_config = ModelExportConfig(
+            root_dir=Path(config.root_dir),
+            trained_model_path=Path(self.config.training.trained_model_path),
+            training_data=Path(data_ingestion.data_dir),
+            image_store_dir=Path(data_ingestion.image_store_dir),
+            split_index_file=Path(data_ingestion.split_index_file),
+            scores_file=Path(config.scores_file),
+            params_image_size=self.params.IMAGE_SIZE,
+            params_batch_size=self.params.BATCH_SIZE,
+            params_variants=list(self.params.EXPORT_VARIANTS),
+            params_representative_samples=self.params.REPRESENTATIVE_SAMPLES,
+            params_latency_runs=self.params.LATENCY_RUNS,
+            params_backbone=self.params.BACKBONE,
+        )
+        return model_export_config
+
+    def get_prediction_config(self) -> PredictionConfig:
+        """
+        Retrieves the configuration for serving predictions. The
+        PREDICTION_BACKEND environment variable, which gunicorn.conf.py sets,
+        overrides prediction.backend.
+
+        Returns:
+            PredictionConfig: Object containing the configuration for the prediction pipeline.
+        """
+        config = self.config.prediction
+
+        model_path = Path(config.model_path)
+        backend = os.environ.get("PREDICTION_BACKEND") or config.get("backend", "keras")
+        if backend != "keras":
+            model_path = Path(self.config.model_export.root_dir) / f"model_{backend}.tflite"
+
+        prediction_config = PredictionConfig(
+            model_path=model_path,
+            warmup=config.warmup,
+            batching=config.batching,
+            max_batch_size=config.max_batch_size,
+            max_wait_ms=config.max_wait_ms,
+            decode_workers=config.decode_workers,
+            batch_input_root=Path(config.batch_input_root),
+            image_store_dir=Path(self.config.data_ingestion.image_store_dir),
+            calibration_file=Path(self.config.evaluation.calibration_file),
+            response_version=config.response_version,
+            top_k=config.top_k,
+            abstain_threshold=config.abstain_threshold,
+            params_backbone=self.params.BACKBONE,
+            params_tta=self.get_tta_config(),
+        )
+        return prediction_config
+
+    def get_sweep_config(self) -> SweepConfig:
+        """
+        Returns the configuration for hyperparameter sweeps.
+
+        Returns:
+            SweepConfig: Object containing the configuration for sweeps.
+        """
+        config = self.config.sweep
+        sweep = self.params.SWEEP
+        create_directories([Path(config.root_dir), Path(config.results_dir)])
+
+        sweep_config = SweepConfig(
+            root_dir=Path(config.root_dir),
+            results_dir=Path(config.results_dir),
+            params_strategy=sweep.STRATEGY,
+            params_space={key: list(values) for key, values in sweep.SPACE.items()},
+            params_trials=sweep.TRIALS,
+            params_workers=sweep.WORKERS,
+            params_eta=sweep.ETA,
+            params_min_epochs=sweep.MIN_EPOCHS,
+            params_seed=sweep.SEED,
+        )
+
+        return sweep_config
+
+    def get_model_comparison_config(self) -> ModelComparisonConfig:
+        """
+        Returns the configuration for comparing model artifacts.
+
+        Returns:
+            ModelComparisonConfig: Object containing the configuration for model comparison.
+        """
+        config = self.config.model_comparison
+        data_ingestion = self.config.data_ingestion
+        create_directories([Path(config.root_dir)])
+
+        model_comparison_config = ModelComparisonConfig(
+            root_dir=Path(config.root_dir),
+            models=list(config.models),
+            training_data=Path(data_ingestion.data_dir),
+            image_store_dir=Path(data_ingestion.image_store_dir),
+            split_index_file=Path(data_ingestion.split_index_file),
+            params_image_size=self.params.IMAGE_SIZE,
+            params_batch_size=self.params.BATCH_SIZE,
+            params_backbone=self.params.BACKBONE,
+            params_workers=self.params.COMPARISON.WORKERS,
+            params_latency_runs=self.params.LATENCY_RUNS,
+            params_calibration_bins=self.params.CALIBRATION_BINS,
+        )
+
+        return model_comparison_config
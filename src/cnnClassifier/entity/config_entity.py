@@ -1,13 +1,24 @@
 from dataclasses import dataclass
 from pathlib import Path
+from typing import Optional
 
 
 @dataclass(frozen=True)
 class DataIngestionConfig:
     root_dir: Path
     source_URL: str
+    source_sha256: str
     local_data_file: Path
     unzip_dir: Path
+    extract_workers: int
+    data_dir: Path
+    manifest_file: Path
+    extra_data_dirs: list
+    split_index_file: Path
+    params_validation_split: float
+    params_split_seed: int
+    image_store_dir: Path
+    params_image_size: list
 
 
 @dataclass(frozen=True)
@@ -20,6 +31,8 @@ class PrepareBaseModelConfig:
     params_include_top: bool
     params_weights: str
     params_classes: int
+    params_backbone: str
+    params_head: str
 
 
 @dataclass(frozen=True)
@@ -27,6 +40,17 @@ class PrepareCallbacksConfig:
     root_dir: Path
     tensorboard_root_log_dir: Path
     checkpoint_model_filepath: Path
+    run_metadata_file: Path
+    params_early_stopping_patience: int
+    params_lr_schedule: str
+    params_lr_plateau_factor: float
+    params_lr_plateau_patience: int
+    params_min_learning_rate: float
+    params_time_budget_minutes: float
+    profile_dir: Path
+    params_profile: bool
+    params_profile_trace_steps: list
+    params_batch_size: int
 
 
 @dataclass(frozen=True)
@@ -39,12 +63,112 @@ class TrainingConfig:
     params_batch_size: int
     params_is_augmentation: bool
     params_image_size: list
+    params_learning_rate: float
+    data_cache_dir: Path
+    params_data_loader: str
+    params_data_cache: str
+    feature_cache_dir: Path
+    params_training_mode: str
+    params_bottleneck_copies: int
+    image_store_dir: Path
+    split_index_file: Path
+    params_backbone: str
+    params_precision: str
+    params_jit_compile: bool
+    params_distribution: str
+    params_num_local_replicas: int
+    params_fine_tune_blocks: int
+    params_fine_tune_epochs: int
+    params_fine_tune_learning_rate: float
+    checkpoint_dir: Path
+    params_checkpoint_every_epochs: int
+    params_checkpoint_max_to_keep: int
+    params_resume: bool
+
+
+@dataclass(frozen=True)
+class TTAConfig:
+    enabled: bool
+    views: list
+    aggregation: str
+    crop_fraction: float
+    rotation_degrees: float
 
 
 @dataclass(frozen=True)
 class EvaluationConfig:
+    root_dir: Path
+    scores_file: Path
+    calibration_file: Path
     path_of_model: Path
     training_data: Path
     all_params: dict
     params_image_size: list
     params_batch_size: int
+    image_store_dir: Path
+    split_index_file: Path
+    params_backbone: str
+    params_calibration_bins: int
+    params_tta: TTAConfig
+
+
+@dataclass(frozen=True)
+class ModelExportConfig:
+    root_dir: Path
+    trained_model_path: Path
+    training_data: Path
+    image_store_dir: Path
+    split_index_file: Path
+    scores_file: Path
+    params_image_size: list
+    params_batch_size: int
+    params_variants: list
+    params_representative_samples: int
+    params_latency_runs: int
+    params_backbone: str
+
+
+@dataclass(frozen=True)
+class PredictionConfig:
+    model_path: Path
+    warmup: bool
+    batching: bool
+    max_batch_size: int
+    max_wait_ms: float
+    decode_workers: int
+    batch_input_root: Path
+    image_store_dir: Path
+    calibration_file: Path
+    response_version: int
+    top_k: int
+    abstain_threshold: Optional[float]
+    params_backbone: str
+    params_tta: TTAConfig
+
+
+@dataclass(frozen=True)
+class SweepConfig:
+    root_dir: Path
+    results_dir: Path
+    params_strategy: str
+    params_space: dict
+    params_trials: int
+    params_workers: int
+    params_eta: int
+    params_min_epochs: int
+    params_seed: int
+
+
+@dataclass(frozen=True)
+class ModelComparisonConfig:
+    root_dir: Path
+    models: list
+    training_data: Path
+    image_store_dir: Path
+    split_index_file: Path
+    params_image_size: list
+    params_batch_size: int
+    params_backbone: str
+    params_workers: int
+    params_latency_runs: int
+    params_calibration_bins: int
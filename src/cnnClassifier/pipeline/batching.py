@@ -0,0 +1,188 @@
+import os
+import time
+import queue
+import threading
+from collections import Counter
+from concurrent.futures import Future
+from typing import Callable
+
+import numpy as np
+from cnnClassifier import logger
+
+_STOP = object()
+
+
+class MicroBatcher:
+    """
+    Groups concurrent single-image requests into one forward pass.
+
+    Callers `submit` an image and wait on the returned future. A background
+    thread takes the first queued request, keeps collecting until either
+    `max_batch_size` requests are queued or `max_wait_ms` has passed since
+    that first request arrived, runs `predict_fn` once on the stacked batch
+    and hands each caller its own row of the output.
+
+    Attributes:
+        max_batch_size (int): Largest batch sent to `predict_fn`.
+        max_wait_ms (float): Longest time a request waits for others to join its batch.
+
+    Methods:
+        submit: Queues an image and returns a future for its prediction row.
+        predict: Queues an image and blocks until its prediction row is ready.
+        stop: Stops the worker thread after the queued requests are served.
+        stats: Returns queue depth, batch-size histogram and queueing latency.
+    """
+
+    def __init__(
+        self,
+        predict_fn: Callable[[np.ndarray], np.ndarray],
+        max_batch_size: int = 16,
+        max_wait_ms: float = 5.0,
+    ) -> None:
+        """
+        Initializes the MicroBatcher object.
+
+        Args:
+            predict_fn (Callable): Maps a (batch, ...) array to a (batch, ...) output array.
+            max_batch_size (int, optional): Largest batch sent to `predict_fn`. Defaults to 16.
+            max_wait_ms (float, optional): Longest time a request waits for others. Defaults to 5.0.
+        """
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self._queue: queue.Queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+        self._batch_sizes = Counter()
+        self._requests = 0
+        self._batches = 0
+        self._errors = 0
+        self._max_queue_depth = 0
+        self._queue_seconds_total = 0.0
+        self._queue_seconds_max = 0.0
+        self._compute_seconds_total = 0.0
+
+    def _ensure_started(self) -> None:
+        # Threads do not survive fork, so a worker forked from a process that
+        # already started the batcher gets a fresh queue and thread.
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            if self._pid != os.getpid():
+                self._queue = queue.Queue()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+            self._thread.start()
+
+    def submit(self, image: np.ndarray) -> Future:
+        """
+        Queues an image and returns a future for its prediction row.
+
+        Args:
+            image (np.ndarray): A single input without the batch dimension.
+
+        Returns:
+            Future: Resolves to the row of `predict_fn`'s output for this image.
+        """
+        self._ensure_started()
+        future = Future()
+        self._queue.put((image, future, time.perf_counter()))
+        depth = self._queue.qsize()
+        if depth > self._max_queue_depth:
+            self._max_queue_depth = depth
+        return future
+
+    def predict(self, image: np.ndarray, timeout: float = None) -> np.ndarray:
+        """
+        Queues an image and blocks until its prediction row is ready.
+
+        Args:
+            image (np.ndarray): A single input without the batch dimension.
+            timeout (float, optional): Seconds to wait for the result.
+
+        Returns:
+            np.ndarray: The row of `predict_fn`'s output for this image.
+        """
+        return self.submit(image).result(timeout=timeout)
+
+    def stop(self) -> None:
+        """
+        Stops the worker thread after the queued requests are served.
+        """
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
+
+    def _collect(self) -> list:
+        first = self._queue.get()
+        if first is _STOP:
+            return []
+        items = [first]
+        deadline = first[2] + self.max_wait_ms / 1000.0
+        while len(items) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                self._queue.put(_STOP)
+                break
+            items.append(item)
+        return items
+
+    def _run(self) -> None:
+        while True:
+            items = self._collect()
+            if not items:
+                return
+
+            started = time.perf_counter()
+            waits = [started - enqueued_at for _, _, enqueued_at in items]
+            try:
+                outputs = self.predict_fn(np.stack([image for image, _, _ in items]))
+                for (_, future, _), output in zip(items, outputs):
+                    future.set_result(output)
+            except Exception as e:
+                logger.exception(e)
+                self._errors += 1
+                for _, future, _ in items:
+                    future.set_exception(e)
+            finished = time.perf_counter()
+
+            self._batches += 1
+            self._requests += len(items)
+            self._batch_sizes[len(items)] += 1
+            self._queue_seconds_total += sum(waits)
+            self._queue_seconds_max = max(self._queue_seconds_max, max(waits))
+            self._compute_seconds_total += finished - started
+
+    def stats(self) -> dict:
+        """
+        Returns queue depth, batch-size histogram and queueing latency.
+
+        Returns:
+            dict: Batching metrics since the batcher was created.
+        """
+        requests = max(self._requests, 1)
+        batches = max(self._batches, 1)
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_ms,
+            "queue_depth": self._queue.qsize(),
+            "max_queue_depth": self._max_queue_depth,
+            "requests": self._requests,
+            "batches": self._batches,
+            "errors": self._errors,
+            "mean_batch_size": round(self._requests / batches, 3),
+            "batch_size_histogram": dict(sorted(self._batch_sizes.items())),
+            "queue_latency_ms": {
+                "mean": round(1000 * self._queue_seconds_total / requests, 3),
+                "max": round(1000 * self._queue_seconds_max, 3),
+            },
+            "compute_ms_per_batch": round(1000 * self._compute_seconds_total / batches, 3),
+        }
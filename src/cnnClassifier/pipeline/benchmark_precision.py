@@ -0,0 +1,87 @@
+import time
+import argparse
+import numpy as np
+import tensorflow as tf
+from pathlib import Path
+from typing import List, Optional
+
+from cnnClassifier import logger
+from cnnClassifier.config.configuration import ConfigurationManager
+from cnnClassifier.components.precision import compile_like, cpu_flags, supported_policies, with_policy
+from cnnClassifier.utils.common import save_json
+
+
+def default_modes() -> List[str]:
+    """
+    Returns the current float32 path, float32 with XLA, and every natively
+    supported mixed policy with and without XLA.
+    """
+    modes = ["float32", "float32:xla"]
+    for policy in sorted(supported_policies()):
+        modes += [policy, f"{policy}:xla"]
+    return modes
+
+
+def steps_per_second(model: tf.keras.Model, mode: str, batch_size: int, steps: int, warmup: int) -> float:
+    """
+    Times `steps` training steps of one mode on a synthetic batch, so only
+    the forward and backward pass is measured.
+
+    Args:
+        model (tf.keras.Model): Compiled float32 model to rebuild.
+        mode (str): "<policy>" or "<policy>:xla".
+        batch_size (int): Images per step.
+        steps (int): Timed steps.
+        warmup (int): Untimed steps run first, covering tracing and XLA compilation.
+
+    Returns:
+        float: Training steps per second.
+    """
+    policy, _, jit = mode.partition(":")
+    candidate = compile_like(with_policy(model, policy), model, policy=policy, jit_compile=jit == "xla")
+
+    rng = np.random.default_rng(0)
+    images = rng.uniform(-1, 1, (batch_size, *model.input_shape[1:])).astype(np.float32)
+    labels = np.eye(model.output_shape[-1], dtype=np.float32)[
+        rng.integers(model.output_shape[-1], size=batch_size)
+    ]
+    dataset = tf.data.Dataset.from_tensors((images, labels)).repeat()
+
+    candidate.fit(dataset, epochs=1, steps_per_epoch=warmup, verbose=0)
+    start = time.perf_counter()
+    candidate.fit(dataset, epochs=1, steps_per_epoch=steps, verbose=0)
+    return steps / (time.perf_counter() - start)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """
+    Benchmarks the training step of the prepared base model in float32 and
+    in the mixed-precision / XLA modes, and writes steps/sec per mode.
+    """
+    config = ConfigurationManager().get_training_config()
+    parser = argparse.ArgumentParser(description="Training steps/sec per precision mode")
+    parser.add_argument("--modes", nargs="+", default=None, help='e.g. float32 mixed_bfloat16:xla')
+    parser.add_argument("-b", "--batch-size", type=int, default=config.params_batch_size)
+    parser.add_argument("--steps", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("-o", "--output", type=Path, default=config.root_dir / "precision_benchmark.json")
+    args = parser.parse_args(argv)
+
+    model = tf.keras.models.load_model(config.updated_base_model_path)
+    results = {}
+    for mode in args.modes or default_modes():
+        results[mode] = round(steps_per_second(model, mode, args.batch_size, args.steps, args.warmup), 3)
+        logger.info(f"{mode}: {results[mode]} steps/sec")
+
+    baseline = results.get("float32")
+    save_json(path=args.output, data={
+        "batch_size": args.batch_size,
+        "steps": args.steps,
+        "cpu_flags": sorted(cpu_flags() & {"avx512f", "avx512_bf16", "amx_bf16", "avx512_fp16", "amx_fp16"}),
+        "steps_per_sec": results,
+        "speedup": {mode: round(value / baseline, 3) for mode, value in results.items()} if baseline else {},
+    })
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+import argparse
+from dataclasses import replace
+from typing import List, Optional
+
+from cnnClassifier import logger
+from cnnClassifier.config.configuration import ConfigurationManager
+from cnnClassifier.components.model_comparison import ModelComparison
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """
+    Compares model artifacts on the validation split. Models are given as
+    "<path>[@<BACKBONE>]" and default to model_comparison.models in config.yaml.
+    """
+    parser = argparse.ArgumentParser(description="Score several models on the validation split in parallel")
+    parser.add_argument("models", nargs="*", help="model artifacts, as <path>[@<BACKBONE>]")
+    parser.add_argument("-w", "--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    config = ConfigurationManager().get_model_comparison_config()
+    if args.workers is not None:
+        config = replace(config, params_workers=args.workers)
+
+    records = ModelComparison(config=config).run(args.models or None)
+    logger.info(f"model comparison finished, best: {records[0]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+import time
+import tensorflow as tf
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List
+
+from cnnClassifier import logger
+from cnnClassifier.config.configuration import ConfigurationManager
+from cnnClassifier.components.data_ingestion import DataIngestion
+from cnnClassifier.components.prepare_base_model import PrepareBaseModel
+from cnnClassifier.components.prepare_callbacks import PrepareCallback
+from cnnClassifier.components.training import Training
+from cnnClassifier.components.evaluation import Evaluation
+from cnnClassifier.components.model_export import ModelExport
+from cnnClassifier.components.precision import compile_like
+from cnnClassifier.utils.common import save_json
+
+
+class AsyncModelSaver:
+    """
+    Writes Keras models to disk on a background thread.
+
+    A model that later stages keep changing, such as the base model whose
+    layers are trained in place, is snapshotted on the calling thread first
+    (a clone with copied weights), so the file holds the model as it was when
+    `save` was called. Saves run one at a time in submission order.
+
+    Methods:
+        __init__: Initializes the AsyncModelSaver object.
+        save: Queues a model to be saved.
+        wait: Blocks until every queued save has finished.
+    """
+    def __init__(self) -> None:
+        """
+        Initializes the AsyncModelSaver object.
+        """
+        self.pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="model-saver")
+        self.futures: List[Future] = []
+        self.timings: Dict[str, float] = {}
+
+    @staticmethod
+    def _snapshot(model: tf.keras.Model) -> tf.keras.Model:
+        copy = tf.keras.models.clone_model(model)
+        copy.set_weights(model.get_weights())
+        for source, target in zip(model.layers, copy.layers):
+            target.trainable = source.trainable
+        if model.optimizer is not None:
+            compile_like(copy, model)
+        return copy
+
+    def _save(self, model: tf.keras.Model, path: Path) -> None:
+        start = time.perf_counter()
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        model.save(path)
+        self.timings[str(path)] = round(time.perf_counter() - start, 3)
+        logger.info(f"saved {path} in the background in {self.timings[str(path)]}s")
+
+    def save(self, model: tf.keras.Model, path: Path, snapshot: bool = True) -> Future:
+        """
+        Queues a model to be saved.
+
+        Args:
+            model (tf.keras.Model): Model to save.
+            path (Path): Destination file.
+            snapshot (bool, optional): Save a copy taken now rather than the live
+                model. Only skip it for models nothing modifies any more. Defaults to True.
+
+        Returns:
+            Future: Resolves once the file is written.
+        """
+        future = self.pool.submit(self._save, self._snapshot(model) if snapshot else model, path)
+        self.futures.append(future)
+        return future
+
+    def wait(self) -> Dict[str, float]:
+        """
+        Blocks until every queued save has finished, re-raising the first error.
+
+        Returns:
+            dict: Seconds spent writing each file.
+        """
+        for future in self.futures:
+            future.result()
+        self.futures = []
+        return dict(self.timings)
+
+
+class InMemoryPipeline:
+    """
+    Runs every stage of the pipeline in one process, handing models and
+    datasets from stage to stage in memory instead of reloading them from
+    disk. The artifacts the DVC stages produce are still written, in the
+    background, so `dvc status` and the stage scripts see the same outputs.
+
+    Only single-process training is supported (DISTRIBUTION: none).
+
+    Methods:
+        __init__: Initializes the InMemoryPipeline object.
+        main: Runs all stages and writes per-stage timings.
+    """
+    def __init__(self) -> None:
+        """
+        Initializes the InMemoryPipeline object.
+        """
+        self.config = ConfigurationManager()
+        self.saver = AsyncModelSaver()
+        self.timings: Dict[str, float] = {}
+
+    def _timed(self, stage_name: str, start: float) -> None:
+        self.timings[stage_name] = round(time.perf_counter() - start, 3)
+        logger.info(f">>>>>> Stage {stage_name} completed in {self.timings[stage_name]}s <<<<<<\n\nx==========x")
+
+    def main(self) -> Dict:
+        """
+        Runs all stages and writes per-stage timings, including the time
+        spent waiting on background saves, to artifacts/pipeline_timings.json.
+
+        Returns:
+            dict: The timings.
+        """
+        training_config = self.config.get_training_config()
+        if training_config.params_distribution != "none":
+            raise ValueError("the in-memory pipeline runs in one process, set DISTRIBUTION to none")
+        total = time.perf_counter()
+
+        start = time.perf_counter()
+        data_ingestion = DataIngestion(config=self.config.get_data_ingestion_config())
+        data_ingestion.download_file()
+        data_ingestion.extract_zip_file()
+        data_ingestion.ingest_extra_folders()
+        data_ingestion.update_manifest()
+        data_ingestion.build_image_store()
+        self._timed("Data Ingestion", start)
+
+        start = time.perf_counter()
+        prepare_config = self.config.get_prepare_base_model_config()
+        prepare_base_model = PrepareBaseModel(config=prepare_config)
+        prepare_base_model.get_base_model(save=False)
+        prepare_base_model.update_base_model(save=False)
+        # training keys its checkpoints on the updated base model file, so that one is awaited
+        updated_saved = self.saver.save(prepare_base_model.full_model, prepare_config.updated_base_model_path)
+        self.saver.save(prepare_base_model.model, prepare_config.base_model_path)
+        self._timed("Prepare base model", start)
+
+        start = time.perf_counter()
+        training = Training(config=training_config)
+        callback_list = PrepareCallback(config=self.config.get_prepare_callback_config()).get_callbacks()
+        training.use_model(prepare_base_model.full_model)
+        training.train_valid_generator()
+        wait = time.perf_counter()
+        updated_saved.result()
+        self.timings["Wait for updated base model"] = round(time.perf_counter() - wait, 3)
+        training.train(callback_list=callback_list, save=False)
+        model = training.trained_model
+        trained_saved = self.saver.save(model, training_config.trained_model_path, snapshot=False)
+        self._timed("Training model", start)
+
+        start = time.perf_counter()
+        evaluation = Evaluation(config=self.config.get_validation_config())
+        evaluation.evaluation(
+            model=model,
+            valid_data=training.valid_generator,
+            valid_samples=getattr(training, "valid_samples", None),
+            class_names=training.class_names,
+        )
+        evaluation.save_score()
+        self._timed("Evaluating model", start)
+
+        start = time.perf_counter()
+        # the export report includes the size of the saved Keras model
+        trained_saved.result()
+        training.checkpoint.remove()
+        ModelExport(config=self.config.get_model_export_config()).export(model=model)
+        self._timed("Exporting model", start)
+
+        wait = time.perf_counter()
+        self.timings["saves"] = self.saver.wait()
+        self.timings["Wait for remaining saves"] = round(time.perf_counter() - wait, 3)
+        self.timings["total"] = round(time.perf_counter() - total, 3)
+        save_json(path=Path(self.config.config.artifacts_root) / "pipeline_timings.json", data=self.timings)
+        return self.timings
+
+
+if __name__ == "__main__":
+    try:
+        InMemoryPipeline().main()
+    except Exception as e:
+        logger.exception(e)
+        raise e
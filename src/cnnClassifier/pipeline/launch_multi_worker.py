@@ -0,0 +1,87 @@
+import os
+import sys
+import time
+import json
+import socket
+import argparse
+import subprocess
+from typing import List, Optional
+
+from cnnClassifier import logger
+from cnnClassifier.config.configuration import ConfigurationManager
+
+TRAINING_STAGE = "src/cnnClassifier/pipeline/stage_03_training.py"
+
+
+def free_ports(count: int) -> List[int]:
+    """
+    Returns `count` free TCP ports on localhost.
+    """
+    sockets = [socket.socket() for _ in range(count)]
+    try:
+        for sock in sockets:
+            sock.bind(("localhost", 0))
+        return [sock.getsockname()[1] for sock in sockets]
+    finally:
+        for sock in sockets:
+            sock.close()
+
+
+def worker_env(cluster: List[str], index: int, threads: int) -> dict:
+    """
+    Returns the environment of one worker: its TF_CONFIG, and thread pools
+    sized so the workers share the machine's cores instead of oversubscribing them.
+    """
+    env = dict(os.environ)
+    env["TF_CONFIG"] = json.dumps({
+        "cluster": {"worker": cluster},
+        "task": {"type": "worker", "index": index},
+    })
+    env["TF_NUM_INTRAOP_THREADS"] = str(threads)
+    env["TF_NUM_INTEROP_THREADS"] = "2"
+    env["OMP_NUM_THREADS"] = str(threads)
+    return env
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """
+    Runs the training stage as a multi-worker cluster of processes on
+    localhost, for trying DISTRIBUTION: multi_worker on one machine. Worker 0
+    is the chief and writes the trained model.
+    """
+    parser = argparse.ArgumentParser(description="Launch local multi-worker training")
+    parser.add_argument("-n", "--workers", type=int, default=2)
+    parser.add_argument("command", nargs="*", default=[sys.executable, TRAINING_STAGE],
+                        help="command every worker runs (default: the training stage)")
+    args = parser.parse_args(argv)
+
+    if ConfigurationManager().get_training_config().params_distribution != "multi_worker":
+        raise ValueError("set DISTRIBUTION: multi_worker in params.yaml to launch a multi-worker cluster")
+
+    cluster = [f"localhost:{port}" for port in free_ports(args.workers)]
+    threads = max(1, (os.cpu_count() or 1) // args.workers)
+    logger.info(f"launching {args.workers} workers on {cluster}, {threads} threads each")
+
+    processes = [
+        subprocess.Popen(args.command, env=worker_env(cluster, index, threads))
+        for index in range(args.workers)
+    ]
+    try:
+        # a failed worker leaves the others blocked in collectives, so stop them all
+        while any(process.poll() is None for process in processes):
+            if any(process.returncode not in (None, 0) for process in processes):
+                break
+            time.sleep(1)
+    finally:
+        for process in processes:
+            if process.poll() is None:
+                process.terminate()
+    returncodes = [process.wait() for process in processes]
+    failed = [index for index, code in enumerate(returncodes) if code != 0]
+    if failed:
+        raise SystemExit(f"workers {failed} failed with exit codes {[returncodes[i] for i in failed]}")
+    logger.info("all workers finished")
+
+
+if __name__ == "__main__":
+    main()
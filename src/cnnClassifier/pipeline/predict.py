@@ -1,53 +1,414 @@
-import numpy as np
-from tensorflow.keras.models import load_model
-from tensorflow.keras.preprocessing import image
 import os
-from typing import List, Dict
+import json
+import time
+import argparse
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from cnnClassifier import logger
+from cnnClassifier.config.configuration import ConfigurationManager
+from cnnClassifier.entity.config_entity import PredictionConfig
+from cnnClassifier.components.image_store import PreprocessedImageStore
+from cnnClassifier.utils.common import load_json
+from cnnClassifier.utils.image_ops import decode_image, decode_image_into
+from cnnClassifier.utils.metrics import apply_temperature
+from cnnClassifier.utils.model_registry import model_registry
+
+# 1: {"image": label}
+# 2: adds the class probabilities, the top-k classes, a calibrated confidence
+#    and abstains (image None) below the abstain threshold
+RESPONSE_VERSIONS = (1, 2)
 
 
 class PredictionPipeline:
     """
     A pipeline for making predictions on input images using a pre-trained model.
 
+    The model is not loaded per call; it is fetched from the process-wide
+    `model_registry`, which keeps it in memory and reloads it only when the
+    artifact on disk changes. Images are decoded and resized in memory, so
+    serving a request never touches the filesystem. Resizing uses the same
+    bilinear `decode_image` path as the preprocessed image store that
+    training and evaluation read from. With TTA enabled every image is
+    scored under the configured views in the same forward pass.
+
+    TensorFlow is only imported by the first prediction or model load, so a
+    pipeline can be built in a process that must stay free of it, such as
+    the gunicorn master.
+
+    Responses are versioned. Version 1, the default, only has the label.
+    Version 2 is derived from the same softmax output: it adds the class
+    probabilities, the top-k classes and a confidence calibrated with the
+    temperature fitted by the evaluation stage, and abstains when that
+    confidence is below the abstain threshold. The temperature is read again
+    whenever the registry reloads the model, so it always belongs to the
+    model being served.
+
     Args:
-        filename (str): The filename of the input image.
+        filename (str, optional): The filename of the input image, used by `predict`.
+        config (PredictionConfig, optional): Prediction settings. Read from config.yaml if omitted.
 
     Methods:
         __init__: Initializes the PredictionPipeline object.
-        predict: Takes an image and returns the prediction as a list of dictionaries.
+        load_model: Returns the cached model, loading and warming it up on first use.
+        decode: Decodes an encoded image to an array sized for the model.
+        predict_proba: Runs one forward pass and returns the class probabilities.
+        to_response: Converts class probabilities to the requested response version.
+        predict_array: Predicts on already decoded image arrays.
+        predict_bytes: Predicts on an encoded image held in memory.
+        predict_stream: Scores many images in batches, decoding them on a thread pool.
+        predict: Takes an image file and returns the prediction as a list of dictionaries.
 
     """
-    def __init__(self, filename:str) -> None:
+    CLASS_NAMES = ["Coccidiosis", "Healthy"]
+
+    def __init__(self, filename: Optional[str] = None, config: Optional[PredictionConfig] = None) -> None:
         """
         Initializes the PredictionPipeline object.
 
         Args:
-            filename (str): The filename of the input image.
+            filename (str, optional): The filename of the input image, used by `predict`.
+            config (PredictionConfig, optional): Prediction settings. Read from config.yaml if omitted.
         """
         self.filename = filename
+        self.config = config or ConfigurationManager().get_prediction_config()
+        self._preprocess_input = None
+        self._tta = None
+        self.temperature = self._load_temperature()
+        self._temperature_version = model_registry.version(self.config.model_path)
+        self._store = None
+
+    def _load_temperature(self) -> float:
+        path = Path(self.config.calibration_file)
+        if not path.exists():
+            logger.info(f"no calibration at {path}, confidences are uncalibrated")
+            return 1.0
+        calibration = load_json(path)
+        if calibration.tta != self.config.params_tta.enabled:
+            logger.warning(
+                f"temperature was fitted with TTA {'on' if calibration.tta else 'off'}, "
+                f"serving with TTA {'on' if self.config.params_tta.enabled else 'off'}"
+            )
+        return float(calibration.temperature)
+
+    def _current_temperature(self) -> float:
+        # calibration.json is rewritten with every evaluated model
+        version = model_registry.version(self.config.model_path)
+        if version != self._temperature_version:
+            self.temperature = self._load_temperature()
+            self._temperature_version = version
+        return self.temperature
+
+    @property
+    def preprocess_input(self) -> Callable:
+        """
+        The backbone's preprocess_input, imported on first use.
+        """
+        if self._preprocess_input is None:
+            from cnnClassifier.components.backbones import get_preprocess_input
+            self._preprocess_input = get_preprocess_input(self.config.params_backbone)
+        return self._preprocess_input
 
-    def predict(self) -> List[dict[str, str]]:
+    @property
+    def tta(self):
+        """
+        The TestTimeAugmentation of the TTA params, None when disabled.
+        """
+        if self._tta is None and self.config.params_tta.enabled:
+            from cnnClassifier.components.tta import TestTimeAugmentation
+            self._tta = TestTimeAugmentation(self.config.params_tta)
+        return self._tta
+
+    def load_model(self):
+        """
+        Returns the cached model, loading and warming it up on first use.
+
+        Returns:
+            tf.keras.Model: The trained model.
+        """
+        return model_registry.get(self.config.model_path, warmup=self.config.warmup)
+
+    def decode(self, data: Union[bytes, memoryview]) -> np.ndarray:
+        """
+        Decodes an encoded image to an array sized for the model.
+
+        Args:
+            data (bytes | memoryview): JPEG/PNG bytes of a single image.
+
+        Returns:
+            np.ndarray: uint8 array of shape (height, width, 3).
+        """
+        model = self.load_model()
+        return decode_image(data, target_size=tuple(model.input_shape[1:3]), interpolation="bilinear")
+
+    def predict_proba(self, images: np.ndarray) -> np.ndarray:
+        """
+        Runs one forward pass and returns the class probabilities, aggregated
+        over the augmented views when TTA is enabled.
+
+        Args:
+            images (np.ndarray): A (batch, height, width, 3) batch of [0, 255] pixels sized for the model.
+
+        Returns:
+            np.ndarray: (batch, classes) softmax output.
+        """
+        # astype copies: preprocess_input may work in place on numpy input.
+        batch = self.preprocess_input(np.asarray(images).astype(np.float32))
+        if self.tta is not None:
+            return self.tta.predict(self.load_model(), batch)
+        return self.load_model().predict(batch, verbose=0)
+
+    def to_response(self, probabilities: np.ndarray, version: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Converts class probabilities to the requested response version.
+
+        Args:
+            probabilities (np.ndarray): (classes,) or (batch, classes) softmax output.
+            version (int, optional): One of RESPONSE_VERSIONS. Defaults to the configured version.
+
+        Returns:
+            A list with one dictionary per image: {"image": label} in version 1;
+            version 2 adds "confidence", "probabilities", "top_k" and "abstained".
+        """
+        version = version or self.config.response_version
+        if version not in RESPONSE_VERSIONS:
+            raise ValueError(f"unknown response version {version!r}, expected one of {list(RESPONSE_VERSIONS)}")
+        probabilities = np.atleast_2d(probabilities)
+        result = np.argmax(probabilities, axis=1)
+        if version == 1:
+            return [{"image": self.CLASS_NAMES[index]} for index in result]
+
+        confidence = apply_temperature(probabilities, self._current_temperature()).max(axis=1)
+        threshold = self.config.abstain_threshold
+        abstained = confidence < threshold if threshold is not None else np.zeros(len(result), dtype=bool)
+        top_k = np.argsort(-probabilities, axis=1)[:, :self.config.top_k]
+        return [
+            {
+                "image": None if abstained[row] else self.CLASS_NAMES[result[row]],
+                "confidence": round(float(confidence[row]), 6),
+                "probabilities": {
+                    name: round(float(probability), 6)
+                    for name, probability in zip(self.CLASS_NAMES, probabilities[row])
+                },
+                "top_k": [
+                    {"label": self.CLASS_NAMES[index], "probability": round(float(probabilities[row, index]), 6)}
+                    for index in top_k[row]
+                ],
+                "abstained": bool(abstained[row]),
+            }
+            for row in range(len(result))
+        ]
+
+    def predict_array(self, images: np.ndarray, version: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Predicts on already decoded image arrays.
+
+        Args:
+            images (np.ndarray): A (height, width, 3) image or a (batch, height, width, 3) batch,
+                already resized to the model's input size.
+            version (int, optional): Response version. Defaults to the configured version.
+
+        Returns:
+            A list with one prediction dictionary per input image.
+        """
+        if images.ndim == 3:
+            images = images[np.newaxis]
+        return self.to_response(self.predict_proba(images), version)
+
+    def predict_bytes(self, data: Union[bytes, memoryview], version: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Predicts on an encoded image held in memory.
+
+        Args:
+            data (bytes | memoryview): JPEG/PNG bytes of a single image.
+            version (int, optional): Response version. Defaults to the configured version.
+
+        Returns:
+            A list containing a dictionary with the prediction for the input image.
+        """
+        return self.predict_array(self.decode(data), version)
+
+    def _decode_chunk(self, executor: ThreadPoolExecutor, chunk: list, target_size: tuple):
+        batch = np.empty((len(chunk), *target_size, 3), dtype=np.uint8)
+
+        def _decode(row: int):
+            _, load = chunk[row]
+            try:
+                decode_image_into(batch[row], load(), interpolation="bilinear")
+                return None
+            except Exception as e:
+                return f"{type(e).__name__}: {e}"
+
+        return batch, list(executor.map(_decode, range(len(chunk))))
+
+    def predict_stream(
+        self,
+        sources: Iterable[Tuple[str, Callable[[], bytes]]],
+        batch_size: int = 32,
+        workers: int = 4,
+        version: Optional[int] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Scores many images in batches, decoding them on a thread pool.
+
+        Decoding of the next batch overlaps with inference on the current one.
+        Images that fail to decode are reported with an "error" key instead of
+        failing the whole stream.
+
+        Args:
+            sources (Iterable): (name, loader) pairs where loader() returns the encoded image bytes.
+            batch_size (int, optional): Images per forward pass. Defaults to 32.
+            workers (int, optional): Decoding threads. Defaults to 4.
+            version (int, optional): Response version. Defaults to the configured version.
+
+        Yields:
+            dict: {"source": name, **prediction} or {"source": name, "error": message}.
+        """
+        target_size = tuple(self.load_model().input_shape[1:3])
+        sources = iter(sources)
+        with ThreadPoolExecutor(max_workers=workers) as executor, \
+                ThreadPoolExecutor(max_workers=1) as prefetcher:
+            chunk = list(islice(sources, batch_size))
+            pending = prefetcher.submit(self._decode_chunk, executor, chunk, target_size)
+            while chunk:
+                batch, errors = pending.result()
+                next_chunk = list(islice(sources, batch_size))
+                if next_chunk:
+                    pending = prefetcher.submit(self._decode_chunk, executor, next_chunk, target_size)
+
+                valid = [row for row, error in enumerate(errors) if error is None]
+                labels = self.to_response(self.predict_proba(batch[valid]), version) if valid else []
+                labels = dict(zip(valid, labels))
+                for row, (name, _) in enumerate(chunk):
+                    if errors[row] is None:
+                        yield {"source": name, **labels[row]}
+                    else:
+                        yield {"source": name, "error": errors[row]}
+                chunk = next_chunk
+
+    def predict(self, version: Optional[int] = None) -> List[Dict[str, Any]]:
         """
         Takes an image and returns the prediction as a list of dictionaries.
 
+        Args:
+            version (int, optional): Response version. Defaults to the configured version.
+
         Returns:
             A list containing a dictionary with the prediction for the input image.
-            The dictionary has a single key "image" with the corresponding prediction value.
+            In version 1 the dictionary has a single key "image" with the corresponding prediction value.
         """
+        height, width = self.load_model().input_shape[1:3]
+        # the store index is read once per pipeline, and again only if a reloaded model changed size
+        if self._store is None or self._store.image_size[:2] != [height, width]:
+            self._store = PreprocessedImageStore(
+                root_dir=self.config.image_store_dir,
+                image_size=[height, width, 3],
+            )
+        stored = self._store.get(self.filename)
+        if stored is not None:
+            return self.predict_array(stored, version)
+        with open(self.filename, "rb") as f:
+            return self.predict_bytes(f.read(), version)
+
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+def iter_directory_sources(directory: Path, skip: Optional[set] = None) -> Iterator[Tuple[str, Callable[[], bytes]]]:
+    """
+    Yields (relative path, loader) pairs for every image below a directory.
+
+    Args:
+        directory (Path): Directory to walk recursively.
+        skip (set, optional): Relative paths to leave out, e.g. already scored images.
+
+    Yields:
+        tuple: (relative path, callable returning the file bytes).
+    """
+    directory = Path(directory)
+    skip = skip or set()
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(files):
+            if not name.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            path = Path(root) / name
+            relative = path.relative_to(directory).as_posix()
+            if relative not in skip:
+                yield relative, path.read_bytes
+
+
+def _completed_sources(output: Path) -> set:
+    """
+    Reads the sources already scored in a JSON-lines output file and rewrites
+    it with only those records, dropping a trailing partial line left by an
+    interrupted run and the error records of images that are retried, so a
+    resumed run writes no duplicates.
+    """
+    done = set()
+    if not output.exists():
+        return done
+    kept = []
+    with open(output, "rb") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break
+            if not line.endswith(b"\n"):
+                break
+            if "image" in record:
+                done.add(record["source"])
+                kept.append(line)
+    tmp_path = output.with_name(output.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        f.writelines(kept)
+    os.replace(tmp_path, output)
+    return done
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """
+    Scores every image in a directory and writes one JSON line per image.
+
+    Re-running with the same output file resumes where the previous run
+    stopped; images that previously failed to decode are retried.
+    """
+    parser = argparse.ArgumentParser(description="Bulk scoring of an image folder")
+    parser.add_argument("input", type=Path, help="directory of images, scanned recursively")
+    parser.add_argument("-o", "--output", type=Path, default=Path("predictions.jsonl"))
+    parser.add_argument("-b", "--batch-size", type=int, default=32)
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 4)
+    parser.add_argument("--no-resume", action="store_true", help="overwrite the output file")
+    parser.add_argument("--response-version", type=int, choices=RESPONSE_VERSIONS, default=None)
+    args = parser.parse_args(argv)
+
+    if args.no_resume and args.output.exists():
+        args.output.unlink()
+    done = _completed_sources(args.output)
+    if done:
+        logger.info(f"resuming, {len(done)} images already scored in {args.output}")
 
-        # load model
-        model = load_model(os.path.join("artifacts", "training", "model.h5"))
+    pipeline = PredictionPipeline()
+    scored = 0
+    start = time.perf_counter()
+    with open(args.output, "a") as f:
+        for record in pipeline.predict_stream(
+            iter_directory_sources(args.input, skip=done),
+            batch_size=args.batch_size,
+            workers=args.workers,
+            version=args.response_version,
+        ):
+            f.write(json.dumps(record) + "\n")
+            scored += 1
+            if scored % (args.batch_size * 10) == 0:
+                f.flush()
+                logger.info(f"{scored} images, {scored / (time.perf_counter() - start):.1f} images/sec")
+    elapsed = time.perf_counter() - start
+    logger.info(f"scored {scored} images in {elapsed:.1f}s ({scored / max(elapsed, 1e-9):.1f} images/sec)")
 
-        imagename = self.filename
-        test_image = image.load_img(imagename, target_size=(224, 224))
-        test_image = image.img_to_array(test_image)
-        test_image = np.expand_dims(test_image, axis=0)
-        result = np.argmax(model.predict(test_image), axis=1)
-        print(result)
 
-        if result[0] == 1:
-            prediction = "Healthy"
-            return [{"image": prediction}]
-        else:
-            prediction = "Coccidiosis"
-            return [{"image": prediction}]
+if __name__ == "__main__":
+    main()
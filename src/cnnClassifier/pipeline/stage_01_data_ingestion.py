@@ -9,7 +9,8 @@ class DataIngestionTrainingPipeline:
 
     Methods:
         __init__: Initializes the DataIngestionTrainingPipeline object.
-        main: Executes the main data ingestion steps, including downloading and extracting files.
+        main: Executes the main data ingestion steps, including downloading and extracting files,
+              updating the dataset manifest and building the preprocessed image store.
     """
     def __init__(self) -> None:
         """
@@ -29,6 +30,9 @@ class DataIngestionTrainingPipeline:
         data_ingestion = DataIngestion(config=data_ingestion_config)
         data_ingestion.download_file()
         data_ingestion.extract_zip_file()
+        data_ingestion.ingest_extra_folders()
+        data_ingestion.update_manifest()
+        data_ingestion.build_image_store()
 
 
 
@@ -27,12 +27,14 @@ class ModelTrainingPipeline:
             None
         """
         config = ConfigurationManager()
+        training_config = config.get_training_config()
+        # first, so the distribution strategy is set up before any other TensorFlow work
+        training = Training(config=training_config)
+
         prepare_callbacks_config = config.get_prepare_callback_config()
         prepare_callbacks = PrepareCallback(config=prepare_callbacks_config)
-        callback_list = prepare_callbacks.get_tb_ckpt_callbacks()
+        callback_list = prepare_callbacks.get_callbacks()
 
-        training_config = config.get_training_config()
-        training = Training(config=training_config)
         training.get_base_model()
         training.train_valid_generator()
         training.train(callback_list=callback_list)
@@ -0,0 +1,58 @@
+from cnnClassifier.config.configuration import ConfigurationManager
+from cnnClassifier.components.model_export import ModelExport
+from cnnClassifier import logger
+
+
+class ModelExportPipeline:
+    """
+    A pipeline for exporting the trained model to quantized TFLite variants.
+
+    Methods:
+        __init__: Initializes the ModelExportPipeline object.
+        main: Executes the main steps for model export, including converting every configured variant
+              and reporting its size, latency and accuracy.
+    """
+    def __init__(self) -> None:
+        """
+        Initializes the ModelExportPipeline object.
+        """
+        pass
+
+    def main(self) -> None:
+        """
+        Executes the main steps for model export, including converting every configured variant
+        and reporting its size, latency and accuracy.
+
+        Returns:
+            None
+        """
+        config = ConfigurationManager()
+        model_export_config = config.get_model_export_config()
+        model_export = ModelExport(config=model_export_config)
+        model_export.export()
+
+
+def run_pipeline(stage_name, pipeline_instance):
+    """
+    Run a specific pipeline.
+
+    Parameters:
+    - stage_name: str
+        Name of the pipeline stage.
+    - pipeline_instance: object
+        Instance of the pipeline stage to be executed.
+
+    Returns:
+        None
+    """
+    try:
+        logger.info(f">>>>>> Stage {stage_name} started <<<<<<")
+        pipeline_instance.main()
+        logger.info(f">>>>>> Stage {stage_name} completed <<<<<<\n\nx==========x")
+    except Exception as e:
+        logger.exception(e)
+        raise e
+
+
+if __name__ == "__main__":
+    run_pipeline("Exporting model", ModelExportPipeline())
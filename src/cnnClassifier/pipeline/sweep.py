@@ -0,0 +1,34 @@
+import argparse
+from dataclasses import replace
+from typing import List, Optional
+
+from cnnClassifier import logger
+from cnnClassifier.config.configuration import ConfigurationManager
+from cnnClassifier.components.sweep import STRATEGIES, HyperparameterSweep
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """
+    Runs the hyperparameter sweep configured under SWEEP in params.yaml.
+    Command-line options override the strategy, trial count and workers.
+    """
+    parser = argparse.ArgumentParser(description="Hyperparameter sweep over params.yaml")
+    parser.add_argument("--strategy", choices=STRATEGIES, default=None)
+    parser.add_argument("--trials", type=int, default=None)
+    parser.add_argument("-w", "--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    config = ConfigurationManager().get_sweep_config()
+    overrides = {
+        "params_strategy": args.strategy,
+        "params_trials": args.trials,
+        "params_workers": args.workers,
+    }
+    config = replace(config, **{key: value for key, value in overrides.items() if value is not None})
+
+    summary = HyperparameterSweep(config=config).run()
+    logger.info(f"sweep finished, best trial: {summary['best']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,7 @@ from box import ConfigBox
 from pathlib import Path
 from typing import Any
 import base64
+import hashlib
 
 
 @ensure_annotations
@@ -122,6 +123,22 @@ def get_size(path: Path) -> str:
     return f"~ {size_in_kb} KB"
 
 
+def file_sha256(path) -> str:
+    """get the sha256 of a file, read in 1 MB chunks
+
+    Args:
+        path (Path): path of the file
+
+    Returns:
+        str: hex digest
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
 def decodeImage(imgstring, fileName):
     imgdata = base64.b64decode(imgstring)
     with open(fileName, "wb") as f:
@@ -129,6 +146,18 @@ def decodeImage(imgstring, fileName):
         f.close()
 
 
+def decodeImageBytes(imgstring) -> bytes:
+    """decode a base64 image payload in memory
+
+    Args:
+        imgstring (str | bytes): base64 encoded image
+
+    Returns:
+        bytes: raw encoded image bytes
+    """
+    return base64.b64decode(imgstring)
+
+
 def encodeImageIntoBase64(croppedImagePath):
     with open(croppedImagePath, "rb") as f:
         return base64.b64encode(f.read())
@@ -0,0 +1,60 @@
+import io
+from typing import Tuple, Union
+
+import numpy as np
+from PIL import Image
+
+_PIL_INTERPOLATION = {
+    "nearest": Image.NEAREST,
+    "bilinear": Image.BILINEAR,
+    "bicubic": Image.BICUBIC,
+    "lanczos": Image.LANCZOS,
+}
+
+
+def decode_image(
+    data: Union[bytes, bytearray, memoryview],
+    target_size: Tuple[int, int] = (224, 224),
+    interpolation: str = "nearest",
+) -> np.ndarray:
+    """decode an encoded image held in memory into a resized RGB array
+
+    The buffer is wrapped, not copied, and the decoded image is exposed to
+    numpy through the array interface, so the only copies are the ones the
+    JPEG/PNG decoder and the resize make themselves. Matches the output of
+    `tf.keras.preprocessing.image.load_img` for the same arguments.
+
+    Args:
+        data (bytes | memoryview): encoded image bytes
+        target_size (tuple): (height, width) to resize to
+        interpolation (str): one of nearest, bilinear, bicubic, lanczos
+
+    Returns:
+        np.ndarray: uint8 array of shape (height, width, 3)
+    """
+    with Image.open(io.BytesIO(data)) as img:
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+        width_height = (target_size[1], target_size[0])
+        if img.size != width_height:
+            img = img.resize(width_height, _PIL_INTERPOLATION[interpolation])
+        return np.asarray(img)
+
+
+def decode_image_into(
+    out: np.ndarray,
+    data: Union[bytes, bytearray, memoryview],
+    interpolation: str = "bilinear",
+) -> np.ndarray:
+    """decode an image straight into a preallocated (height, width, 3) slot
+
+    Args:
+        out (np.ndarray): destination slot, e.g. one row of a batch array
+        data (bytes | memoryview): encoded image bytes
+        interpolation (str): one of nearest, bilinear, bicubic, lanczos
+
+    Returns:
+        np.ndarray: `out`
+    """
+    out[...] = decode_image(data, target_size=out.shape[:2], interpolation=interpolation)
+    return out
@@ -0,0 +1,276 @@
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+
+def _divide(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    # elementwise division that yields 0 where the denominator is 0
+    numerator = np.asarray(numerator, dtype=np.float64)
+    denominator = np.asarray(denominator, dtype=np.float64)
+    out = np.zeros(np.broadcast(numerator, denominator).shape)
+    return np.divide(numerator, denominator, out=out, where=denominator != 0)
+
+
+def confusion_matrix(labels: np.ndarray, predictions: np.ndarray, num_classes: int) -> np.ndarray:
+    """count (actual, predicted) pairs
+
+    Args:
+        labels (np.ndarray): integer class of every sample
+        predictions (np.ndarray): predicted integer class of every sample
+        num_classes (int): number of classes
+
+    Returns:
+        np.ndarray: int64 matrix, rows are actual and columns predicted classes
+    """
+    pairs = np.asarray(labels, dtype=np.int64) * num_classes + np.asarray(predictions, dtype=np.int64)
+    return np.bincount(pairs, minlength=num_classes ** 2).reshape(num_classes, num_classes)
+
+
+def precision_recall_f1(matrix: np.ndarray) -> Dict[str, np.ndarray]:
+    """per-class precision, recall, F1 and support from a confusion matrix
+
+    Args:
+        matrix (np.ndarray): confusion matrix from `confusion_matrix`
+
+    Returns:
+        dict: arrays of length num_classes under precision, recall, f1 and support
+    """
+    true_positives = np.diag(matrix)
+    support = matrix.sum(axis=1)
+    precision = _divide(true_positives, matrix.sum(axis=0))
+    recall = _divide(true_positives, support)
+    f1 = _divide(2 * precision * recall, precision + recall)
+    return {"precision": precision, "recall": recall, "f1": f1, "support": support}
+
+
+def _ranked_counts(targets: np.ndarray, scores: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # true and false positives at every distinct threshold, highest first
+    order = np.argsort(-scores, kind="mergesort")
+    scores, targets = scores[order], targets[order]
+    last = np.r_[np.flatnonzero(np.diff(scores)), targets.size - 1]
+    true_positives = np.cumsum(targets)[last]
+    false_positives = (last + 1) - true_positives
+    return true_positives, false_positives, scores[last]
+
+
+def roc_curve(targets: np.ndarray, scores: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """one-vs-rest ROC curve
+
+    Args:
+        targets (np.ndarray): 1 for samples of the positive class, else 0
+        scores (np.ndarray): predicted probability of the positive class
+
+    Returns:
+        tuple: false positive rates, true positive rates and their thresholds,
+            starting at (0, 0) with an infinite threshold
+    """
+    true_positives, false_positives, thresholds = _ranked_counts(targets, scores)
+    tpr = _divide(np.r_[0, true_positives], true_positives[-1])
+    fpr = _divide(np.r_[0, false_positives], false_positives[-1])
+    return fpr, tpr, np.r_[np.inf, thresholds]
+
+
+def precision_recall_curve(targets: np.ndarray, scores: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """one-vs-rest precision-recall curve
+
+    Args:
+        targets (np.ndarray): 1 for samples of the positive class, else 0
+        scores (np.ndarray): predicted probability of the positive class
+
+    Returns:
+        tuple: precisions, recalls and their thresholds, by increasing recall
+            starting at (precision 1, recall 0) with an infinite threshold
+    """
+    true_positives, false_positives, thresholds = _ranked_counts(targets, scores)
+    precision = _divide(true_positives, true_positives + false_positives)
+    recall = _divide(true_positives, true_positives[-1])
+    return np.r_[1.0, precision], np.r_[0.0, recall], np.r_[np.inf, thresholds]
+
+
+def auc(x: np.ndarray, y: np.ndarray) -> float:
+    """area under a curve with the trapezoidal rule"""
+    return float(np.sum(np.diff(x) * (y[1:] + y[:-1]) / 2))
+
+
+def average_precision(precision: np.ndarray, recall: np.ndarray) -> float:
+    """area under a precision-recall curve as the recall-weighted mean precision"""
+    return float(np.sum(np.diff(recall) * precision[1:]))
+
+
+def calibration(probabilities: np.ndarray, labels: np.ndarray, bins: int = 10) -> Dict[str, np.ndarray]:
+    """reliability table of the top-class confidence in equal-width bins
+
+    Args:
+        probabilities (np.ndarray): (samples, classes) predicted probabilities
+        labels (np.ndarray): integer class of every sample
+        bins (int): number of confidence bins on [0, 1]
+
+    Returns:
+        dict: per-bin lower and upper edges, sample count, mean confidence and accuracy
+    """
+    confidence = probabilities.max(axis=1)
+    correct = (probabilities.argmax(axis=1) == labels).astype(np.float64)
+    index = np.minimum((confidence * bins).astype(np.int64), bins - 1)
+    count = np.bincount(index, minlength=bins)
+    edges = np.linspace(0.0, 1.0, bins + 1)
+    return {
+        "lower": edges[:-1],
+        "upper": edges[1:],
+        "count": count,
+        "confidence": _divide(np.bincount(index, weights=confidence, minlength=bins), count),
+        "accuracy": _divide(np.bincount(index, weights=correct, minlength=bins), count),
+    }
+
+
+def expected_calibration_error(table: Dict[str, np.ndarray]) -> float:
+    """count-weighted mean gap between confidence and accuracy of a reliability table"""
+    return float(np.sum(table["count"] * np.abs(table["accuracy"] - table["confidence"])) / max(table["count"].sum(), 1))
+
+
+def _log_softmax(logits: np.ndarray) -> np.ndarray:
+    shifted = logits - logits.max(axis=-1, keepdims=True)
+    return shifted - np.log(np.exp(shifted).sum(axis=-1, keepdims=True))
+
+
+def _logits(probabilities: np.ndarray) -> np.ndarray:
+    # log-probabilities are the logits of a softmax output, up to a per-row constant
+    return np.log(np.clip(np.asarray(probabilities, dtype=np.float64), np.finfo(np.float32).eps, 1.0))
+
+
+def apply_temperature(probabilities: np.ndarray, temperature: float) -> np.ndarray:
+    """rescale softmax probabilities as if their logits were divided by a temperature
+
+    Args:
+        probabilities (np.ndarray): (samples, classes) softmax output
+        temperature (float): > 1 softens, < 1 sharpens the probabilities
+
+    Returns:
+        np.ndarray: (samples, classes) calibrated probabilities
+    """
+    return np.exp(_log_softmax(_logits(probabilities) / temperature))
+
+
+def fit_temperature(
+    probabilities: np.ndarray,
+    labels: np.ndarray,
+    low: float = 0.05,
+    high: float = 20.0,
+    steps: int = 100,
+    rounds: int = 3,
+) -> float:
+    """temperature minimising the negative log-likelihood of the labels
+
+    The likelihood of every candidate temperature is computed at once on a
+    log-spaced grid, which is then narrowed around the best one.
+
+    Args:
+        probabilities (np.ndarray): (samples, classes) softmax output
+        labels (np.ndarray): integer class of every sample
+        low (float): smallest temperature searched
+        high (float): largest temperature searched
+        steps (int): grid points per round
+        rounds (int): grid refinements
+
+    Returns:
+        float: fitted temperature, 1.0 leaves the probabilities unchanged
+    """
+    logits = _logits(probabilities)
+    rows = np.arange(len(labels))
+    grid = np.geomspace(low, high, steps)
+    for _ in range(rounds):
+        nll = -_log_softmax(logits[np.newaxis] / grid[:, np.newaxis, np.newaxis])[:, rows, labels].mean(axis=1)
+        best = int(np.argmin(nll))
+        temperature = float(grid[best])
+        grid = np.geomspace(grid[max(best - 1, 0)], grid[min(best + 1, steps - 1)], steps)
+    return temperature
+
+
+def held_out_calibration_error(
+    probabilities: np.ndarray,
+    labels: np.ndarray,
+    bins: int = 10,
+    seed: int = 0,
+) -> float:
+    """ECE after temperature scaling, with every sample calibrated by a temperature fitted without it
+
+    The samples are shuffled into two halves; each half is scaled with the
+    temperature fitted on the other, and the ECE is taken over both.
+
+    Args:
+        probabilities (np.ndarray): (samples, classes) softmax output
+        labels (np.ndarray): integer class of every sample
+        bins (int): number of calibration bins
+        seed (int): seed of the split into halves
+
+    Returns:
+        float: out-of-sample expected calibration error
+    """
+    order = np.random.default_rng(seed).permutation(len(labels))
+    halves = np.array_split(order, 2)
+    calibrated = np.empty_like(probabilities, dtype=np.float64)
+    for fit_rows, test_rows in ((halves[0], halves[1]), (halves[1], halves[0])):
+        temperature = fit_temperature(probabilities[fit_rows], labels[fit_rows]) if len(fit_rows) else 1.0
+        calibrated[test_rows] = apply_temperature(probabilities[test_rows], temperature)
+    return expected_calibration_error(calibration(calibrated, labels, bins))
+
+
+def classification_metrics(
+    probabilities: np.ndarray,
+    labels: np.ndarray,
+    class_names: List[str],
+    bins: int = 10,
+) -> Dict:
+    """every evaluation metric from one array of predicted probabilities
+
+    Args:
+        probabilities (np.ndarray): (samples, classes) predicted probabilities
+        labels (np.ndarray): integer class of every sample
+        class_names (list): name of every class, in label order
+        bins (int): number of calibration bins
+
+    Returns:
+        dict: "scores" (JSON-ready summary and per-class scores), "confusion_matrix",
+            per-class "roc" and "pr" curves and the "calibration" table
+    """
+    num_classes = len(class_names)
+    predictions = probabilities.argmax(axis=1)
+    eps = np.finfo(np.float32).eps
+    loss = float(-np.mean(np.log(np.clip(probabilities[np.arange(len(labels)), labels], eps, 1.0))))
+
+    matrix = confusion_matrix(labels, predictions, num_classes)
+    per_class = precision_recall_f1(matrix)
+    targets = labels[:, np.newaxis] == np.arange(num_classes)
+    roc, pr = {}, {}
+    roc_auc, ap = np.zeros(num_classes), np.zeros(num_classes)
+    for k, name in enumerate(class_names):
+        roc[name] = roc_curve(targets[:, k], probabilities[:, k])
+        pr[name] = precision_recall_curve(targets[:, k], probabilities[:, k])
+        roc_auc[k] = auc(roc[name][0], roc[name][1])
+        ap[k] = average_precision(pr[name][0], pr[name][1])
+    table = calibration(probabilities, labels, bins)
+
+    weights = _divide(per_class["support"], per_class["support"].sum())
+    scores = {
+        "loss": loss,
+        "accuracy": float(np.mean(predictions == labels)),
+        "samples": int(len(labels)),
+        "macro_precision": float(per_class["precision"].mean()),
+        "macro_recall": float(per_class["recall"].mean()),
+        "macro_f1": float(per_class["f1"].mean()),
+        "weighted_f1": float(np.sum(weights * per_class["f1"])),
+        "macro_roc_auc": float(roc_auc.mean()),
+        "macro_average_precision": float(ap.mean()),
+        "ece": expected_calibration_error(table),
+        "per_class": {
+            name: {
+                "precision": float(per_class["precision"][k]),
+                "recall": float(per_class["recall"][k]),
+                "f1": float(per_class["f1"][k]),
+                "support": int(per_class["support"][k]),
+                "roc_auc": float(roc_auc[k]),
+                "average_precision": float(ap[k]),
+            }
+            for k, name in enumerate(class_names)
+        },
+    }
+    return {"scores": scores, "confusion_matrix": matrix, "roc": roc, "pr": pr, "calibration": table}
@@ -0,0 +1,193 @@
+import os
+import time
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+from cnnClassifier import logger
+from cnnClassifier.utils.common import file_sha256
+
+
+class ModelRegistry:
+    """
+    A process-wide cache of loaded models keyed by artifact path.
+
+    A model is loaded once, warmed up with a dummy inference and then served
+    from memory until the artifact on disk changes. Changes are detected
+    cheaply from the file's mtime and size; the sha256 is only computed when
+    those differ, so touching a file without changing it does not trigger a
+    reload.
+
+    Attributes:
+        hits (int): Number of lookups served from memory.
+        misses (int): Number of lookups that had to load the artifact.
+        reloads (int): Number of misses caused by a changed artifact.
+        load_time (float): Total seconds spent loading and warming up models.
+    """
+
+    def __init__(self, loader: Optional[Callable[[Path], Any]] = None, warmup: bool = True) -> None:
+        """
+        Initializes the ModelRegistry object.
+
+        Args:
+            loader (Callable, optional): Function that loads a model from a path.
+                Defaults to TFLiteModel for .tflite files and tf.keras.models.load_model otherwise.
+            warmup (bool, optional): Run a dummy inference after loading. Defaults to True.
+        """
+        self._loader = loader
+        self._warmup = warmup
+        self._lock = threading.Lock()
+        self._entries: Dict[str, dict] = {}
+        self._preloaded: Dict[str, tuple] = {}
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+        self.load_time = 0.0
+
+    @staticmethod
+    def _fingerprint(path: Path) -> tuple:
+        stat = os.stat(path)
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def preload_bytes(self, path: Path) -> None:
+        """
+        Reads a TFLite artifact into memory without creating an interpreter,
+        so no TensorFlow runtime is started. Interpreters created later by
+        `get`, e.g. in processes forked after this call, run from these bytes,
+        which forked processes share copy-on-write.
+
+        Args:
+            path (Path): Path to a .tflite model.
+        """
+        if Path(path).suffix != ".tflite":
+            raise ValueError(f"only TFLite models can be preloaded before fork, got {path}")
+        with open(path, "rb") as f:
+            data = f.read()
+        self._preloaded[str(Path(path).resolve())] = (self._fingerprint(path), data)
+        logger.info(f"model bytes preloaded from: {path} ({len(data) / 2**20:.1f} MiB)")
+
+    def _load(self, path: Path) -> Any:
+        if self._loader is not None:
+            return self._loader(path)
+        if Path(path).suffix == ".tflite":
+            from cnnClassifier.utils.tflite_model import TFLiteModel
+            # the same per-process thread budget as TensorFlow (set by gunicorn.conf.py)
+            threads = os.environ.get("TF_NUM_INTRAOP_THREADS")
+            fingerprint, data = self._preloaded.get(str(Path(path).resolve()), (None, None))
+            if fingerprint != self._fingerprint(path):
+                data = None
+            return TFLiteModel(path, num_threads=int(threads) if threads else None, model_content=data)
+        import tensorflow as tf
+        return tf.keras.models.load_model(path)
+
+    @staticmethod
+    def warmup(model: Any) -> None:
+        """
+        Runs a single inference on a zero batch so that graph tracing and
+        kernel selection happen before the first real request.
+
+        Args:
+            model: Loaded model exposing `input_shape` and `predict`.
+        """
+        input_shape = tuple(dim or 1 for dim in model.input_shape[1:])
+        model.predict(np.zeros((1, *input_shape), dtype=np.float32), verbose=0)
+
+    def get(self, path: Path, warmup: Optional[bool] = None) -> Any:
+        """
+        Returns the model stored at `path`, loading it if it is not cached or
+        the file has changed since it was loaded.
+
+        Args:
+            path (Path): Path to the model artifact.
+            warmup (bool, optional): Overrides the registry's warm-up setting for this load.
+
+        Returns:
+            The loaded model.
+        """
+        key = str(Path(path).resolve())
+        fingerprint = self._fingerprint(path)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry["fingerprint"] == fingerprint:
+                self.hits += 1
+                return entry["model"]
+
+            file_hash = file_sha256(path)
+            if entry is not None and entry["sha256"] == file_hash:
+                entry["fingerprint"] = fingerprint
+                self.hits += 1
+                return entry["model"]
+
+            self.misses += 1
+            if entry is not None:
+                self.reloads += 1
+                logger.info(f"model artifact changed, reloading: {path}")
+
+            start = time.perf_counter()
+            model = self._load(Path(path))
+            if warmup is None:
+                warmup = self._warmup
+            if warmup:
+                self.warmup(model)
+            elapsed = time.perf_counter() - start
+            self.load_time += elapsed
+            logger.info(f"model loaded from: {path} in {elapsed:.2f}s")
+
+            self._entries[key] = {
+                "model": model,
+                "fingerprint": fingerprint,
+                "sha256": file_hash,
+                "load_seconds": elapsed,
+                "loaded_at": time.time(),
+            }
+            return model
+
+    def version(self, path: Path) -> Optional[str]:
+        """
+        Returns the sha256 of the artifact the cached model was loaded from,
+        which changes exactly when `get` reloads it.
+
+        Args:
+            path (Path): Path to the model artifact.
+
+        Returns:
+            str: The sha256, or None if the model is not cached.
+        """
+        with self._lock:
+            entry = self._entries.get(str(Path(path).resolve()))
+            return None if entry is None else entry["sha256"]
+
+    def clear(self) -> None:
+        """
+        Drops every cached model.
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """
+        Returns the registry counters and the cached models.
+
+        Returns:
+            dict: hit/miss/reload counters, total load time and per-model details.
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "reloads": self.reloads,
+                "load_time": round(self.load_time, 4),
+                "models": {
+                    key: {
+                        "sha256": entry["sha256"],
+                        "load_seconds": round(entry["load_seconds"], 4),
+                        "loaded_at": entry["loaded_at"],
+                    }
+                    for key, entry in self._entries.items()
+                },
+            }
+
+
+model_registry = ModelRegistry()
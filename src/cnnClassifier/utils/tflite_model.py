@@ -0,0 +1,76 @@
+import threading
+import numpy as np
+import tensorflow as tf
+from pathlib import Path
+
+
+class TFLiteModel:
+    """
+    A TFLite interpreter behind the subset of the Keras model API the
+    prediction pipeline uses (`input_shape` and `predict`).
+
+    Quantized inputs and outputs are (de)quantized with the tensor's own
+    scale and zero point, so callers always pass and receive float32. The
+    interpreter is not thread-safe; calls are serialised with a lock.
+    """
+    def __init__(self, path: Path, num_threads: int = None, model_content: bytes = None) -> None:
+        """
+        Initializes the TFLiteModel object.
+
+        Args:
+            path (Path): Path to the .tflite file.
+            num_threads (int, optional): Interpreter threads. Defaults to TFLite's choice.
+            model_content (bytes, optional): The file's bytes, already in memory. The
+                interpreter reads its weights from this buffer instead of the file.
+        """
+        self.path = Path(path)
+        if model_content is not None:
+            self.interpreter = tf.lite.Interpreter(model_content=model_content, num_threads=num_threads)
+        else:
+            self.interpreter = tf.lite.Interpreter(model_path=str(path), num_threads=num_threads)
+        self.interpreter.allocate_tensors()
+        self._lock = threading.Lock()
+        self._refresh_details()
+        self.input_shape = (None, *self._input["shape"][1:])
+
+    def _refresh_details(self) -> None:
+        self._input = self.interpreter.get_input_details()[0]
+        self._output = self.interpreter.get_output_details()[0]
+
+    @staticmethod
+    def _quantize(x: np.ndarray, details: dict) -> np.ndarray:
+        dtype = details["dtype"]
+        if dtype == np.float32:
+            return x.astype(np.float32, copy=False)
+        scale, zero_point = details["quantization"]
+        info = np.iinfo(dtype)
+        return np.clip(np.round(x / scale + zero_point), info.min, info.max).astype(dtype)
+
+    @staticmethod
+    def _dequantize(x: np.ndarray, details: dict) -> np.ndarray:
+        if details["dtype"] == np.float32:
+            return x
+        scale, zero_point = details["quantization"]
+        return (x.astype(np.float32) - zero_point) * scale
+
+    def predict(self, batch: np.ndarray, verbose: int = 0) -> np.ndarray:
+        """
+        Runs the interpreter on a batch.
+
+        Args:
+            batch (np.ndarray): (batch, height, width, channels) float input.
+            verbose (int, optional): Ignored, kept for Keras compatibility.
+
+        Returns:
+            np.ndarray: (batch, classes) float32 output.
+        """
+        batch = np.asarray(batch)
+        with self._lock:
+            if self._input["shape"][0] != batch.shape[0]:
+                self.interpreter.resize_tensor_input(self._input["index"], batch.shape)
+                self.interpreter.allocate_tensors()
+                self._refresh_details()
+            self.interpreter.set_tensor(self._input["index"], self._quantize(batch, self._input))
+            self.interpreter.invoke()
+            output = self.interpreter.get_tensor(self._output["index"])
+            return self._dequantize(output, self._output).copy()
@@ -0,0 +1,116 @@
+import hashlib
+import io
+import threading
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+data_ingestion = pytest.importorskip("cnnClassifier.components.data_ingestion")
+from cnnClassifier.entity.config_entity import DataIngestionConfig
+
+
+def _archive() -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zip_ref:
+        for index in range(20):
+            zip_ref.writestr(f"Chicken-fecal-images/Healthy/{index}.jpg", bytes(range(256)) * 64 + bytes([index]))
+    return buffer.getvalue()
+
+
+class _ArchiveServer:
+    """
+    Serves one archive over HTTP. The first response announces the full
+    length but is cut off halfway; later ones honour Range requests.
+    """
+    def __init__(self, body: bytes) -> None:
+        self.body = body
+        self.ranges = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                header = self.headers.get("Range")
+                server.ranges.append(header)
+                if len(server.ranges) == 1:
+                    self.send_response(200)
+                    self.send_header("Content-Length", str(len(server.body)))
+                    self.end_headers()
+                    self.wfile.write(server.body[:len(server.body) // 2])
+                    self.close_connection = True
+                    return
+                start = int(header[len("bytes="):-1]) if header else 0
+                self.send_response(206 if header else 200)
+                self.send_header("Content-Length", str(len(server.body) - start))
+                self.end_headers()
+                self.wfile.write(server.body[start:])
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_port}/data.zip"
+
+    def __enter__(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *args):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def _ingestion(tmp_path: Path, url: str, sha256: str):
+    config = DataIngestionConfig(
+        root_dir=tmp_path,
+        source_URL=url,
+        source_sha256=sha256,
+        local_data_file=tmp_path / "data.zip",
+        unzip_dir=tmp_path,
+        extract_workers=4,
+        data_dir=tmp_path / "Chicken-fecal-images",
+        manifest_file=tmp_path / "manifest.csv",
+        extra_data_dirs=[],
+        split_index_file=tmp_path / "split_index.npz",
+        params_validation_split=0.2,
+        params_split_seed=42,
+        image_store_dir=tmp_path / "image_store",
+        params_image_size=[224, 224, 3],
+    )
+    return data_ingestion.DataIngestion(config=config)
+
+
+@pytest.fixture(autouse=True)
+def _no_backoff(monkeypatch):
+    monkeypatch.setattr(data_ingestion.time, "sleep", lambda seconds: None)
+
+
+def test_download_resumes_with_range_and_verifies_sha256(tmp_path):
+    body = _archive()
+    with _ArchiveServer(body) as server:
+        ingestion = _ingestion(tmp_path, server.url, hashlib.sha256(body).hexdigest())
+        ingestion.download_file()
+
+    assert server.ranges == [None, f"bytes={len(body) // 2}-"]
+    assert (tmp_path / "data.zip").read_bytes() == body
+    assert not (tmp_path / "data.zip.part").exists()
+
+    ingestion.extract_zip_file()
+    assert len(list((tmp_path / "Chicken-fecal-images" / "Healthy").iterdir())) == 20
+
+
+def test_download_rejects_sha256_mismatch(tmp_path):
+    body = _archive()
+    with _ArchiveServer(body) as server:
+        ingestion = _ingestion(tmp_path, server.url, "0" * 64)
+        with pytest.raises(ValueError, match="sha256 mismatch"):
+            ingestion.download_file()
+
+    assert not (tmp_path / "data.zip").exists()
+    assert not (tmp_path / "data.zip.part").exists()
+
+
+def test_unset_sha256_is_rejected(tmp_path):
+    with pytest.raises(ValueError, match="unpinned"):
+        _ingestion(tmp_path, "http://127.0.0.1/data.zip", None)
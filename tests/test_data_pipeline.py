@@ -0,0 +1,100 @@
+from dataclasses import replace
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+tf = pytest.importorskip("tensorflow")
+from PIL import Image
+
+from cnnClassifier.components.data_pipeline import RandomShear
+from cnnClassifier.components.training import Training
+from cnnClassifier.config.configuration import ConfigurationManager
+
+IMAGE_SIZE = [32, 32, 3]
+
+
+def _write_images(data_dir: Path, per_class: int = 20) -> None:
+    rng = np.random.default_rng(0)
+    rows, cols = np.mgrid[0:IMAGE_SIZE[0], 0:IMAGE_SIZE[1]]
+    for class_name, channel in (("Coccidiosis", 0), ("Healthy", 2)):
+        (data_dir / class_name).mkdir(parents=True)
+        for index in range(per_class):
+            # off-centre structure, so rotations, shears and shifts move pixel statistics
+            image = rng.integers(0, 40, (*IMAGE_SIZE[:2], 3))
+            image[..., channel] += (rows * 6 + cols * rng.integers(1, 4)).clip(0, 200)
+            image[:8, :12] = 255
+            Image.fromarray(image.astype(np.uint8)).save(data_dir / class_name / f"{index:03d}.png")
+
+
+def _training(tmp_path: Path, data_loader: str) -> Training:
+    if not (tmp_path / "data").exists():
+        _write_images(tmp_path / "data")
+    config = replace(
+        ConfigurationManager().get_training_config(),
+        training_data=tmp_path / "data",
+        split_index_file=tmp_path / "split_index.npz",
+        image_store_dir=tmp_path / "image_store",
+        data_cache_dir=tmp_path / "data_cache",
+        params_image_size=IMAGE_SIZE,
+        params_batch_size=8,
+        params_is_augmentation=True,
+        params_data_loader=data_loader,
+        params_data_cache="none",
+        params_distribution="none",
+    )
+    training = Training(config=config)
+    training.train_valid_generator()
+    return training
+
+
+def _generator_images(training: Training, subset: str, epochs: int) -> np.ndarray:
+    generator = getattr(training, f"{subset}_generator")
+    return np.concatenate([generator[i][0] for _ in range(epochs) for i in range(len(generator))])
+
+
+def _dataset_images(training: Training, subset: str, epochs: int) -> np.ndarray:
+    dataset = getattr(training, f"{subset}_generator")
+    return np.concatenate([images.numpy() for _ in range(epochs) for images, _ in dataset])
+
+
+def _channel_stats(images: np.ndarray) -> tuple:
+    return images.mean(axis=(0, 1, 2)), images.std(axis=(0, 1, 2))
+
+
+def test_loaders_agree_on_validation_batches(tmp_path):
+    generator = _generator_images(_training(tmp_path, "generator"), "valid", epochs=1)
+    dataset = _dataset_images(_training(tmp_path, "tf_data"), "valid", epochs=1)
+
+    np.testing.assert_allclose(dataset, generator, atol=1e-3)
+
+
+def test_loaders_agree_on_augmented_batch_statistics(tmp_path):
+    tf.keras.utils.set_random_seed(0)
+    generator = _generator_images(_training(tmp_path, "generator"), "train", epochs=10)
+    dataset = _dataset_images(_training(tmp_path, "tf_data"), "train", epochs=10)
+    assert generator.shape == dataset.shape
+
+    # the layers resample once per transform and the generator once overall,
+    # so only the distributions are expected to agree
+    generator_mean, generator_std = _channel_stats(generator)
+    dataset_mean, dataset_std = _channel_stats(dataset)
+    np.testing.assert_allclose(dataset_mean, generator_mean, atol=3.0)
+    np.testing.assert_allclose(dataset_std, generator_std, rtol=0.1)
+
+
+@pytest.mark.parametrize("height, width", [(32, 32), (40, 30)])
+def test_random_shear_matches_image_data_generator(height, width):
+    from keras.src.legacy.preprocessing.image import apply_affine_transform
+
+    image = np.random.default_rng(1).uniform(0, 255, (height, width, 3)).astype(np.float32)
+    # the layer draws its angle with the same op, so reseeding replays it
+    tf.random.set_seed(0)
+    angle = tf.random.uniform([1], -20, 20).numpy()[0]
+    tf.random.set_seed(0)
+    sheared = RandomShear(20)(image[None], training=True).numpy()[0]
+
+    reference = apply_affine_transform(
+        image, shear=angle, row_axis=0, col_axis=1, channel_axis=2, fill_mode="nearest", order=1
+    )
+    np.testing.assert_allclose(sheared, reference, atol=1e-2)
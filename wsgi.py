@@ -0,0 +1,8 @@
+from app import create_app
+
+# No model is loaded and TensorFlow is not imported at import: TensorFlow does
+# not support fork once its runtime has started, and with preload_app this
+# module is imported in the gunicorn master. Every worker loads the model in
+# gunicorn.conf.py's post_fork; for the default TFLite backend the master
+# reads the model bytes first, which the workers then share.
+app = create_app(load_model=False)